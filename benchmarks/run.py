@@ -0,0 +1,225 @@
+"""Benchmark suite for the plant model, the batch engine, Monte Carlo and the page render.
+
+Usage:
+    python benchmarks/run.py                      # run and compare with benchmarks/baseline.json
+    python benchmarks/run.py --output results.json --threshold 25
+    python benchmarks/run.py --only plant batch   # benchmarks whose names start with these
+    python benchmarks/run.py --update-baseline    # store this run as the new baseline
+
+Every benchmark reports the median and minimum wall time (seconds) over its
+repeats. A benchmark regresses when its median exceeds the baseline median
+by more than the threshold (%); the script then exits with status 1. Times
+depend on the machine, so refresh the baseline when moving to new hardware.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Benchmarks must compute every result, never read one back from the on-disk store
+os.environ['PGE_SIM_STORE'] = 'off'
+
+import numpy as np  # noqa: E402
+
+from pge_sim import (MetallurgicalPlant, PROCESS_PARAM_RANGES, run_batch_simulation, run_monte_carlo,  # noqa: E402
+                     scenario_feed_composition, scenarios)
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Default regression threshold (% slower than the baseline median)
+REGRESSION_THRESHOLD = 20
+
+# Page defaults for the 15Mtpa case
+FEED_COMPOSITION = scenario_feed_composition(scenarios["15Mtpa Case"])
+PROCESS_PARAMS = {
+    'oxide_feed_rate': 228, 'sulphide_feed_rate': 1426, 'sizing_efficiency': 98, 'oxide_grinding_efficiency': 92,
+    'sulphide_grinding_efficiency': 92, 'leaching_efficiency': 88, 'crushing_efficiency': 98,
+    'cu_flotation_efficiency': 85, 'cu_flotation_recovery': 80, 'ni_flotation_efficiency': 80,
+    'ni_flotation_recovery': 43, 'co_flotation_recovery': 42, 'pgm_to_cu_concentrate': 70,
+    'pgm_to_ni_concentrate': 25, 'pressure_oxidation_efficiency': 95, 'oxide_pd_recovery': 78,
+    'oxide_au_recovery': 90, 'final_cu_recovery': 95, 'final_pd_recovery': 78, 'final_pt_recovery': 45,
+    'final_au_recovery': 66, 'final_ni_recovery': 92, 'final_co_recovery': 90
+}
+METAL_PRICES = {'Cu': 8.5, 'Pd': 32000, 'Pt': 28000, 'Au': 65000, 'Ni': 18, 'Co': 35}
+VARIATION = {'feed_rate': 10, 'efficiency': 5, 'grade': 10, 'recovery': 7}
+
+
+def measure(function, repeats, warmup=1):
+    """Median and minimum wall time (seconds) of function() over repeats runs"""
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'median': statistics.median(times), 'min': min(times), 'repeats': repeats}
+
+
+def plant_benchmark(feed_type):
+    def run():
+        MetallurgicalPlant(FEED_COMPOSITION, PROCESS_PARAMS).run_simulation(feed_type)
+    return run
+
+
+def process_sulphide_benchmark():
+    plant = MetallurgicalPlant(FEED_COMPOSITION, PROCESS_PARAMS)
+    return plant.process_sulphide_feed
+
+
+def batch_benchmark(size):
+    rng = np.random.default_rng(0)
+    params = {name: rng.uniform(low, high, size) for name, (low, high, _) in PROCESS_PARAM_RANGES.items()}
+    feed = {metal: grade * rng.uniform(0.5, 1.5, size) for metal, grade in FEED_COMPOSITION.items()}
+
+    def run():
+        run_batch_simulation(feed, params, "Both Feeds")
+    return run
+
+
+def monte_carlo_benchmark(iterations, workers):
+    def run():
+        run_monte_carlo(FEED_COMPOSITION, PROCESS_PARAMS, METAL_PRICES, VARIATION, iterations, workers=workers)
+    return run
+
+
+def page_render_benchmark():
+    from streamlit.testing.v1 import AppTest
+
+    # Keep the page's deprecation notices and bare-mode warnings out of the benchmark report
+    for name in ['streamlit.deprecation_util', 'streamlit.runtime.scriptrunner_utils.script_run_context']:
+        logging.getLogger(name).disabled = True
+    warnings.simplefilter('ignore', FutureWarning)
+
+    def run():
+        app = AppTest.from_file(os.path.join(ROOT, 'metallurgical_simulator.py'), default_timeout=300)
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"Page raised: {app.exception[0].message}")
+    return run
+
+
+def benchmarks():
+    """(name, description, unit samples per run or None, factory, repeats) for every benchmark"""
+    cores = os.cpu_count() or 1
+    suite = [
+        ('plant_oxide', "MetallurgicalPlant.run_simulation, oxide feed", None, lambda: plant_benchmark("Oxide Feed"), 200),
+        ('plant_sulphide', "MetallurgicalPlant.run_simulation, sulphide feed", None,
+         lambda: plant_benchmark("Sulphide Feed"), 200),
+        ('plant_both', "MetallurgicalPlant.run_simulation, both feeds", None, lambda: plant_benchmark("Both Feeds"), 200),
+        ('plant_process_sulphide_feed', "MetallurgicalPlant.process_sulphide_feed", None, process_sulphide_benchmark,
+         200),
+        ('batch_1k', "run_batch_simulation, 1k samples, both feeds", 1000, lambda: batch_benchmark(1000), 50),
+        ('batch_100k', "run_batch_simulation, 100k samples, both feeds", 100000, lambda: batch_benchmark(100000), 10),
+        ('batch_1m', "run_batch_simulation, 1M samples, both feeds", 1000000, lambda: batch_benchmark(1000000), 3),
+        ('monte_carlo_10k', "run_monte_carlo, 10k iterations, 1 worker", 10000,
+         lambda: monte_carlo_benchmark(10000, 1), 5),
+    ]
+    if cores > 1:
+        suite.append((f'monte_carlo_1m_{cores}_workers', f"run_monte_carlo, 1M iterations, {cores} workers", 1000000,
+                      lambda: monte_carlo_benchmark(1000000, cores), 3))
+    suite.append(('page_render', "Full headless script run with streamlit.testing AppTest", None,
+                  page_render_benchmark, 3))
+    return suite
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(only=None, repeat_scale=1.0):
+    results = {}
+    for name, description, samples, factory, repeats in benchmarks():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        try:
+            function = factory()
+        except ImportError as error:
+            print(f"{name:32s} skipped ({error})", file=sys.stderr)
+            continue
+        timing = measure(function, max(1, round(repeats * repeat_scale)))
+        timing['description'] = description
+        if samples:
+            timing['samples_per_second'] = samples / timing['median']
+        results[name] = timing
+        rate = f"  {timing['samples_per_second']:,.0f} samples/s" if samples else ''
+        print(f"{name:32s} {timing['median'] * 1e3:10.3f} ms{rate}", file=sys.stderr)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count()
+        },
+        'benchmarks': results
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Median time ratio to the baseline for every benchmark in both, and the names that regressed"""
+    ratios = {}
+    regressions = []
+    for name, timing in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        ratio = timing['median'] / baseline['benchmarks'][name]['median']
+        ratios[name] = ratio
+        if ratio > 1 + threshold / 100:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline results to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="regression threshold (%% slower than the baseline median)")
+    parser.add_argument('--only', nargs='+', help="run only benchmarks whose names start with these prefixes")
+    parser.add_argument('--quick', action='store_true', help="a fifth of the repeats, for a fast check")
+    parser.add_argument('--update-baseline', action='store_true', help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.only, 0.2 if args.quick else 1.0)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    ratios, regressions = compare(results, baseline, args.threshold)
+    print(f"\nCompared with baseline {baseline['meta'].get('commit')} ({args.threshold:g}% threshold):",
+          file=sys.stderr)
+    for name, ratio in ratios.items():
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:32s} {ratio:6.2f}x{flag}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
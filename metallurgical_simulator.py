@@ -1,77 +1,271 @@
-total_concentrate = cu_concentrate_mass + ni_concentrate_mass
-        if not self.validate_material_flow("Pressure Oxidation", total_concentrate, pressure_ox_capacity, "sulphide"):
-            pressure_ox_efficiency = pressure_ox_efficiency * 0.95  # Reduced efficiency when overloaded
-        
-        # Apply pressure oxidation to concentrates
-        cu_after_pressure_ox = cu_in_concentrate * pressure_ox_efficiency
-        pd_cu_after_pressure_ox = pd_in_cu_concentrate * pressure_ox_efficiency
-        pt_cu_after_pressure_ox = pt_in_cu_concentrate * pressure_ox_efficiency
-        au_cu_after_pressure_ox = au_in_cu_concentrate * pressure_ox_efficiency
-        
-        ni_after_pressure_ox = ni_in_concentrate * pressure_ox_efficiency
-        co_after_pressure_ox = co_in_concentrate * pressure_ox_efficiency
-        pd_ni_after_pressure_ox = pd_in_ni_concentrate * pressure_ox_efficiency
-        pt_ni_after_pressure_ox = pt_in_ni_concentrate * pressure_ox_efficiency
-        au_ni_after_pressure_ox = au_in_ni_concentrate * pressure_ox_efficiency
-        
-        # Stage 7: Final Metal Recovery
-        final_cu_recovery = self.process_params['final_cu_recovery'] / 100
-        final_pd_recovery = self.process_params['final_pd_recovery'] / 100
-        final_pt_recovery = self.process_params['final_pt_recovery'] / 100
-        final_au_recovery = self.process_params['final_au_recovery'] / 100
-        final_ni_recovery = self.process_params['final_ni_recovery'] / 100
-        final_co_recovery = self.process_params['final_co_recovery'] / 100
-        
-        # Final metal production
-        cu_final = cu_after_pressure_ox * final_cu_recovery
-        pd_final = (pd_cu_after_pressure_ox + pd_ni_after_pressure_ox) * final_pd_recovery
-        pt_final = (pt_cu_after_pressure_ox + pt_ni_after_pressure_ox) * final_pt_recovery
-        au_final = (au_cu_after_pressure_ox + au_ni_after_pressure_ox) * final_au_recovery
-        ni_final = ni_after_pressure_ox * final_ni_recovery
-        co_final = co_after_pressure_ox * final_co_recovery
-        
-        # Store detailed stage results with capacity information
-        self.stage_results['sulphide'] = {
-            'feed': {'mass': feed_mass, 'cu': feed_cu, 'pd': feed_pd, 'pt': feed_pt, 'au': feed_au, 'ni': feed_ni, 'co': feed_co},
-            'crushing': {'mass': crushed_mass, 'cu': crushed_cu, 'pd': crushed_pd, 'pt': crushed_pt, 'au': crushed_au, 'ni': crushed_ni, 'co': crushed_co, 'losses': crushing_losses, 'capacity': crushing_capacity},
-            'grinding': {'mass': ground_mass, 'cu': ground_cu, 'pd': ground_pd, 'pt': ground_pt, 'au': ground_au, 'ni': ground_ni, 'co': ground_co, 'losses': grinding_losses, 'capacity': grinding_capacity},
-            'cu_flotation': {'concentrate_mass': cu_concentrate_mass, 'cu': cu_in_concentrate, 'pd': pd_in_cu_concentrate, 'pt': pt_in_cu_concentrate, 'au': au_in_cu_concentrate, 'capacity': cu_flotation_capacity},
-            'ni_flotation': {'concentrate_mass': ni_concentrate_mass, 'ni': ni_in_concentrate, 'co': co_in_concentrate, 'pd': pd_in_ni_concentrate, 'pt': pt_in_ni_concentrate, 'au': au_in_ni_concentrate, 'capacity': ni_flotation_capacity},
-            'pressure_oxidation': {'cu': cu_after_pressure_ox, 'ni': ni_after_pressure_ox, 'co': co_after_pressure_ox, 'capacity': pressure_ox_capacity},
-            'final_products': {'cu': cu_final, 'pd': pd_final, 'pt': pt_final, 'au': au_final, 'ni': ni_final, 'co': co_final},
-            'tailings': {'mass': flotation_tailings}
-        }
-        
-        self.results['sulphide'] = {
-            'feed_mass': feed_mass,
-            'crushed_mass': crushed_mass,
-            'ground_mass': ground_mass,
-            'cu_concentrate_mass': cu_concentrate_mass,
-            'ni_concentrate_mass': ni_concentrate_mass,
-            'cu_recovered': cu_final,
-            'pd_recovered': pd_final,
-            'pt_recovered': pt_final,
-            'au_recovered': au_final,
-            'ni_recovered': ni_final,
-            'co_recovered': co_final,
-            'tailings_mass': flotation_tailings
-        }
-        
-    def run_simulation(self):
-        """Run the complete simulation with material flow validation"""
-        # Clear previous warnings and bottlenecks
-        self.material_flow_warnings = []
-        self.bottlenecks = []
-        
-        if feed_type in ["Oxide Feed", "Both Feeds"]:
-            self.process_oxide_feed()
-        if feed_type in ["Sulphide Feed", "Both Feeds"]:
-            self.process_sulphide_feed()
-            
-        # Check for process bottlenecks after simulation
-        self.check_process_bottlenecks()
+import os
+import time
+from functools import wraps
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+import plotly.express as px
+from plotly.subplots import make_subplots
+
+from pge_sim import METALS, mtpa_to_tph, profiling, scenario_feed_composition, scenarios
+from pge_sim.aggregate import DENSITY_BINS, density, downsample_index, histogram
+from pge_sim.blocks import block_model_summary
+from pge_sim.cache import assay_grade_model, cache_stats, simulate_plant, stage_tables
+from pge_sim.cutoff import CUTOFF_KEYS, GradeTonnage
+from pge_sim.grades import DEFAULT_GRADE_CORRELATION, covariance_grade_model
+from pge_sim.montecarlo import run_monte_carlo, stream_monte_carlo
+from pge_sim.reliability import FAILURE_MODES, run_risk_analysis, value_risk
+from pge_sim.sampling import SAMPLERS
+from pge_sim.optimize import optimize_process
+from pge_sim.prices import DEFAULT_CORRELATION, DEFAULT_VOLATILITY, PRICE_MODELS, correlation_factor, sample_prices
+from pge_sim.store import fetch_result, result_key, result_store
+from pge_sim.schedule import DEFAULT_ECONOMICS, scenario_npv, schedule_variants
+from pge_sim.sensitivity import input_label, sobol_indices, tornado_analysis
+from pge_sim.timeseries import HOURS_PER_YEAR, expand_profile, period_index, simulate_mine_life
+from pge_sim.revenue import metal_revenue, process_values, total_value, value
+
+# Page configuration
+st.set_page_config(
+    page_title="Metallurgical Plant Simulator",
+    page_icon="⚒️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+
+def profiling_requested():
+    """Whether this session asked for timings (?profile=1 or PGE_SIM_PROFILE=1)"""
+    return profiling.env_enabled() or st.query_params.get('profile') in ('1', 'true')
+
+
+def timings_table(caption):
+    """Table of the timings recorded so far on this thread"""
+    section_timings = profiling.timings()
+    st.dataframe(pd.DataFrame({
+        'Section': list(section_timings),
+        'Calls': [entry['calls'] for entry in section_timings.values()],
+        'Total (ms)': [entry['seconds'] * 1e3 for entry in section_timings.values()],
+        'Per Call (ms)': [entry['seconds'] / entry['calls'] * 1e3 for entry in section_timings.values()]
+    }).round(2), hide_index=True, use_container_width=True)
+    st.caption(caption)
+
+
+def profiled_fragment(function):
+    """st.fragment that times its own reruns and shows them in place.
+
+    Interacting with a fragment reruns only its body, so the page-level
+    profiling setup and the sidebar timings do not run; on a full run the
+    fragment is timed as part of the page instead.
+    """
+    @st.fragment
+    @wraps(function)
+    def fragment(*args, **kwargs):
+        if profiling.page_running():
+            return function(*args, **kwargs)
+        profiling.start_page(profiling_requested())
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiling.end_page()
+            if profiling.enabled():
+                with st.expander("⏱️ Performance (this section's last rerun)"):
+                    timings_table("Times are inclusive, as in the sidebar table, and cover only this section's rerun.")
+
+    return fragment
+
+
+# Opt-in per-section timings (?profile=1 or PGE_SIM_PROFILE=1), shown in the sidebar after a full rerun
+profiling.start_page(profiling_requested())
+profiling.begin("Sidebar inputs")
+
+
+def plotly_chart(figure, **kwargs):
+    """st.plotly_chart, timed as Plotly serialization when profiling"""
+    with profiling.section("Plotly serialization"):
+        st.plotly_chart(figure, **kwargs)
+
+
+def histogram_bar(counts, edges, **kwargs):
+    """Bar trace of a histogram binned on the server, so the chart never carries raw samples"""
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), **kwargs)
+
+
+# Title and description
+st.title("⚒️ Metallurgical Plant Process Simulator")
+st.markdown("Simulate the processing of oxide and sulphide feeds through a complete metallurgical plant")
+
+# Sidebar for input parameters
+st.sidebar.header("Production Scenario Selection")
+
+# Production scenario selection
+production_scenario = st.sidebar.selectbox(
+    "Select Production Scenario:",
+    ["15Mtpa Case", "30Mtpa Case", "Custom"]
+)
+
+# Feed selection
+feed_type = st.sidebar.selectbox("Select Feed Type:", ["Oxide Feed", "Sulphide Feed", "Both Feeds"])
+
+if production_scenario == "Custom":
+    # Custom input parameters
+    st.sidebar.subheader("Feed Composition")
+    
+    # Calculate individual metal grades from 3E grade
+    total_3e_grade = st.sidebar.slider("3E Grade (Pd+Pt+Au) g/t", 0.1, 2.0, 0.95, 0.05)
+    
+    # Approximate split of 3E metals (based on typical ratios)
+    pd_ratio = st.sidebar.slider("Pd ratio in 3E (%)", 30, 70, 50, 5) / 100
+    pt_ratio = st.sidebar.slider("Pt ratio in 3E (%)", 20, 50, 30, 5) / 100
+    au_ratio = 1 - pd_ratio - pt_ratio
+    
+    pd_grade = total_3e_grade * pd_ratio / 1000  # Convert g/t to %
+    pt_grade = total_3e_grade * pt_ratio / 1000
+    au_grade = total_3e_grade * au_ratio / 1000
+    
+    cu_grade = st.sidebar.slider("Copper (%)", 0.05, 0.5, 0.11, 0.01)
+    ni_grade = st.sidebar.slider("Nickel (%)", 0.05, 0.5, 0.16, 0.01) if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
+    co_grade = st.sidebar.slider("Cobalt (%)", 0.005, 0.05, 0.017, 0.001) if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
+    
+    # Process parameters
+    st.sidebar.subheader("Process Parameters")
+    oxide_throughput_mtpa = st.sidebar.slider("Oxide Throughput (Mtpa)", 0.5, 5.0, 2.0, 0.5)
+    sulphide_throughput_mtpa = st.sidebar.slider("Sulphide Throughput (Mtpa)", 5.0, 35.0, 15.0, 2.5)
+    
+    # Convert to tonnes per hour
+    oxide_throughput = mtpa_to_tph(oxide_throughput_mtpa)
+    sulphide_throughput = mtpa_to_tph(sulphide_throughput_mtpa)
+    
+    # Recovery rates
+    st.sidebar.subheader("Recovery Rates (%)")
+    pd_recovery = st.sidebar.slider("Pd Recovery", 70, 85, 78, 1)
+    pt_recovery = st.sidebar.slider("Pt Recovery", 35, 55, 45, 1)
+    au_recovery = st.sidebar.slider("Au Recovery", 60, 75, 66, 1)
+    ni_recovery = st.sidebar.slider("Ni Recovery", 35, 50, 43, 1)
+    cu_recovery = st.sidebar.slider("Cu Recovery", 70, 85, 80, 1)
+    co_recovery = st.sidebar.slider("Co Recovery", 35, 50, 42, 1)
+    
+else:
+    # Use predefined scenario
+    scenario_data = scenarios[production_scenario]
+    
+    st.sidebar.subheader(f"{production_scenario} Parameters")
+    st.sidebar.write(f"**Total Material to be Mined:** {scenario_data['total_mined']} Mt")
+    st.sidebar.write(f"**Total Material Processed:** {scenario_data['total_processed']} Mt")
+    st.sidebar.write(f"**Mine Life (Sulphide):** {scenario_data['mine_life_sulphide']} years")
+    st.sidebar.write(f"**Mine Life (Oxide):** {scenario_data['mine_life_oxide']} years")
+    
+    # Set grades based on scenario (typical 3E metal split)
+    scenario_feed = scenario_feed_composition(scenario_data, feed_type)
+    pd_grade = scenario_feed['Pd']
+    pt_grade = scenario_feed['Pt']
+    au_grade = scenario_feed['Au']
+    cu_grade = scenario_feed['Cu']
+    ni_grade = scenario_feed['Ni']
+    co_grade = scenario_feed['Co']
+    
+    # Set throughput (convert Mtpa to t/h)
+    oxide_throughput = mtpa_to_tph(scenario_data['oxide_throughput'])
+    sulphide_throughput = mtpa_to_tph(scenario_data['sulphide_throughput'])
+    
+    # Set recovery rates
+    pd_recovery = scenario_data['pd_recovery']
+    pt_recovery = scenario_data['pt_recovery']
+    au_recovery = scenario_data['au_recovery']
+    ni_recovery = scenario_data['ni_recovery']
+    cu_recovery = scenario_data['cu_recovery']
+    co_recovery = scenario_data['co_recovery']
+
+# Additional process parameters
+st.sidebar.subheader("Process Stage Parameters")
+
+# Oxide Process Controls
+if feed_type in ["Oxide Feed", "Both Feeds"]:
+    st.sidebar.write("**Oxide Process Controls:**")
+    oxide_feed_rate = st.sidebar.number_input("Oxide Feed Rate (t/h)", 100, 2000, int(oxide_throughput), 50, key="oxide_feed")
+    sizing_efficiency = st.sidebar.slider("Sizing Efficiency (%)", 85, 99, 98, 1, key="sizing_eff")
+    oxide_grinding_efficiency = st.sidebar.slider("Oxide Grinding Efficiency (%)", 85, 98, 92, 1, key="oxide_grind_eff")
+    leaching_efficiency = st.sidebar.slider("Leaching Efficiency (%)", 80, 95, 88, 1, key="leach_eff")
+    
+    # Individual metal recoveries in leaching
+    st.sidebar.write("*Leaching Metal Recoveries:*")
+    oxide_pd_recovery = st.sidebar.slider("Oxide Pd Recovery (%)", 70, 85, pd_recovery, 1, key="oxide_pd_rec")
+    oxide_au_recovery = st.sidebar.slider("Oxide Au Recovery (%)", 85, 95, 90, 1, key="oxide_au_rec")
+else:
+    oxide_feed_rate = 0
+    sizing_efficiency = 98
+    oxide_grinding_efficiency = 92
+    leaching_efficiency = 88
+    oxide_pd_recovery = 75
+    oxide_au_recovery = 90
+
+# Sulphide Process Controls
+if feed_type in ["Sulphide Feed", "Both Feeds"]:
+    st.sidebar.write("**Sulphide Process Controls:**")
+    sulphide_feed_rate = st.sidebar.number_input("Sulphide Feed Rate (t/h)", 500, 5000, int(sulphide_throughput), 100, key="sulphide_feed")
+    crushing_efficiency = st.sidebar.slider("Crushing Efficiency (%)", 90, 99, 98, 1, key="crush_eff")
+    sulphide_grinding_efficiency = st.sidebar.slider("Sulphide Grinding Efficiency (%)", 85, 98, 92, 1, key="sulphide_grind_eff")
+    
+    # Flotation stage controls
+    st.sidebar.write("*Flotation Stage Controls:*")
+    cu_flotation_efficiency = st.sidebar.slider("Cu Flotation Efficiency (%)", 75, 95, 85, 1, key="cu_flot_eff")
+    cu_flotation_recovery = st.sidebar.slider("Cu Flotation Recovery (%)", 70, 85, cu_recovery, 1, key="cu_flot_rec")
+    
+    ni_flotation_efficiency = st.sidebar.slider("Ni Flotation Efficiency (%)", 70, 90, 80, 1, key="ni_flot_eff")
+    ni_flotation_recovery = st.sidebar.slider("Ni Flotation Recovery (%)", 35, 50, ni_recovery, 1, key="ni_flot_rec")
+    co_flotation_recovery = st.sidebar.slider("Co Flotation Recovery (%)", 35, 50, co_recovery, 1, key="co_flot_rec")
+    
+    # PGM distribution in concentrates
+    st.sidebar.write("*PGM Distribution:*")
+    pgm_to_cu_concentrate = st.sidebar.slider("PGMs to Cu Concentrate (%)", 60, 85, 70, 5, key="pgm_cu_dist")
+    pgm_to_ni_concentrate = st.sidebar.slider("PGMs to Ni Concentrate (%)", 10, 35, 25, 5, key="pgm_ni_dist")
+    
+    # Downstream processing
+    st.sidebar.write("*Downstream Processing:*")
+    pressure_oxidation_efficiency = st.sidebar.slider("Pressure Oxidation Efficiency (%)", 90, 98, 95, 1, key="press_ox_eff")
+    
+    # Final metal recoveries from concentrates
+    st.sidebar.write("*Final Metal Recovery from Concentrates:*")
+    final_cu_recovery = st.sidebar.slider("Final Cu Recovery (%)", 85, 98, 95, 1, key="final_cu_rec")
+    final_pd_recovery = st.sidebar.slider("Final Pd Recovery (%)", 85, 98, pd_recovery, 1, key="final_pd_rec")
+    final_pt_recovery = st.sidebar.slider("Final Pt Recovery (%)", 80, 95, pt_recovery, 1, key="final_pt_rec")
+    final_au_recovery = st.sidebar.slider("Final Au Recovery (%)", 85, 98, au_recovery, 1, key="final_au_rec")
+    final_ni_recovery = st.sidebar.slider("Final Ni Recovery (%)", 85, 98, 92, 1, key="final_ni_rec")
+    final_co_recovery = st.sidebar.slider("Final Co Recovery (%)", 85, 98, 90, 1, key="final_co_rec")
+else:
+    sulphide_feed_rate = 0
+    crushing_efficiency = 98
+    sulphide_grinding_efficiency = 92
+    cu_flotation_efficiency = 85
+    cu_flotation_recovery = 80
+    ni_flotation_efficiency = 80
+    ni_flotation_recovery = 43
+    co_flotation_recovery = 42
+    pgm_to_cu_concentrate = 70
+    pgm_to_ni_concentrate = 25
+    pressure_oxidation_efficiency = 95
+    final_cu_recovery = 95
+    final_pd_recovery = 78
+    final_pt_recovery = 45
+    final_au_recovery = 66
+    final_ni_recovery = 92
+    final_co_recovery = 90
+
+# Interactive metal prices
+st.sidebar.subheader("Metal Prices (USD/kg)")
+metal_prices = {
+    'Cu': st.sidebar.number_input("Copper Price", 1.0, 20.0, 8.5, 0.1),
+    'Pd': st.sidebar.number_input("Palladium Price", 10000, 80000, 32000, 1000),
+    'Pt': st.sidebar.number_input("Platinum Price", 10000, 60000, 28000, 1000),
+    'Au': st.sidebar.number_input("Gold Price", 30000, 100000, 65000, 1000),
+    'Ni': st.sidebar.number_input("Nickel Price", 5.0, 50.0, 18.0, 1.0),
+    'Co': st.sidebar.number_input("Cobalt Price", 10.0, 80.0, 35.0, 1.0)
+}
+
+profiling.begin("Base simulation")
 
-# Create plant instance and run simulation
+# Run the plant simulation (memoized on feed composition and process parameters)
 feed_composition = {
     'Cu': cu_grade,
     'Pd': pd_grade,
@@ -107,8 +301,10 @@ process_params = {
     'final_co_recovery': final_co_recovery
 }
 
-plant = MetallurgicalPlant(feed_composition, process_params)
-plant.run_simulation()
+plant = simulate_plant(feed_composition, process_params, feed_type)
+plant_tables = stage_tables(feed_composition, process_params, feed_type)
+
+profiling.begin("Overview")
 
 # Display scenario information
 if production_scenario != "Custom":
@@ -146,527 +342,525 @@ with col3:
         total_throughput += sulphide_feed_rate
     st.metric("Total Feed Rate", f"{total_throughput:.0f} t/h")
 
-# Stage-by-Stage Process Analysis
-if 'oxide' in plant.stage_results or 'sulphide' in plant.stage_results:
-    st.subheader("🔄 Stage-by-Stage Process Analysis")
-    
-    # Oxide process stages
-    if 'oxide' in plant.stage_results:
-        st.write("**Oxide Process Flow:**")
+
+@profiled_fragment
+def stage_analysis_section(plant, plant_tables, feed_type):
+    """Stage-by-stage tables, process efficiencies and material flow warnings"""
+    profiling.begin("Stage tables")
+
+    # Stage-by-Stage Process Analysis
+    if 'oxide' in plant.stage_results or 'sulphide' in plant.stage_results:
+        st.subheader("🔄 Stage-by-Stage Process Analysis")
+        
+        # Oxide process stages
+        if 'oxide' in plant.stage_results:
+            st.write("**Oxide Process Flow:**")
+            oxide_stages = plant.stage_results['oxide']
+            
+            # Detailed oxide process table
+            oxide_df = plant_tables['oxide_process']
+            st.dataframe(oxide_df, use_container_width=True)
+            
+            # Process losses breakdown
+            st.write("**Oxide Process Losses:**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Sizing Losses", f"{oxide_stages['sizing']['losses']:.1f} t/h")
+            with col2:
+                st.metric("Grinding Losses", f"{oxide_stages['grinding']['losses']:.1f} t/h")
+
+        # Sulphide process stages
+        if 'sulphide' in plant.stage_results:
+            st.write("**Sulphide Process Flow:**")
+            sulphide_stages = plant.stage_results['sulphide']
+            
+            # Main process stages table
+            sulphide_df = plant_tables['sulphide_process']
+            st.dataframe(sulphide_df, use_container_width=True)
+            
+            # PGM distribution analysis
+            st.write("**PGM Distribution Through Process:**")
+            pgm_df = plant_tables['pgm_distribution']
+            st.dataframe(pgm_df, use_container_width=True)
+            
+            # Process losses breakdown
+            st.write("**Sulphide Process Losses:**")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Crushing Losses", f"{sulphide_stages['crushing']['losses']:.1f} t/h")
+            with col2:
+                st.metric("Grinding Losses", f"{sulphide_stages['grinding']['losses']:.1f} t/h")
+            with col3:
+                total_losses = sulphide_stages['crushing']['losses'] + sulphide_stages['grinding']['losses']
+                st.metric("Total Process Losses", f"{total_losses:.1f} t/h")
+
+    profiling.begin("Efficiency analysis")
+
+    # Process efficiency analysis
+    st.subheader("📈 Process Efficiency Analysis")
+
+    if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.stage_results:
+        st.write("**Oxide Process Efficiencies:**")
         oxide_stages = plant.stage_results['oxide']
         
-        # Create detailed oxide process table
-        oxide_process_data = {
-            'Process Stage': ['Feed', 'After Sizing', 'After Grinding', 'Leach Solution', 'Tailings'],
-            'Mass (t/h)': [
-                oxide_stages['feed']['mass'],
-                oxide_stages['sizing']['mass'],
-                oxide_stages['grinding']['mass'],
-                oxide_stages['leaching']['mass'],
-                oxide_stages['tailings']['mass']
-            ],
-            'Pd Content (kg/h)': [
-                oxide_stages['feed']['pd'],
-                oxide_stages['sizing']['pd'],
-                oxide_stages['grinding']['pd'],
-                oxide_stages['leaching']['pd_recovered'],
-                oxide_stages['tailings']['pd']
-            ],
-            'Au Content (kg/h)': [
-                oxide_stages['feed']['au'],
-                oxide_stages['sizing']['au'],
-                oxide_stages['grinding']['au'],
-                oxide_stages['leaching']['au_recovered'],
-                oxide_stages['tailings']['au']
-            ],
-            'Stage Recovery (%)': [
-                100.0,
-                (oxide_stages['sizing']['mass'] / oxide_stages['feed']['mass']) * 100,
-                (oxide_stages['grinding']['mass'] / oxide_stages['sizing']['mass']) * 100,
-                (oxide_stages['leaching']['mass'] / oxide_stages['grinding']['mass']) * 100,
-                ((oxide_stages['grinding']['mass'] - oxide_stages['leaching']['mass']) / oxide_stages['grinding']['mass']) * 100
-            ]
-        }
-        
-        oxide_df = pd.DataFrame(oxide_process_data)
-        st.dataframe(oxide_df, use_container_width=True)
-        
-        # Process losses breakdown
-        st.write("**Oxide Process Losses:**")
-        col1, col2 = st.columns(2)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Sizing Losses", f"{oxide_stages['sizing']['losses']:.1f} t/h")
+            sizing_eff = (oxide_stages['sizing']['mass'] / oxide_stages['feed']['mass']) * 100
+            st.metric("Sizing Efficiency", f"{sizing_eff:.1f}%")
         with col2:
-            st.metric("Grinding Losses", f"{oxide_stages['grinding']['losses']:.1f} t/h")
+            grinding_eff = (oxide_stages['grinding']['mass'] / oxide_stages['sizing']['mass']) * 100
+            st.metric("Grinding Efficiency", f"{grinding_eff:.1f}%")
+        with col3:
+            pd_recovery_eff = (oxide_stages['leaching']['pd_recovered'] / oxide_stages['feed']['pd']) * 100 if oxide_stages['feed']['pd'] > 0 else 0
+            st.metric("Pd Recovery", f"{pd_recovery_eff:.1f}%")
+        with col4:
+            au_recovery_eff = (oxide_stages['leaching']['au_recovered'] / oxide_stages['feed']['au']) * 100 if oxide_stages['feed']['au'] > 0 else 0
+            st.metric("Au Recovery", f"{au_recovery_eff:.1f}%")
 
-    # Sulphide process stages
-    if 'sulphide' in plant.stage_results:
-        st.write("**Sulphide Process Flow:**")
+    if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.stage_results:
+        st.write("**Sulphide Process Efficiencies:**")
         sulphide_stages = plant.stage_results['sulphide']
         
-        # Main process stages table
-        sulphide_process_data = {
-            'Process Stage': ['Feed', 'After Crushing', 'After Grinding', 'Cu Concentrate', 'Ni Concentrate', 'Flotation Tailings'],
-            'Mass (t/h)': [
-                sulphide_stages['feed']['mass'],
-                sulphide_stages['crushing']['mass'],
-                sulphide_stages['grinding']['mass'],
-                sulphide_stages['cu_flotation']['concentrate_mass'],
-                sulphide_stages['ni_flotation']['concentrate_mass'],
-                sulphide_stages['tailings']['mass']
-            ],
-            'Cu Content (kg/h)': [
-                sulphide_stages['feed']['cu'],
-                sulphide_stages['crushing']['cu'],
-                sulphide_stages['grinding']['cu'],
-                sulphide_stages['cu_flotation']['cu'],
-                0,
-                0
-            ],
-            'Ni Content (kg/h)': [
-                sulphide_stages['feed']['ni'],
-                sulphide_stages['crushing']['ni'],
-                sulphide_stages['grinding']['ni'],
-                0,
-                sulphide_stages['ni_flotation']['ni'],
-                0
-            ],
-            'Stage Recovery (%)': [
-                100.0,
-                (sulphide_stages['crushing']['mass'] / sulphide_stages['feed']['mass']) * 100,
-                (sulphide_stages['grinding']['mass'] / sulphide_stages['crushing']['mass']) * 100,
-                (sulphide_stages['cu_flotation']['concentrate_mass'] / sulphide_stages['grinding']['mass']) * 100,
-                (sulphide_stages['ni_flotation']['concentrate_mass'] / (sulphide_stages['grinding']['mass'] - sulphide_stages['cu_flotation']['concentrate_mass'])) * 100,
-                (sulphide_stages['tailings']['mass'] / sulphide_stages['grinding']['mass']) * 100
-            ]
-        }
-        
-        sulphide_df = pd.DataFrame(sulphide_process_data)
-        st.dataframe(sulphide_df, use_container_width=True)
-        
-        # PGM distribution analysis
-        st.write("**PGM Distribution Through Process:**")
-        pgm_distribution_data = {
-            'Metal': ['Pd', 'Pt', 'Au'],
-            'Feed (kg/h)': [
-                sulphide_stages['feed']['pd'],
-                sulphide_stages['feed']['pt'],
-                sulphide_stages['feed']['au']
-            ],
-            'To Cu Concentrate (kg/h)': [
-                sulphide_stages['cu_flotation']['pd'],
-                sulphide_stages['cu_flotation']['pt'],
-                sulphide_stages['cu_flotation']['au']
-            ],
-            'To Ni Concentrate (kg/h)': [
-                sulphide_stages['ni_flotation']['pd'],
-                sulphide_stages['ni_flotation']['pt'],
-                sulphide_stages['ni_flotation']['au']
-            ],
-            'Final Recovery (kg/h)': [
-                sulphide_stages['final_products']['pd'],
-                sulphide_stages['final_products']['pt'],
-                sulphide_stages['final_products']['au']
-            ],
-            'Overall Recovery (%)': [
-                (sulphide_stages['final_products']['pd'] / sulphide_stages['feed']['pd']) * 100 if sulphide_stages['feed']['pd'] > 0 else 0,
-                (sulphide_stages['final_products']['pt'] / sulphide_stages['feed']['pt']) * 100 if sulphide_stages['feed']['pt'] > 0 else 0,
-                (sulphide_stages['final_products']['au'] / sulphide_stages['feed']['au']) * 100 if sulphide_stages['feed']['au'] > 0 else 0
-            ]
-        }
-        
-        pgm_df = pd.DataFrame(pgm_distribution_data)
-        st.dataframe(pgm_df, use_container_width=True)
-        
-        # Process losses breakdown
-        st.write("**Sulphide Process Losses:**")
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
-            st.metric("Crushing Losses", f"{sulphide_stages['crushing']['losses']:.1f} t/h")
+            crushing_eff = (sulphide_stages['crushing']['mass'] / sulphide_stages['feed']['mass']) * 100
+            st.metric("Crushing Efficiency", f"{crushing_eff:.1f}%")
         with col2:
-            st.metric("Grinding Losses", f"{sulphide_stages['grinding']['losses']:.1f} t/h")
+            grinding_eff = (sulphide_stages['grinding']['mass'] / sulphide_stages['crushing']['mass']) * 100
+            st.metric("Grinding Efficiency", f"{grinding_eff:.1f}%")
         with col3:
-            total_losses = sulphide_stages['crushing']['losses'] + sulphide_stages['grinding']['losses']
-            st.metric("Total Process Losses", f"{total_losses:.1f} t/h")
-
-# Process efficiency analysis
-st.subheader("📈 Process Efficiency Analysis")
+            cu_recovery_eff = (sulphide_stages['final_products']['cu'] / sulphide_stages['feed']['cu']) * 100 if sulphide_stages['feed']['cu'] > 0 else 0
+            st.metric("Cu Recovery", f"{cu_recovery_eff:.1f}%")
+        with col4:
+            ni_recovery_eff = (sulphide_stages['final_products']['ni'] / sulphide_stages['feed']['ni']) * 100 if sulphide_stages['feed']['ni'] > 0 else 0
+            st.metric("Ni Recovery", f"{ni_recovery_eff:.1f}%")
+        with col5:
+            overall_mass_recovery = ((sulphide_stages['cu_flotation']['concentrate_mass'] + sulphide_stages['ni_flotation']['concentrate_mass']) / sulphide_stages['feed']['mass']) * 100
+            st.metric("Mass to Concentrates", f"{overall_mass_recovery:.1f}%")
 
-if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.stage_results:
-    st.write("**Oxide Process Efficiencies:**")
-    oxide_stages = plant.stage_results['oxide']
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        sizing_eff = (oxide_stages['sizing']['mass'] / oxide_stages['feed']['mass']) * 100
-        st.metric("Sizing Efficiency", f"{sizing_eff:.1f}%")
-    with col2:
-        grinding_eff = (oxide_stages['grinding']['mass'] / oxide_stages['sizing']['mass']) * 100
-        st.metric("Grinding Efficiency", f"{grinding_eff:.1f}%")
-    with col3:
-        pd_recovery_eff = (oxide_stages['leaching']['pd_recovered'] / oxide_stages['feed']['pd']) * 100 if oxide_stages['feed']['pd'] > 0 else 0
-        st.metric("Pd Recovery", f"{pd_recovery_eff:.1f}%")
-    with col4:
-        au_recovery_eff = (oxide_stages['leaching']['au_recovered'] / oxide_stages['feed']['au']) * 100 if oxide_stages['feed']['au'] > 0 else 0
-        st.metric("Au Recovery", f"{au_recovery_eff:.1f}%")
+    profiling.begin("Material flow analysis")
 
-if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.stage_results:
-    st.write("**Sulphide Process Efficiencies:**")
-    sulphide_stages = plant.stage_results['sulphide']
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        crushing_eff = (sulphide_stages['crushing']['mass'] / sulphide_stages['feed']['mass']) * 100
-        st.metric("Crushing Efficiency", f"{crushing_eff:.1f}%")
-    with col2:
-        grinding_eff = (sulphide_stages['grinding']['mass'] / sulphide_stages['crushing']['mass']) * 100
-        st.metric("Grinding Efficiency", f"{grinding_eff:.1f}%")
-    with col3:
-        cu_recovery_eff = (sulphide_stages['final_products']['cu'] / sulphide_stages['feed']['cu']) * 100 if sulphide_stages['feed']['cu'] > 0 else 0
-        st.metric("Cu Recovery", f"{cu_recovery_eff:.1f}%")
-    with col4:
-        ni_recovery_eff = (sulphide_stages['final_products']['ni'] / sulphide_stages['feed']['ni']) * 100 if sulphide_stages['feed']['ni'] > 0 else 0
-        st.metric("Ni Recovery", f"{ni_recovery_eff:.1f}%")
-    with col5:
-        overall_mass_recovery = ((sulphide_stages['cu_flotation']['concentrate_mass'] + sulphide_stages['ni_flotation']['concentrate_mass']) / sulphide_stages['feed']['mass']) * 100
-        st.metric("Mass to Concentrates", f"{overall_mass_recovery:.1f}%")
-
-# Material Flow Warnings and Bottleneck Analysis
-if plant.material_flow_warnings or plant.bottlenecks:
-    st.subheader("⚠️ Material Flow Analysis")
-    
-    # Material Flow Warnings
-    if plant.material_flow_warnings:
-        st.error("**Material Flow Warnings Detected:**")
+    # Material Flow Warnings and Bottleneck Analysis
+    if plant.material_flow_warnings or plant.bottlenecks:
+        st.subheader("⚠️ Material Flow Analysis")
         
-        for warning in plant.material_flow_warnings:
-            severity_color = {
-                'Critical': '🔴',
-                'High': '🟠', 
-                'Moderate': '🟡'
-            }.get(warning['severity'], '🔵')
+        # Material Flow Warnings
+        if plant.material_flow_warnings:
+            st.error("**Material Flow Warnings Detected:**")
             
-            with st.expander(f"{severity_color} {warning['severity']} - {warning['process_type'].title()} {warning['stage']} Capacity Issue"):
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Required Material", f"{warning['required_mass']:.1f} t/h")
-                    st.metric("Available Material", f"{warning['available_mass']:.1f} t/h")
-                with col2:
-                    st.metric("Material Shortage", f"{warning['shortage']:.1f} t/h")
-                    st.metric("Shortage Percentage", f"{warning['shortage_percent']:.1f}%")
-                with col3:
-                    st.write("**Recommended Actions:**")
-                    if warning['shortage_percent'] > 50:
-                        st.write("- 🔧 Immediate equipment upgrade required")
-                        st.write("- ⚡ Consider parallel processing units")
-                        st.write("- 📉 Reduce upstream feed rate")
-                    elif warning['shortage_percent'] > 25:
-                        st.write("- 🔧 Schedule equipment maintenance")
-                        st.write("- ⚙️ Optimize process parameters")
-                        st.write("- 📊 Monitor closely for deterioration")
-                    else:
-                        st.write("- 👀 Monitor process performance")
-                        st.write("- 🛠️ Plan preventive maintenance")
-    
-    # Process Bottlenecks
-    if plant.bottlenecks:
-        st.warning("**Process Bottlenecks Identified:**")
-        
-        for bottleneck in plant.bottlenecks:
-            with st.expander(f"🚧 {bottleneck['process']} Process - {bottleneck['stage'].title()} Bottleneck"):
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Limiting Throughput", f"{bottleneck['limiting_throughput']:.1f} t/h")
-                    if 'upstream_capacity' in bottleneck:
-                        st.metric("Upstream Capacity", f"{bottleneck['upstream_capacity']:.1f} t/h")
-                    else:
-                        st.metric("Feed Rate", f"{bottleneck['feed_rate']:.1f} t/h")
-                with col2:
-                    st.metric("Efficiency Loss", f"{bottleneck['efficiency_loss']:.1f}%")
-                    potential_gain = bottleneck.get('upstream_capacity', bottleneck.get('feed_rate', 0)) - bottleneck['limiting_throughput']
-                    st.metric("Potential Throughput Gain", f"{potential_gain:.1f} t/h")
-                with col3:
-                    st.write("**Optimization Opportunities:**")
-                    if bottleneck['stage'] == 'grinding':
-                        st.write("- ⚙️ Increase mill capacity")
-                        st.write("- 🔧 Optimize grinding parameters")
-                        st.write("- 📈 Add parallel grinding circuit")
-                    elif bottleneck['stage'] == 'flotation':
-                        st.write("- 🧪 Optimize reagent dosing")
-                        st.write("- ⏱️ Increase flotation residence time")
-                        st.write("- 🔄 Add flotation cells")
-                    else:
-                        st.write("- 🔧 Equipment capacity upgrade")
-                        st.write("- ⚙️ Process parameter optimization")
-                        st.write("- 📊 Operational efficiency improvement")
-
-# Capacity Utilization Analysis
-if 'oxide' in plant.stage_results or 'sulphide' in plant.stage_results:
-    st.subheader("📊 Equipment Capacity Utilization")
-    
-    capacity_data = []
-    
-    if 'oxide' in plant.stage_results:
-        oxide_stages = plant.stage_results['oxide']
-        
-        # Calculate capacity utilization for each oxide stage
-        for stage_name, stage_data in oxide_stages.items():
-            if 'capacity' in stage_data and stage_name != 'feed':
-                utilization = (stage_data['mass'] / stage_data['capacity']) * 100
-                capacity_data.append({
-                    'Process': 'Oxide',
-                    'Stage': stage_name.title(),
-                    'Actual Throughput (t/h)': stage_data['mass'],
-                    'Design Capacity (t/h)': stage_data['capacity'],
-                    'Utilization (%)': utilization,
-                    'Available Capacity (t/h)': stage_data['capacity'] - stage_data['mass'],
-                    'Status': 'Overloaded' if utilization > 100 else 'Critical' if utilization > 90 else 'Normal'
-                })
-    
-    if 'sulphide' in plant.stage_results:
-        sulphide_stages = plant.stage_results['sulphide']
-        
-        # Calculate capacity utilization for each sulphide stage
-        for stage_name, stage_data in sulphide_stages.items():
-            if 'capacity' in stage_data and stage_name != 'feed':
-                if stage_name in ['cu_flotation', 'ni_flotation']:
-                    throughput = stage_data['concentrate_mass']
-                else:
-                    throughput = stage_data['mass']
-                    
-                utilization = (throughput / stage_data['capacity']) * 100
-                capacity_data.append({
-                    'Process': 'Sulphide',
-                    'Stage': stage_name.replace('_', ' ').title(),
-                    'Actual Throughput (t/h)': throughput,
-                    'Design Capacity (t/h)': stage_data['capacity'],
-                    'Utilization (%)': utilization,
-                    'Available Capacity (t/h)': stage_data['capacity'] - throughput,
-                    'Status': 'Overloaded' if utilization > 100 else 'Critical' if utilization > 90 else 'Normal'
-                })
-    
-    if capacity_data:
-        capacity_df = pd.DataFrame(capacity_data)
-        
-        # Color code the dataframe based on status
-        def color_status(val):
-            if val == 'Overloaded':
-                return 'background-color: #ffebee; color: #c62828'
-            elif val == 'Critical':
-                return 'background-color: #fff3e0; color: #ef6c00'
-            else:
-                return 'background-color: #e8f5e8; color: #2e7d32'
-        
-        styled_df = capacity_df.style.applymap(color_status, subset=['Status'])
-        st.dataframe(styled_df, use_container_width=True)
-        
-        # Capacity utilization chart
-        fig_capacity = px.bar(capacity_df, x='Stage', y='Utilization (%)', 
-                             color='Process', barmode='group',
-                             title="Equipment Capacity Utilization by Stage")
-        fig_capacity.add_hline(y=100, line_dash="dash", line_color="red", 
-                              annotation_text="Maximum Capacity")
-        fig_capacity.add_hline(y=90, line_dash="dash", line_color="orange", 
-                              annotation_text="Critical Threshold (90%)")
-        st.plotly_chart(fig_capacity, use_container_width=True)
-        
-        # Summary metrics
-        st.write("**Capacity Utilization Summary:**")
-        col1, col2, col3, col4 = st.columns(4)
+            for warning in plant.material_flow_warnings:
+                severity_color = {
+                    'Critical': '🔴',
+                    'High': '🟠', 
+                    'Moderate': '🟡'
+                }.get(warning['severity'], '🔵')
+                
+                with st.expander(f"{severity_color} {warning['severity']} - {warning['process_type'].title()} {warning['stage']} Capacity Issue"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Required Material", f"{warning['required_mass']:.1f} t/h")
+                        st.metric("Available Material", f"{warning['available_mass']:.1f} t/h")
+                    with col2:
+                        st.metric("Material Shortage", f"{warning['shortage']:.1f} t/h")
+                        st.metric("Shortage Percentage", f"{warning['shortage_percent']:.1f}%")
+                    with col3:
+                        st.write("**Recommended Actions:**")
+                        if warning['shortage_percent'] > 50:
+                            st.write("- 🔧 Immediate equipment upgrade required")
+                            st.write("- ⚡ Consider parallel processing units")
+                            st.write("- 📉 Reduce upstream feed rate")
+                        elif warning['shortage_percent'] > 25:
+                            st.write("- 🔧 Schedule equipment maintenance")
+                            st.write("- ⚙️ Optimize process parameters")
+                            st.write("- 📊 Monitor closely for deterioration")
+                        else:
+                            st.write("- 👀 Monitor process performance")
+                            st.write("- 🛠️ Plan preventive maintenance")
+        
+        # Process Bottlenecks
+        if plant.bottlenecks:
+            st.warning("**Process Bottlenecks Identified:**")
+            
+            for bottleneck in plant.bottlenecks:
+                with st.expander(f"🚧 {bottleneck['process']} Process - {bottleneck['stage'].title()} Bottleneck"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Limiting Throughput", f"{bottleneck['limiting_throughput']:.1f} t/h")
+                        if 'upstream_capacity' in bottleneck:
+                            st.metric("Upstream Capacity", f"{bottleneck['upstream_capacity']:.1f} t/h")
+                        else:
+                            st.metric("Feed Rate", f"{bottleneck['feed_rate']:.1f} t/h")
+                    with col2:
+                        st.metric("Efficiency Loss", f"{bottleneck['efficiency_loss']:.1f}%")
+                        potential_gain = bottleneck.get('upstream_capacity', bottleneck.get('feed_rate', 0)) - bottleneck['limiting_throughput']
+                        st.metric("Potential Throughput Gain", f"{potential_gain:.1f} t/h")
+                    with col3:
+                        st.write("**Optimization Opportunities:**")
+                        if bottleneck['stage'] == 'grinding':
+                            st.write("- ⚙️ Increase mill capacity")
+                            st.write("- 🔧 Optimize grinding parameters")
+                            st.write("- 📈 Add parallel grinding circuit")
+                        elif bottleneck['stage'] == 'flotation':
+                            st.write("- 🧪 Optimize reagent dosing")
+                            st.write("- ⏱️ Increase flotation residence time")
+                            st.write("- 🔄 Add flotation cells")
+                        else:
+                            st.write("- 🔧 Equipment capacity upgrade")
+                            st.write("- ⚙️ Process parameter optimization")
+                            st.write("- 📊 Operational efficiency improvement")
+
+
+stage_analysis_section(plant, plant_tables, feed_type)
+
+
+@profiled_fragment
+def capacity_section(plant, plant_tables):
+    """Capacity utilization table, chart and summary"""
+    profiling.begin("Capacity utilization")
+
+    # Capacity Utilization Analysis
+    if 'oxide' in plant.stage_results or 'sulphide' in plant.stage_results:
+        st.subheader("📊 Equipment Capacity Utilization")
+        
+        capacity_df = plant_tables['capacity']
+        
+        if not capacity_df.empty:
+            # Color code the dataframe based on status
+            def color_status(val):
+                if val == 'Overloaded':
+                    return 'background-color: #ffebee; color: #c62828'
+                elif val == 'Critical':
+                    return 'background-color: #fff3e0; color: #ef6c00'
+                else:
+                    return 'background-color: #e8f5e8; color: #2e7d32'
+            
+            with profiling.section("Capacity table styling"):
+                styled_df = capacity_df.style.applymap(color_status, subset=['Status'])
+                st.dataframe(styled_df, use_container_width=True)
+            
+            # Capacity utilization chart
+            fig_capacity = px.bar(capacity_df, x='Stage', y='Utilization (%)', 
+                                 color='Process', barmode='group',
+                                 title="Equipment Capacity Utilization by Stage")
+            fig_capacity.add_hline(y=100, line_dash="dash", line_color="red", 
+                                  annotation_text="Maximum Capacity")
+            fig_capacity.add_hline(y=90, line_dash="dash", line_color="orange", 
+                                  annotation_text="Critical Threshold (90%)")
+            plotly_chart(fig_capacity, use_container_width=True)
+            
+            # Summary metrics
+            st.write("**Capacity Utilization Summary:**")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                avg_utilization = capacity_df['Utilization (%)'].mean()
+                st.metric("Average Utilization", f"{avg_utilization:.1f}%")
+            with col2:
+                overloaded_count = len(capacity_df[capacity_df['Status'] == 'Overloaded'])
+                st.metric("Overloaded Stages", f"{overloaded_count}")
+            with col3:
+                critical_count = len(capacity_df[capacity_df['Status'] == 'Critical'])
+                st.metric("Critical Stages", f"{critical_count}")
+            with col4:
+                total_spare_capacity = capacity_df['Available Capacity (t/h)'].sum()
+                st.metric("Total Spare Capacity", f"{total_spare_capacity:.1f} t/h")
+
+    else:
+        # Success message when no issues detected
+        st.success("✅ **Material Flow Validation: All Clear**")
+        st.write("No material flow warnings or bottlenecks detected. All process stages have sufficient capacity to handle current throughput rates.")
+
+
+capacity_section(plant, plant_tables)
+
+
+@profiled_fragment
+def visualization_section(plant, feed_type):
+    """Mass balances, process flow charts and metal recovery summary"""
+    profiling.begin("Processing results")
+
+    # Display results
+    col1, col2 = st.columns(2)
+
+    if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.results:
         with col1:
-            avg_utilization = capacity_df['Utilization (%)'].mean()
-            st.metric("Average Utilization", f"{avg_utilization:.1f}%")
+            st.subheader("🔄 Oxide Feed Processing Results")
+            oxide_results = plant.results['oxide']
+            
+            # Mass balance table
+            mass_balance_df = pd.DataFrame({
+                'Process Step': ['Feed', 'After Sizing', 'After Grinding', 'Leach Solution', 'Tailings'],
+                'Mass (t/h)': [
+                    oxide_results['feed_mass'],
+                    oxide_results['sized_mass'],
+                    oxide_results['ground_mass'],
+                    oxide_results['leach_solution_mass'],
+                    oxide_results['tailings_mass']
+                ]
+            })
+            
+            st.dataframe(mass_balance_df, use_container_width=True)
+            
+            # Metal recovery
+            st.write("**Metal Recovery:**")
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Palladium Recovery", f"{oxide_results['pd_recovered']:.2f} kg/h")
+            with col_b:
+                st.metric("Gold Recovery", f"{oxide_results['au_recovered']:.2f} kg/h")
+
+    if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.results:
         with col2:
-            overloaded_count = len(capacity_df[capacity_df['Status'] == 'Overloaded'])
-            st.metric("Overloaded Stages", f"{overloaded_count}")
-        with col3:
-            critical_count = len(capacity_df[capacity_df['Status'] == 'Critical'])
-            st.metric("Critical Stages", f"{critical_count}")
-        with col4:
-            total_spare_capacity = capacity_df['Available Capacity (t/h)'].sum()
-            st.metric("Total Spare Capacity", f"{total_spare_capacity:.1f} t/h")
+            st.subheader("⚡ Sulphide Feed Processing Results")
+            sulphide_results = plant.results['sulphide']
+            
+            # Mass balance table
+            mass_balance_df = pd.DataFrame({
+                'Process Step': ['Feed', 'After Crushing', 'After Grinding', 'Cu Concentrate', 'Ni Concentrate', 'Tailings'],
+                'Mass (t/h)': [
+                    sulphide_results['feed_mass'],
+                    sulphide_results['crushed_mass'],
+                    sulphide_results['ground_mass'],
+                    sulphide_results['cu_concentrate_mass'],
+                    sulphide_results['ni_concentrate_mass'],
+                    sulphide_results['tailings_mass']
+                ]
+            })
+            
+            st.dataframe(mass_balance_df, use_container_width=True)
+            
+            # Metal recovery
+            st.write("**Final Metal Production:**")
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Copper", f"{sulphide_results['cu_recovered']:.2f} kg/h")
+                st.metric("Palladium", f"{sulphide_results['pd_recovered']:.2f} kg/h")
+            with col_b:
+                st.metric("Platinum", f"{sulphide_results['pt_recovered']:.2f} kg/h")
+                st.metric("Gold", f"{sulphide_results['au_recovered']:.2f} kg/h")
+            with col_c:
+                st.metric("Nickel", f"{sulphide_results['ni_recovered']:.2f} kg/h")
+                st.metric("Cobalt", f"{sulphide_results['co_recovered']:.2f} kg/h")
 
-else:
-    # Success message when no issues detected
-    st.success("✅ **Material Flow Validation: All Clear**")
-    st.write("No material flow warnings or bottlenecks detected. All process stages have sufficient capacity to handle current throughput rates.")
+    profiling.begin("Process flow charts")
 
-# Display results
-col1, col2 = st.columns(2)
+    # Process flow visualization
+    st.subheader("📊 Process Flow Visualization")
 
-if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.results:
-    with col1:
-        st.subheader("🔄 Oxide Feed Processing Results")
-        oxide_results = plant.results['oxide']
+    # Create flow chart data for visualization
+    if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.results:
+        fig_oxide = go.Figure()
+        
+        # Oxide process flow
+        steps = ['Feed', 'Sizing', 'Grinding', 'Leaching', 'Tailings Storage']
+        masses = [
+            plant.results['oxide']['feed_mass'],
+            plant.results['oxide']['sized_mass'],
+            plant.results['oxide']['ground_mass'],
+            plant.results['oxide']['leach_solution_mass'],
+            plant.results['oxide']['tailings_mass']
+        ]
+        
+        fig_oxide.add_trace(go.Scatter(
+            x=list(range(len(steps))),
+            y=masses,
+            mode='lines+markers',
+            name='Mass Flow',
+            line=dict(color='orange', width=3),
+            marker=dict(size=10)
+        ))
+        
+        fig_oxide.update_layout(
+            title="Oxide Feed Mass Flow Through Plant",
+            xaxis_title="Process Step",
+            yaxis_title="Mass (tonnes/hour)",
+            xaxis=dict(tickmode='array', tickvals=list(range(len(steps))), ticktext=steps)
+        )
         
-        # Mass balance table
-        mass_balance_df = pd.DataFrame({
-            'Process Step': ['Feed', 'After Sizing', 'After Grinding', 'Leach Solution', 'Tailings'],
-            'Mass (t/h)': [
-                oxide_results['feed_mass'],
-                oxide_results['sized_mass'],
-                oxide_results['ground_mass'],
-                oxide_results['leach_solution_mass'],
-                oxide_results['tailings_mass']
-            ]
-        })
+        plotly_chart(fig_oxide, use_container_width=True)
+
+    if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.results:
+        fig_sulphide = go.Figure()
+        
+        # Sulphide process flow
+        steps = ['Feed', 'Crushing', 'Grinding', 'Cu Flotation', 'Ni Flotation', 'Final Products']
+        masses = [
+            plant.results['sulphide']['feed_mass'],
+            plant.results['sulphide']['crushed_mass'],
+            plant.results['sulphide']['ground_mass'],
+            plant.results['sulphide']['cu_concentrate_mass'],
+            plant.results['sulphide']['ni_concentrate_mass'],
+            plant.results['sulphide']['cu_recovered'] + plant.results['sulphide']['ni_recovered']
+        ]
+        
+        fig_sulphide.add_trace(go.Scatter(
+            x=list(range(len(steps))),
+            y=masses,
+            mode='lines+markers',
+            name='Mass Flow',
+            line=dict(color='blue', width=3),
+            marker=dict(size=10)
+        ))
+        
+        fig_sulphide.update_layout(
+            title="Sulphide Feed Mass Flow Through Plant",
+            xaxis_title="Process Step",
+            yaxis_title="Mass (tonnes/hour)",
+            xaxis=dict(tickmode='array', tickvals=list(range(len(steps))), ticktext=steps)
+        )
         
-        st.dataframe(mass_balance_df, use_container_width=True)
+        plotly_chart(fig_sulphide, use_container_width=True)
+
+    profiling.begin("Recovery summary")
+
+    # Metal recovery comparison chart
+    st.subheader("🏆 Metal Recovery Summary")
+
+    if feed_type == "Both Feeds" and 'oxide' in plant.results and 'sulphide' in plant.results:
+        # Combined recovery chart
+        metals = ['Pd', 'Pt', 'Au', 'Cu', 'Ni', 'Co']
+        oxide_recovery = [
+            plant.results['oxide']['pd_recovered'],
+            0,  # No Pt in oxide path
+            plant.results['oxide']['au_recovered'],
+            0, 0, 0  # No Cu, Ni, Co in oxide path
+        ]
+        sulphide_recovery = [
+            plant.results['sulphide']['pd_recovered'],
+            plant.results['sulphide']['pt_recovered'],
+            plant.results['sulphide']['au_recovered'],
+            plant.results['sulphide']['cu_recovered'],
+            plant.results['sulphide']['ni_recovered'],
+            plant.results['sulphide']['co_recovered']
+        ]
+        
+        fig_recovery = go.Figure(data=[
+            go.Bar(name='Oxide Feed', x=metals, y=oxide_recovery, marker_color='orange'),
+            go.Bar(name='Sulphide Feed', x=metals, y=sulphide_recovery, marker_color='blue')
+        ])
+        
+        fig_recovery.update_layout(
+            title="Metal Recovery Comparison (kg/h)",
+            xaxis_title="Metals",
+            yaxis_title="Recovery (kg/h)",
+            barmode='group'
+        )
         
-        # Metal recovery
-        st.write("**Final Metal Production:**")
-        col_a, col_b, col_c = st.columns(3)
-        with col_a:
-            st.metric("Copper", f"{sulphide_results['cu_recovered']:.2f} kg/h")
-            st.metric("Palladium", f"{sulphide_results['pd_recovered']:.2f} kg/h")
-        with col_b:
-            st.metric("Platinum", f"{sulphide_results['pt_recovered']:.2f} kg/h")
-            st.metric("Gold", f"{sulphide_results['au_recovered']:.2f} kg/h")
-        with col_c:
-            st.metric("Nickel", f"{sulphide_results['ni_recovered']:.2f} kg/h")
-            st.metric("Cobalt", f"{sulphide_results['co_recovered']:.2f} kg/h")
-
-# Process flow visualization
-st.subheader("📊 Process Flow Visualization")
-
-# Create flow chart data for visualization
-if feed_type in ["Oxide Feed", "Both Feeds"] and 'oxide' in plant.results:
-    fig_oxide = go.Figure()
-    
-    # Oxide process flow
-    steps = ['Feed', 'Sizing', 'Grinding', 'Leaching', 'Tailings Storage']
-    masses = [
-        plant.results['oxide']['feed_mass'],
-        plant.results['oxide']['sized_mass'],
-        plant.results['oxide']['ground_mass'],
-        plant.results['oxide']['leach_solution_mass'],
-        plant.results['oxide']['tailings_mass']
-    ]
-    
-    fig_oxide.add_trace(go.Scatter(
-        x=list(range(len(steps))),
-        y=masses,
-        mode='lines+markers',
-        name='Mass Flow',
-        line=dict(color='orange', width=3),
-        marker=dict(size=10)
-    ))
-    
-    fig_oxide.update_layout(
-        title="Oxide Feed Mass Flow Through Plant",
-        xaxis_title="Process Step",
-        yaxis_title="Mass (tonnes/hour)",
-        xaxis=dict(tickmode='array', tickvals=list(range(len(steps))), ticktext=steps)
-    )
-    
-    st.plotly_chart(fig_oxide, use_container_width=True)
+        plotly_chart(fig_recovery, use_container_width=True)
 
-if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.results:
-    fig_sulphide = go.Figure()
-    
-    # Sulphide process flow
-    steps = ['Feed', 'Crushing', 'Grinding', 'Cu Flotation', 'Ni Flotation', 'Final Products']
-    masses = [
-        plant.results['sulphide']['feed_mass'],
-        plant.results['sulphide']['crushed_mass'],
-        plant.results['sulphide']['ground_mass'],
-        plant.results['sulphide']['cu_concentrate_mass'],
-        plant.results['sulphide']['ni_concentrate_mass'],
-        plant.results['sulphide']['cu_recovered'] + plant.results['sulphide']['ni_recovered']
-    ]
-    
-    fig_sulphide.add_trace(go.Scatter(
-        x=list(range(len(steps))),
-        y=masses,
-        mode='lines+markers',
-        name='Mass Flow',
-        line=dict(color='blue', width=3),
-        marker=dict(size=10)
-    ))
-    
-    fig_sulphide.update_layout(
-        title="Sulphide Feed Mass Flow Through Plant",
-        xaxis_title="Process Step",
-        yaxis_title="Mass (tonnes/hour)",
-        xaxis=dict(tickmode='array', tickvals=list(range(len(steps))), ticktext=steps)
-    )
-    
-    st.plotly_chart(fig_sulphide, use_container_width=True)
-
-# Metal recovery comparison chart
-st.subheader("🏆 Metal Recovery Summary")
-
-if feed_type == "Both Feeds" and 'oxide' in plant.results and 'sulphide' in plant.results:
-    # Combined recovery chart
-    metals = ['Pd', 'Pt', 'Au', 'Cu', 'Ni', 'Co']
-    oxide_recovery = [
-        plant.results['oxide']['pd_recovered'],
-        0,  # No Pt in oxide path
-        plant.results['oxide']['au_recovered'],
-        0, 0, 0  # No Cu, Ni, Co in oxide path
-    ]
-    sulphide_recovery = [
-        plant.results['sulphide']['pd_recovered'],
-        plant.results['sulphide']['pt_recovered'],
-        plant.results['sulphide']['au_recovered'],
-        plant.results['sulphide']['cu_recovered'],
-        plant.results['sulphide']['ni_recovered'],
-        plant.results['sulphide']['co_recovered']
-    ]
-    
-    fig_recovery = go.Figure(data=[
-        go.Bar(name='Oxide Feed', x=metals, y=oxide_recovery, marker_color='orange'),
-        go.Bar(name='Sulphide Feed', x=metals, y=sulphide_recovery, marker_color='blue')
-    ])
-    
-    fig_recovery.update_layout(
-        title="Metal Recovery Comparison (kg/h)",
-        xaxis_title="Metals",
-        yaxis_title="Recovery (kg/h)",
-        barmode='group'
-    )
-    
-    st.plotly_chart(fig_recovery, use_container_width=True)
+    elif 'oxide' in plant.results:
+        metals = ['Pd', 'Au']
+        recovery = [plant.results['oxide']['pd_recovered'], plant.results['oxide']['au_recovered']]
+        
+        fig_recovery = px.bar(x=metals, y=recovery, title="Oxide Feed Metal Recovery (kg/h)",
+                             color=metals, color_discrete_sequence=['orange', 'gold'])
+        plotly_chart(fig_recovery, use_container_width=True)
 
-elif 'oxide' in plant.results:
-    metals = ['Pd', 'Au']
-    recovery = [plant.results['oxide']['pd_recovered'], plant.results['oxide']['au_recovered']]
-    
-    fig_recovery = px.bar(x=metals, y=recovery, title="Oxide Feed Metal Recovery (kg/h)",
-                         color=metals, color_discrete_sequence=['orange', 'gold'])
-    st.plotly_chart(fig_recovery, use_container_width=True)
-
-elif 'sulphide' in plant.results:
-    metals = ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']
-    recovery = [
-        plant.results['sulphide']['cu_recovered'],
-        plant.results['sulphide']['pd_recovered'],
-        plant.results['sulphide']['pt_recovered'],
-        plant.results['sulphide']['au_recovered'],
-        plant.results['sulphide']['ni_recovered'],
-        plant.results['sulphide']['co_recovered']
-    ]
+    elif 'sulphide' in plant.results:
+        metals = ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']
+        recovery = [
+            plant.results['sulphide']['cu_recovered'],
+            plant.results['sulphide']['pd_recovered'],
+            plant.results['sulphide']['pt_recovered'],
+            plant.results['sulphide']['au_recovered'],
+            plant.results['sulphide']['ni_recovered'],
+            plant.results['sulphide']['co_recovered']
+        ]
+        
+        fig_recovery = px.bar(x=metals, y=recovery, title="Sulphide Feed Metal Recovery (kg/h)",
+                             color=metals, color_discrete_sequence=px.colors.qualitative.Set3)
+        plotly_chart(fig_recovery, use_container_width=True)
+
+
+visualization_section(plant, feed_type)
+
+
+def price_model_inputs(key, horizon=True):
+    """Price uncertainty widgets; returns a price model for pge_sim.prices, or None to keep the sidebar prices fixed"""
+    model = st.selectbox("Metal Price Model", ["Fixed (Sidebar Prices)"] + PRICE_MODELS, key=f"{key}_price_model")
+    if model not in PRICE_MODELS:
+        return None
     
-    fig_recovery = px.bar(x=metals, y=recovery, title="Sulphide Feed Metal Recovery (kg/h)",
-                         color=metals, color_discrete_sequence=px.colors.qualitative.Set3)
-    st.plotly_chart(fig_recovery, use_container_width=True)
+    with st.expander("📈 Price Uncertainty", expanded=True):
+        st.write("**Annual Volatility (%):**")
+        price_model = {'model': model, 'volatility': {
+            metal: column.number_input(metal, 0.0, 150.0, float(DEFAULT_VOLATILITY[metal]), 1.0,
+                                       key=f"{key}_volatility_{metal}")
+            for metal, column in zip(METALS, st.columns(len(METALS)))
+        }}
+        col1, col2 = st.columns(2)
+        with col1:
+            if model == "Geometric Brownian Motion":
+                price_model['drift'] = st.slider("Price Drift (%/year)", -10.0, 10.0, 0.0, 0.5, key=f"{key}_drift")
+            else:
+                half_life = st.slider("Reversion Half-Life (years)", 0.25, 10.0, 1.5, 0.25, key=f"{key}_half_life")
+                price_model['reversion'] = np.log(2) / half_life
+        with col2:
+            if horizon:
+                price_model['horizon'] = st.slider("Price Horizon (years ahead)", 0.25, 10.0, 1.0, 0.25,
+                                                   key=f"{key}_horizon")
+        
+        st.write("**Correlation of Log Price Changes** (the upper triangle is used):")
+        edited = st.data_editor(pd.DataFrame(DEFAULT_CORRELATION, index=METALS, columns=METALS),
+                                key=f"{key}_correlation", use_container_width=True).to_numpy(dtype=float)
+        price_model['correlation'] = np.triu(edited) + np.triu(edited, 1).T
+        try:
+            correlation_factor(price_model['correlation'])
+        except ValueError as error:
+            st.error(f"{error}: metal prices are kept fixed.")
+            return None
+    return price_model
 
-# Multi-Scenario Analysis & Risk Assessment
-st.subheader("🎯 Multi-Scenario Analysis & Risk Assessment")
 
-# Analysis type selection
-analysis_type = st.selectbox(
-    "Select Analysis Type:",
-    ["Monte Carlo Simulation", "Risk Analysis", "Sensitivity Analysis", "Process Optimization"]
-)
+def grade_model_inputs(key, grade_variation):
+    """Grade correlation widgets; returns a grade model for pge_sim.grades, or None to vary grades independently"""
+    source = st.selectbox("Grade Correlation", ["Independent", "Fitted to Assay CSV", "Covariance Matrix"],
+                          key=f"{key}_grade_source")
+    if source == "Independent":
+        return None
+    
+    with st.expander("🪨 Correlated Grades", expanded=True):
+        if source == "Fitted to Assay CSV":
+            assay_file = st.file_uploader("Assay CSV (one column per metal, e.g. Cu, Pd (%) or pt_pct; grades in %)",
+                                          type="csv", key=f"{key}_assays")
+            if assay_file is None:
+                st.info("Upload assays to fit the grade model; grades vary independently until then.")
+                return None
+            try:
+                grade_model = assay_grade_model(assay_file.getvalue())
+            except ValueError as error:
+                st.error(f"{error}: grades vary independently.")
+                return None
+            st.write(f"**Copula Correlation fitted to {grade_model['assays']:,} assays:**")
+            st.dataframe(pd.DataFrame(grade_model['correlation'], index=grade_model['metals'],
+                                      columns=grade_model['metals']).round(2), use_container_width=True)
+        else:
+            st.write("**Covariance of ln(grade)** (the upper triangle is used; defaults to the grade variation "
+                     "with typical deposit correlations):")
+            default = (grade_variation / 100) ** 2 * DEFAULT_GRADE_CORRELATION
+            edited = st.data_editor(pd.DataFrame(default, index=METALS, columns=METALS), key=f"{key}_grade_covariance",
+                                    use_container_width=True).to_numpy(dtype=float)
+            try:
+                grade_model = covariance_grade_model(np.triu(edited) + np.triu(edited, 1).T)
+            except ValueError as error:
+                st.error(f"{error}: grades vary independently.")
+                return None
+    return grade_model
 
-if analysis_type == "Monte Carlo Simulation":
+
+def monte_carlo_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Monte Carlo revenue distribution, over fixed iterations or streamed until converged"""
     st.write("**Monte Carlo Simulation Settings:**")
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        num_iterations = st.number_input("Number of Iterations", 100, 10000, 1000, 100)
+        num_iterations = st.number_input("Number of Iterations", 100, 1000000, 1000, 100)
+        mc_sampler = st.selectbox("Sampler", SAMPLERS, key="mc_sampler")
         confidence_level = st.slider("Confidence Level (%)", 90, 99, 95, 1)
+        mc_workers = st.number_input("Worker Processes", 1, os.cpu_count() or 1, os.cpu_count() or 1, 1)
+        mc_mode = st.radio("Run Mode", ["Fixed Iterations", "Streaming (Stop on Convergence)"], key="mc_mode")
+        if mc_mode == "Streaming (Stop on Convergence)":
+            mc_tolerance = st.number_input("Convergence Tolerance (CI ±% of mean)", 0.05, 5.0, 0.5, 0.05, key="mc_tolerance")
+            mc_batch_size = st.number_input("Batch Size", 100, 50000, 1000, 100, key="mc_batch_size")
     with col2:
         # Parameter variation ranges
         st.write("**Parameter Variation Ranges (±%)**")
@@ -676,792 +870,824 @@ if analysis_type == "Monte Carlo Simulation":
         grade_var = st.slider("Grade Variation", 5, 20, 10, 1, key="mc_grade_var")
         recovery_var = st.slider("Recovery Variation", 3, 15, 7, 1, key="mc_rec_var")
     
-    if st.button("Run Monte Carlo Simulation", type="primary"):
-        # Simulate Monte Carlo analysis
-        np.random.seed(42)  # For reproducible results
-        results_data = []
-        
-        for i in range(num_iterations):
-            # Apply random variations to parameters
-            varied_params = process_params.copy()
-            varied_feed = feed_composition.copy()
-            
-            # Vary feed rates
-            if feed_type in ["Oxide Feed", "Both Feeds"]:
-                varied_params['oxide_feed_rate'] = oxide_feed_rate * (1 + np.random.normal(0, feed_rate_var/100))
-            if feed_type in ["Sulphide Feed", "Both Feeds"]:
-                varied_params['sulphide_feed_rate'] = sulphide_feed_rate * (1 + np.random.normal(0, feed_rate_var/100))
-            
-            # Vary efficiencies
-            varied_params['sizing_efficiency'] = max(80, min(99, sizing_efficiency * (1 + np.random.normal(0, efficiency_var/100))))
-            varied_params['oxide_grinding_efficiency'] = max(80, min(99, oxide_grinding_efficiency * (1 + np.random.normal(0, efficiency_var/100))))
-            varied_params['sulphide_grinding_efficiency'] = max(80, min(99, sulphide_grinding_efficiency * (1 + np.random.normal(0, efficiency_var/100))))
-            
-            # Vary feed grades
-            for metal in ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']:
-                if varied_feed[metal] > 0:
-                    varied_feed[metal] = max(0.001, varied_feed[metal] * (1 + np.random.normal(0, grade_var/100)))
-            
-            # Vary recoveries
-            varied_params['oxide_pd_recovery'] = max(60, min(90, oxide_pd_recovery * (1 + np.random.normal(0, recovery_var/100))))
-            varied_params['final_cu_recovery'] = max(70, min(98, final_cu_recovery * (1 + np.random.normal(0, recovery_var/100))))
-            varied_params['final_pd_recovery'] = max(60, min(98, final_pd_recovery * (1 + np.random.normal(0, recovery_var/100))))
-            
-            # Run simulation with varied parameters
-            mc_plant = MetallurgicalPlant(varied_feed, varied_params)
-            mc_plant.run_simulation()
-            
-            # Calculate total value
-            total_value = 0
-            if 'oxide' in mc_plant.results:
-                total_value += (mc_plant.results['oxide']['pd_recovered'] * metal_prices['Pd'] + 
-                               mc_plant.results['oxide']['au_recovered'] * metal_prices['Au'])
-            if 'sulphide' in mc_plant.results:
-                total_value += (mc_plant.results['sulphide']['cu_recovered'] * metal_prices['Cu'] +
-                               mc_plant.results['sulphide']['pd_recovered'] * metal_prices['Pd'] +
-                               mc_plant.results['sulphide']['pt_recovered'] * metal_prices['Pt'] +
-                               mc_plant.results['sulphide']['au_recovered'] * metal_prices['Au'] +
-                               mc_plant.results['sulphide']['ni_recovered'] * metal_prices['Ni'] +
-                               mc_plant.results['sulphide']['co_recovered'] * metal_prices['Co'])
+    mc_grade_model = grade_model_inputs("mc", grade_var)
+    mc_price_model = price_model_inputs("mc")
+    
+    mc_variation = {'feed_rate': feed_rate_var, 'efficiency': efficiency_var, 'grade': grade_var, 'recovery': recovery_var}
+    # Physical inputs of a fixed run; prices are applied to the samples afterwards, so they are not part of the key
+    mc_inputs = {'feed_composition': feed_composition, 'process_params': process_params, 'variation': mc_variation,
+                 'iterations': num_iterations, 'feed_type': feed_type, 'seed': 42, 'sampler': mc_sampler,
+                 'grade_model': mc_grade_model}
+    mc_summary = None
+    
+    run_clicked = st.button("Run Monte Carlo Simulation", type="primary")
+    if mc_mode == "Fixed Iterations":
+        if run_clicked:
+            # Simulate Monte Carlo analysis across worker processes (seeded for reproducible results)
+            # Results do not depend on the worker count, so it is left out of the stored key
+            st.session_state['mc_samples'] = (result_key('monte_carlo', mc_inputs), fetch_result(
+                'monte_carlo', mc_inputs,
+                lambda: run_monte_carlo(
+                    feed_composition, process_params, None, mc_variation,
+                    iterations=num_iterations, feed_type=feed_type, seed=42, workers=mc_workers, sampler=mc_sampler,
+                    grade_model=mc_grade_model
+                )
+            ))
+        
+        # The samples of the last run with these inputs are re-valued at the current prices on every rerun
+        stored_key, mc_results = st.session_state.get('mc_samples', (None, None))
+        if stored_key == result_key('monte_carlo', mc_inputs):
+            start_time = time.perf_counter()
+            if mc_price_model is None:
+                mc_prices = metal_prices
+            else:
+                # One correlated price draw per stored sample (the chunks draw from spawned children of this seed)
+                mc_prices = sample_prices(metal_prices, len(mc_results['production']), mc_price_model,
+                                          np.random.default_rng(42))
+            mc_revenue = value(mc_results['production'], mc_prices)
+            repricing_time = time.perf_counter() - start_time
+            mc_summary = {
+                'mean': mc_revenue.mean(),
+                'median': np.median(mc_revenue),
+                'std': mc_revenue.std(ddof=1),
+                'min': mc_revenue.min(),
+                'max': mc_revenue.max(),
+                'lower': np.quantile(mc_revenue, (100-confidence_level)/200),
+                'upper': np.quantile(mc_revenue, 1-(100-confidence_level)/200)
+            }
+            counts, edges = histogram(mc_revenue, 50)
+            density_counts, density_edges = histogram(mc_revenue, DENSITY_BINS)
+            price_text = "the current prices" if mc_price_model is None else "sampled prices"
+            st.caption(f"{len(mc_revenue):,} stored samples valued at {price_text} in {repricing_time * 1e3:.1f} ms")
+    elif run_clicked:
+        # Stream batches with online statistics until the confidence interval is tight enough
+        st.write("**Convergence:**")
+        mc_progress = st.empty()
+        mc_chart = st.empty()
+        convergence_history = []
+        last_drawn = 0
+        
+        for mc_summary in stream_monte_carlo(
+            feed_composition, process_params, metal_prices, mc_variation,
+            max_iterations=num_iterations, feed_type=feed_type, batch_size=mc_batch_size,
+            tolerance=mc_tolerance, confidence_level=confidence_level, seed=42, workers=mc_workers,
+            sampler=mc_sampler, price_model=mc_price_model, grade_model=mc_grade_model
+        ):
+            convergence_history.append(mc_summary)
+            mc_progress.write(
+                f"{mc_summary['iterations']:,} iterations: mean ${mc_summary['mean']:,.0f}/hour "
+                f"± ${mc_summary['half_width']:,.0f} ({mc_summary['relative_half_width']:.2f}% of mean)"
+            )
             
-            results_data.append({
-                'iteration': i + 1,
-                'total_value': total_value,
-                'cu_recovered': mc_plant.results.get('sulphide', {}).get('cu_recovered', 0),
-                'pd_recovered': (mc_plant.results.get('oxide', {}).get('pd_recovered', 0) + 
-                               mc_plant.results.get('sulphide', {}).get('pd_recovered', 0)),
-                'au_recovered': (mc_plant.results.get('oxide', {}).get('au_recovered', 0) + 
-                               mc_plant.results.get('sulphide', {}).get('au_recovered', 0))
-            })
+            # Redraw the live chart at most a few times per second
+            if mc_summary['finished'] or time.time() - last_drawn > 0.25:
+                # Downsampled WebGL traces, so long runs redraw in constant time
+                history = {key: np.array([summary[key] for summary in convergence_history])
+                           for key in ['iterations', 'mean', 'half_width', 'lower', 'upper']}
+                keep = downsample_index(np.column_stack([history['mean'], history['lower'], history['upper']]))
+                history = {key: values[keep] for key, values in history.items()}
+                fig_convergence = go.Figure([
+                    go.Scattergl(x=history['iterations'], y=history['mean'] + history['half_width'],
+                                 mode='lines', line=dict(width=0), showlegend=False),
+                    go.Scattergl(x=history['iterations'], y=history['mean'] - history['half_width'],
+                                 mode='lines', line=dict(width=0), fill='tonexty',
+                                 name=f"{confidence_level}% CI of Mean"),
+                    go.Scattergl(x=history['iterations'], y=history['mean'], mode='lines',
+                                 name="Mean Revenue", line=dict(color='blue', width=2)),
+                    go.Scattergl(x=history['iterations'], y=history['lower'], mode='lines',
+                                 name=f"{confidence_level}% Lower", line=dict(color='orange', dash='dash')),
+                    go.Scattergl(x=history['iterations'], y=history['upper'], mode='lines',
+                                 name=f"{confidence_level}% Upper", line=dict(color='orange', dash='dash'))
+                ])
+                fig_convergence.update_layout(
+                    title="Monte Carlo Convergence",
+                    xaxis_title="Iterations",
+                    yaxis_title="Revenue ($/hour)"
+                )
+                mc_chart.plotly_chart(fig_convergence, use_container_width=True)
+                last_drawn = time.time()
+        
+        if mc_summary['converged']:
+            st.success(f"Converged after {mc_summary['iterations']:,} iterations (CI ±{mc_summary['relative_half_width']:.2f}% of mean)")
+        else:
+            st.warning(f"Stopped at {mc_summary['iterations']:,} iterations before reaching ±{mc_tolerance}% of mean")
         
-        mc_df = pd.DataFrame(results_data)
+        # Histogram from the streaming sketch instead of retained samples
+        counts, edges = mc_summary['sketch'].histogram(50)
+        density_counts, density_edges = mc_summary['sketch'].histogram(DENSITY_BINS)
+    
+    if mc_summary is not None:
+        # Pre-binned histogram with a density curve scaled to the bar counts
+        density_x, density_y = density(density_counts, density_edges)
+        fig_hist = go.Figure([
+            histogram_bar(counts, edges, name="Iterations"),
+            go.Scatter(x=density_x, y=density_y * counts.sum() * np.diff(edges).mean(), mode='lines',
+                       name="Density", line=dict(color='darkblue'))
+        ])
+        fig_hist.update_layout(
+            title="Revenue Distribution from Monte Carlo Simulation",
+            xaxis_title="Revenue ($/hour)",
+            yaxis_title="Iterations"
+        )
         
         # Statistical analysis
         st.write("**Monte Carlo Results:**")
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Mean Revenue", f"${mc_df['total_value'].mean():,.0f}/hour")
-            st.metric(f"{confidence_level}% Confidence Lower", f"${mc_df['total_value'].quantile((100-confidence_level)/200):,.0f}/hour")
+            st.metric("Mean Revenue", f"${mc_summary['mean']:,.0f}/hour")
+            st.metric(f"{confidence_level}% Confidence Lower", f"${mc_summary['lower']:,.0f}/hour")
         with col2:
-            st.metric("Median Revenue", f"${mc_df['total_value'].median():,.0f}/hour")
-            st.metric(f"{confidence_level}% Confidence Upper", f"${mc_df['total_value'].quantile(1-(100-confidence_level)/200):,.0f}/hour")
+            st.metric("Median Revenue", f"${mc_summary['median']:,.0f}/hour")
+            st.metric(f"{confidence_level}% Confidence Upper", f"${mc_summary['upper']:,.0f}/hour")
         with col3:
-            st.metric("Std Deviation", f"${mc_df['total_value'].std():,.0f}/hour")
-            st.metric("Min Revenue", f"${mc_df['total_value'].min():,.0f}/hour")
+            st.metric("Std Deviation", f"${mc_summary['std']:,.0f}/hour")
+            st.metric("Min Revenue", f"${mc_summary['min']:,.0f}/hour")
         with col4:
-            st.metric("Max Revenue", f"${mc_df['total_value'].max():,.0f}/hour")
-            st.metric("Risk (CV)", f"{(mc_df['total_value'].std()/mc_df['total_value'].mean()*100):.1f}%")
+            st.metric("Max Revenue", f"${mc_summary['max']:,.0f}/hour")
+            st.metric("Risk (CV)", f"{(mc_summary['std']/mc_summary['mean']*100):.1f}%")
         
         # Visualization
-        fig_hist = px.histogram(mc_df, x='total_value', nbins=50, 
-                               title="Revenue Distribution from Monte Carlo Simulation")
-        fig_hist.add_vline(x=mc_df['total_value'].mean(), line_dash="dash", 
-                          annotation_text=f"Mean: ${mc_df['total_value'].mean():,.0f}")
-        st.plotly_chart(fig_hist, use_container_width=True)
+        fig_hist.add_vline(x=mc_summary['mean'], line_dash="dash", 
+                          annotation_text=f"Mean: ${mc_summary['mean']:,.0f}")
+        plotly_chart(fig_hist, use_container_width=True)
 
-elif analysis_type == "Risk Analysis":
+
+def risk_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Lost production and revenue from simulated equipment failures and supply disruptions"""
     st.write("**Equipment Failure & Supply Disruption Analysis:**")
+    st.write("Simulates a year of failures and repairs per replication, with each outage taken through the "
+             "flowsheet, to give the distribution of lost production and revenue.")
     
     col1, col2 = st.columns(2)
     with col1:
-        st.write("**Equipment Failure Scenarios:**")
-        crusher_failure_prob = st.slider("Crusher Failure Probability (%)", 0, 20, 5, 1)
-        mill_failure_prob = st.slider("Mill Failure Probability (%)", 0, 15, 3, 1)
-        flotation_failure_prob = st.slider("Flotation Failure Probability (%)", 0, 10, 2, 1)
-        
-        # Equipment downtime impact
-        equipment_downtime = st.slider("Equipment Downtime (hours)", 1, 48, 8, 1)
+        st.write("**Equipment Reliability (MTBF / MTTR, hours):**")
+        if feed_type in ["Sulphide Feed", "Both Feeds"]:
+            crusher_mtbf = st.number_input("Crusher MTBF", 50, 10000, FAILURE_MODES['crusher']['mtbf'], 50)
+            crusher_mttr = st.slider("Crusher MTTR", 1, 72, FAILURE_MODES['crusher']['mttr'], 1)
+            mill_mtbf = st.number_input("Mill MTBF", 50, 10000, FAILURE_MODES['mill']['mtbf'], 50)
+            mill_mttr = st.slider("Mill MTTR", 1, 72, FAILURE_MODES['mill']['mttr'], 1)
+            flotation_mtbf = st.number_input("Flotation Train MTBF", 50, 10000, FAILURE_MODES['cu_flotation']['mtbf'], 50)
+            flotation_mttr = st.slider("Flotation Train MTTR", 1, 72, FAILURE_MODES['cu_flotation']['mttr'], 1)
+        else:
+            st.write("The oxide circuit is only exposed to supply disruptions.")
         
     with col2:
         st.write("**Supply Disruption Scenarios:**")
-        supply_disruption_prob = st.slider("Supply Disruption Probability (%)", 0, 30, 10, 1)
+        supply_interval_days = st.slider("Mean Time Between Disruptions (days)", 5, 365,
+                                         FAILURE_MODES['supply']['mtbf'] // 24, 5)
+        supply_duration = st.slider("Disruption Duration (hours)", 1, 240, FAILURE_MODES['supply']['mttr'], 1)
         grade_reduction = st.slider("Feed Grade Reduction (%)", 0, 50, 20, 1)
         supply_shortage = st.slider("Feed Supply Shortage (%)", 0, 80, 30, 1)
+        risk_replications = st.number_input("Replications (years)", 100, 100000, 10000, 100, key="risk_replications")
+        risk_seed = st.number_input("Random Seed", 0, 2**31 - 1, 42, 1, key="risk_seed")
+    
+    failure_modes = {name: dict(mode) for name, mode in FAILURE_MODES.items()}
+    if feed_type in ["Sulphide Feed", "Both Feeds"]:
+        for name, mtbf, mttr in [('crusher', crusher_mtbf, crusher_mttr), ('mill', mill_mtbf, mill_mttr),
+                                 ('cu_flotation', flotation_mtbf, flotation_mttr),
+                                 ('ni_flotation', flotation_mtbf, flotation_mttr)]:
+            failure_modes[name].update(mtbf=mtbf, mttr=mttr)
+    failure_modes['supply'].update(mtbf=supply_interval_days * 24, mttr=supply_duration,
+                                   feed_rate_factor=1 - supply_shortage / 100,
+                                   grade_factor=1 - grade_reduction / 100)
+    # Lost production does not depend on prices, so the stored result is valued at the current prices on every rerun
+    risk_inputs = {'feed_composition': feed_composition, 'process_params': process_params,
+                   'failure_modes': failure_modes, 'feed_type': feed_type, 'replications': risk_replications,
+                   'seed': risk_seed}
     
     if st.button("Run Risk Analysis", type="primary"):
-        # Calculate total value per hour for base case
-        total_value_per_hour = 0
-        if 'oxide' in plant.results:
-            total_value_per_hour += (plant.results['oxide']['pd_recovered'] * metal_prices['Pd'] + 
-                                   plant.results['oxide']['au_recovered'] * metal_prices['Au'])
-        if 'sulphide' in plant.results:
-            total_value_per_hour += (plant.results['sulphide']['cu_recovered'] * metal_prices['Cu'] +
-                                   plant.results['sulphide']['pd_recovered'] * metal_prices['Pd'] +
-                                   plant.results['sulphide']['pt_recovered'] * metal_prices['Pt'] +
-                                   plant.results['sulphide']['au_recovered'] * metal_prices['Au'] +
-                                   plant.results['sulphide']['ni_recovered'] * metal_prices['Ni'] +
-                                   plant.results['sulphide']['co_recovered'] * metal_prices['Co'])
-        
-        risk_scenarios = []
-        
-        # Base case
-        base_value = total_value_per_hour
-        risk_scenarios.append({"Scenario": "Base Case", "Impact": 0, "Revenue": base_value, "Probability": "N/A"})
-        
-        # Equipment failure scenarios
-        if feed_type in ["Sulphide Feed", "Both Feeds"]:
-            crusher_impact = base_value * (crusher_failure_prob/100) * (equipment_downtime/24)
-            risk_scenarios.append({
-                "Scenario": "Crusher Failure", 
-                "Impact": -crusher_impact, 
-                "Revenue": base_value - crusher_impact,
-                "Probability": f"{crusher_failure_prob}%"
-            })
-            
-            mill_impact = base_value * (mill_failure_prob/100) * (equipment_downtime/24)
-            risk_scenarios.append({
-                "Scenario": "Mill Failure", 
-                "Impact": -mill_impact, 
-                "Revenue": base_value - mill_impact,
-                "Probability": f"{mill_failure_prob}%"
-            })
-            
-            flotation_impact = base_value * (flotation_failure_prob/100) * (equipment_downtime/24) * 0.8
-            risk_scenarios.append({
-                "Scenario": "Flotation Failure", 
-                "Impact": -flotation_impact, 
-                "Revenue": base_value - flotation_impact,
-                "Probability": f"{flotation_failure_prob}%"
-            })
-        
-        # Supply disruption scenarios
-        grade_impact = base_value * (supply_disruption_prob/100) * (grade_reduction/100)
-        risk_scenarios.append({
-            "Scenario": "Grade Reduction", 
-            "Impact": -grade_impact, 
-            "Revenue": base_value - grade_impact,
-            "Probability": f"{supply_disruption_prob}%"
-        })
+        start_time = time.perf_counter()
+        st.session_state['risk_production'] = (risk_inputs, fetch_result(
+            'risk_analysis', risk_inputs,
+            lambda: run_risk_analysis(feed_composition, process_params, None, failure_modes, feed_type,
+                                      int(risk_replications), seed=int(risk_seed))
+        ))
+        st.session_state['risk_elapsed'] = time.perf_counter() - start_time
+    
+    stored_inputs, risk = st.session_state.get('risk_production', (None, None))
+    if stored_inputs == risk_inputs:
+        start_time = time.perf_counter()
+        risk = {**risk, **value_risk(risk, metal_prices)}
+        repricing_time = time.perf_counter() - start_time
         
-        supply_impact = base_value * (supply_disruption_prob/100) * (supply_shortage/100)
-        risk_scenarios.append({
-            "Scenario": "Supply Shortage", 
-            "Impact": -supply_impact, 
-            "Revenue": base_value - supply_impact,
-            "Probability": f"{supply_disruption_prob}%"
+        lost_revenue = risk['lost_revenue']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Failure-Free Revenue", f"${risk['base_revenue']:,.0f}/year")
+            st.metric("Expected Revenue", f"${risk['revenue'].mean():,.0f}/year")
+        with col2:
+            st.metric("Mean Lost Revenue", f"${lost_revenue.mean():,.0f}/year",
+                      f"{-lost_revenue.mean() / risk['base_revenue'] * 100:.1f}%" if risk['base_revenue'] else None)
+            st.metric("P90 Lost Revenue", f"${np.percentile(lost_revenue, 90):,.0f}/year")
+        with col3:
+            st.metric("Worst Year Lost Revenue", f"${lost_revenue.max():,.0f}/year")
+        st.caption(f"{len(lost_revenue):,} simulated years in {st.session_state['risk_elapsed']:.2f} s, "
+                   f"valued at the current prices in {repricing_time * 1e3:.1f} ms")
+        
+        counts, edges = histogram(lost_revenue, 60)
+        fig_risk_distribution = go.Figure(histogram_bar(counts, edges))
+        fig_risk_distribution.update_layout(title="Distribution of Annual Lost Revenue",
+                                            xaxis_title="Lost Revenue ($/year)", yaxis_title="Replications")
+        plotly_chart(fig_risk_distribution, use_container_width=True)
+        
+        risk_df = pd.DataFrame({
+            'Scenario': risk['labels'],
+            'Events per Year': risk['failures'].mean(axis=0),
+            'Downtime (hours/year)': risk['downtime'].mean(axis=0),
+            'Impact': -risk['mode_loss'].mean(axis=0),
+            'P90 Impact': -np.percentile(risk['mode_loss'], 90, axis=0)
         })
-        
-        risk_df = pd.DataFrame(risk_scenarios)
         st.dataframe(risk_df, use_container_width=True)
         
         # Risk visualization
-        fig_risk = px.bar(risk_df[1:], x='Scenario', y='Impact', 
-                         title="Risk Impact Analysis", color='Impact',
-                         color_continuous_scale='Reds')
-        st.plotly_chart(fig_risk, use_container_width=True)
-
-# Economic analysis
-st.subheader("💰 Economic Analysis")
-
-col1, col2, col3 = st.columns(3)
+        fig_risk = px.bar(risk_df, x='Scenario', y='Impact', 
+                         title="Mean Annual Revenue Impact by Failure Mode", color='Impact',
+                         color_continuous_scale='Reds_r')
+        plotly_chart(fig_risk, use_container_width=True)
+        
+        payable = risk['lost_production'].any(axis=0)
+        lost_production_df = pd.DataFrame({
+            'Metal': np.array(METALS)[payable],
+            'Mean Lost Production (kg/year)': risk['lost_production'][:, payable].mean(axis=0),
+            'P90 Lost Production (kg/year)': np.percentile(risk['lost_production'][:, payable], 90, axis=0)
+        })
+        st.write("**Lost Production:**")
+        st.dataframe(lost_production_df, use_container_width=True)
 
-total_value_per_hour = 0
 
-if 'oxide' in plant.results:
-    oxide_value = (plant.results['oxide']['pd_recovered'] * metal_prices['Pd'] + 
-                   plant.results['oxide']['au_recovered'] * metal_prices['Au'])
-    total_value_per_hour += oxide_value
+def sensitivity_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Tornado sweep and Sobol indices of revenue per hour"""
+    st.write("**Sensitivity Analysis Settings:**")
+    
+    col1, col2 = st.columns(2)
     with col1:
-        st.metric("Oxide Feed Value", f"${oxide_value:,.0f}/hour")
-
-if 'sulphide' in plant.results:
-    sulphide_value = (plant.results['sulphide']['cu_recovered'] * metal_prices['Cu'] +
-                      plant.results['sulphide']['pd_recovered'] * metal_prices['Pd'] +
-                      plant.results['sulphide']['pt_recovered'] * metal_prices['Pt'] +
-                      plant.results['sulphide']['au_recovered'] * metal_prices['Au'] +
-                      plant.results['sulphide']['ni_recovered'] * metal_prices['Ni'] +
-                      plant.results['sulphide']['co_recovered'] * metal_prices['Co'])
-    total_value_per_hour += sulphide_value
+        sensitivity_range = st.slider("Input Variation Range (±%)", 1, 30, 10, 1, key="sens_range")
     with col2:
-        st.metric("Sulphide Feed Value", f"${sulphide_value:,.0f}/hour")
-
-with col3:
-    st.metric("Total Plant Value", f"${total_value_per_hour:,.0f}/hour")
-    st.metric("Daily Revenue", f"${total_value_per_hour * 24:,.0f}/day")
-
-# Revenue breakdown
-if feed_type in ["Oxide Feed", "Sulphide Feed", "Both Feeds"]:
-    st.subheader("📊 Revenue Breakdown by Metal")
-    
-    # Create revenue breakdown chart
-    metals_produced = []
-    revenue_values = []
-    
-    if 'oxide' in plant.results:
-        if plant.results['oxide']['pd_recovered'] > 0:
-            metals_produced.append('Pd (Oxide)')
-            revenue_values.append(plant.results['oxide']['pd_recovered'] * metal_prices['Pd'])
-        if plant.results['oxide']['au_recovered'] > 0:
-            metals_produced.append('Au (Oxide)')
-            revenue_values.append(plant.results['oxide']['au_recovered'] * metal_prices['Au'])
-    
-    if 'sulphide' in plant.results:
-        if plant.results['sulphide']['cu_recovered'] > 0:
-            metals_produced.append('Cu (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['cu_recovered'] * metal_prices['Cu'])
-        if plant.results['sulphide']['pd_recovered'] > 0:
-            metals_produced.append('Pd (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['pd_recovered'] * metal_prices['Pd'])
-        if plant.results['sulphide']['pt_recovered'] > 0:
-            metals_produced.append('Pt (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['pt_recovered'] * metal_prices['Pt'])
-        if plant.results['sulphide']['au_recovered'] > 0:
-            metals_produced.append('Au (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['au_recovered'] * metal_prices['Au'])
-        if plant.results['sulphide']['ni_recovered'] > 0:
-            metals_produced.append('Ni (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['ni_recovered'] * metal_prices['Ni'])
-        if plant.results['sulphide']['co_recovered'] > 0:
-            metals_produced.append('Co (Sulphide)')
-            revenue_values.append(plant.results['sulphide']['co_recovered'] * metal_prices['Co'])
+        sobol_base_samples = st.select_slider("Sobol Base Samples", [256, 512, 1024, 2048, 4096, 8192], 1024, key="sens_samples")
     
-    if metals_produced:
-        fig_revenue = px.pie(
-            values=revenue_values,
-            names=metals_produced,
-            title="Revenue Contribution by Metal ($/hour)"
+    if st.button("Run Sensitivity Analysis", type="primary"):
+        # One-at-a-time tornado sweep (single batch of 2 runs per input)
+        tornado = tornado_analysis(feed_composition, process_params, metal_prices, feed_type, sensitivity_range)
+        tornado_df = pd.DataFrame({key: tornado[key] for key in ['label', 'low_revenue', 'high_revenue', 'swing']})
+        tornado_df = tornado_df[tornado_df['swing'] > 0]
+        
+        st.write(f"**Tornado Analysis (±{sensitivity_range}% on each input, base ${tornado['base_revenue']:,.0f}/hour):**")
+        fig_tornado = go.Figure([
+            go.Bar(y=tornado_df['label'], x=tornado_df['low_revenue'] - tornado['base_revenue'],
+                   orientation='h', name=f"-{sensitivity_range}%", marker_color='indianred'),
+            go.Bar(y=tornado_df['label'], x=tornado_df['high_revenue'] - tornado['base_revenue'],
+                   orientation='h', name=f"+{sensitivity_range}%", marker_color='seagreen')
+        ])
+        fig_tornado.update_layout(
+            title="Revenue Swing by Input ($/hour change from base)",
+            barmode='overlay',
+            xaxis_title="Change in Revenue ($/hour)",
+            yaxis=dict(autorange='reversed'),
+            height=max(400, 25 * len(tornado_df))
         )
-        st.plotly_chart(fig_revenue, use_container_width=True)
-        
-        # Revenue breakdown table
-        revenue_df = pd.DataFrame({
-            'Metal': metals_produced,
-            'Revenue ($/hour)': [f"${val:,.0f}" for val in revenue_values],
-            'Revenue ($/day)': [f"${val*24:,.0f}" for val in revenue_values],
-            'Revenue ($/year)': [f"${val*24*365:,.0f}" for val in revenue_values]
+        plotly_chart(fig_tornado, use_container_width=True)
+        
+        # Variance-based indices (single batch of base_samples * (inputs + 2) runs)
+        indices = sobol_indices(feed_composition, process_params, metal_prices, feed_type, sensitivity_range,
+                                sobol_base_samples)
+        indices_df = pd.DataFrame({
+            'Input': indices['label'],
+            'First-Order Index': indices['first_order'],
+            'Total Index': indices['total']
         })
-        st.dataframe(revenue_df, use_container_width=True)
+        indices_df = indices_df[indices_df['Total Index'] > 1e-6]
+        
+        st.write(f"**Sobol Sensitivity Indices ({indices['evaluations']:,} model evaluations):**")
+        fig_sobol = go.Figure([
+            go.Bar(y=indices_df['Input'], x=indices_df['First-Order Index'], orientation='h', name='First-Order'),
+            go.Bar(y=indices_df['Input'], x=indices_df['Total Index'], orientation='h', name='Total')
+        ])
+        fig_sobol.update_layout(
+            title="Drivers of Revenue per Hour (Sobol Indices)",
+            barmode='group',
+            xaxis_title="Share of Revenue Variance",
+            yaxis=dict(autorange='reversed'),
+            height=max(400, 30 * len(indices_df))
+        )
+        plotly_chart(fig_sobol, use_container_width=True)
+        st.dataframe(indices_df, use_container_width=True)
 
-# Footer
-st.markdown("---")
-st.markdown("**Note:** This simulator uses simplified metallurgical models for demonstration purposes. Actual plant performance may vary based on ore characteristics, equipment efficiency, and operating conditions.")_df, use_container_width=True)
-        
-        # Metal recovery
-        st.write("**Metal Recovery:**")
-        col_a, col_b = st.columns(2)
-        with col_a:
-            st.metric("Palladium Recovery", f"{oxide_results['pd_recovered']:.2f} kg/h")
-        with col_b:
-            st.metric("Gold Recovery", f"{oxide_results['au_recovered']:.2f} kg/h")
-
-if feed_type in ["Sulphide Feed", "Both Feeds"] and 'sulphide' in plant.results:
+
+def optimization_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Search of the control ranges for the highest revenue per hour"""
+    st.write("**Process Optimization Settings:**")
+    st.write("Searches the sidebar control ranges for the settings with the highest revenue per hour, "
+             "keeping the PGM split to the Cu and Ni concentrates at or below 100% and adding no new "
+             "capacity overloads.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        optimization_generations = st.number_input("Generations", 20, 2000, 300, 20, key="opt_generations")
     with col2:
-        st.subheader("⚡ Sulphide Feed Processing Results")
-        sulphide_results = plant.results['sulphide']
+        optimization_seed = st.number_input("Random Seed", 0, 2**31 - 1, 42, 1, key="opt_seed")
+    
+    if st.button("Run Process Optimization", type="primary"):
+        start_time = time.perf_counter()
+        optimum = optimize_process(feed_composition, process_params, metal_prices, feed_type,
+                                   generations=int(optimization_generations), seed=int(optimization_seed))
+        elapsed = time.perf_counter() - start_time
         
-        # Mass balance table
-        mass_balance_df = pd.DataFrame({
-            'Process Step': ['Feed', 'After Crushing', 'After Grinding', 'Cu Concentrate', 'Ni Concentrate', 'Tailings'],
-            'Mass (t/h)': [
-                sulphide_results['feed_mass'],
-                sulphide_results['crushed_mass'],
-                sulphide_results['ground_mass'],
-                sulphide_results['cu_concentrate_mass'],
-                sulphide_results['ni_concentrate_mass'],
-                sulphide_results['tailings_mass']
-            ]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Current Revenue", f"${optimum['base_revenue']:,.0f}/hour")
+        with col2:
+            st.metric("Optimized Revenue", f"${optimum['optimized_revenue']:,.0f}/hour",
+                      f"{optimum['uplift_percent']:+.1f}%")
+        with col3:
+            st.metric("Revenue Uplift", f"${optimum['uplift'] * 24 * 365:,.0f}/year")
+        
+        if not optimum['feasible']:
+            st.warning("⚠️ No setting within the control ranges satisfies all constraints; "
+                       "showing the least-violating one.")
+        st.caption(f"{optimum['evaluations']:,} model evaluations in {elapsed:.2f} s")
+        
+        optimization_df = pd.DataFrame({
+            'Control': [input_label('process', name) for name in optimum['names']],
+            'Current': optimum['current'],
+            'Recommended': optimum['recommended'],
+            'Change': optimum['recommended'] - optimum['current']
         })
+        st.write("**Recommended Control Settings:**")
+        st.dataframe(optimization_df[optimization_df['Change'] != 0], use_container_width=True)
         
-        st.dataframe(mass_balanceimport streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-
-# Page configuration
-st.set_page_config(
-    page_title="Metallurgical Plant Simulator",
-    page_icon="⚒️",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Title and description
-st.title("⚒️ Metallurgical Plant Process Simulator")
-st.markdown("Simulate the processing of oxide and sulphide feeds through a complete metallurgical plant")
-
-# Sidebar for input parameters
-st.sidebar.header("Production Scenario Selection")
+        fig_opt = px.line(x=np.arange(1, len(optimum['history']) + 1), y=optimum['history'],
+                          title="Best Feasible Revenue by Generation",
+                          labels={'x': 'Generation', 'y': 'Revenue ($/hour)'})
+        plotly_chart(fig_opt, use_container_width=True)
 
-# Production scenario selection
-production_scenario = st.sidebar.selectbox(
-    "Select Production Scenario:",
-    ["15Mtpa Case", "30Mtpa Case", "Custom"]
-)
 
-# Define baseline scenarios
-scenarios = {
-    "15Mtpa Case": {
-        "total_mined": 680,  # Mt
-        "total_processed": 240,  # Mt
-        "3E_grade": 0.95,  # g/t (Pd+Pt+Au)
-        "ni_grade": 0.16,  # %
-        "cu_grade": 0.11,  # %
-        "co_grade": 0.017,  # %
-        "pd_recovery": 78,  # %
-        "pt_recovery": 45,  # %
-        "au_recovery": 66,  # %
-        "ni_recovery": 43,  # %
-        "cu_recovery": 80,  # %
-        "co_recovery": 42,  # %
-        "oxide_throughput": 2,  # Mtpa
-        "sulphide_throughput": 12.5,  # Mtpa (mid-range of 7.5-15)
-        "mine_life_sulphide": 19,  # years
-        "mine_life_oxide": 4  # years
-    },
-    "30Mtpa Case": {
-        "total_mined": 1300,  # Mt
-        "total_processed": 440,  # Mt
-        "3E_grade": 0.85,  # g/t (Pd+Pt+Au)
-        "ni_grade": 0.16,  # %
-        "cu_grade": 0.09,  # %
-        "co_grade": 0.016,  # %
-        "pd_recovery": 77,  # %
-        "pt_recovery": 43,  # %
-        "au_recovery": 66,  # %
-        "ni_recovery": 41,  # %
-        "cu_recovery": 76,  # %
-        "co_recovery": 40,  # %
-        "oxide_throughput": 2,  # Mtpa
-        "sulphide_throughput": 22.5,  # Mtpa (mid-range of 15-30)
-        "mine_life_sulphide": 18,  # years
-        "mine_life_oxide": 4  # years
-    }
-}
+def time_series_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Hourly simulation over the mine life with ramp-up, shutdowns and grade decline"""
+    st.write("**Mine Life Time Series Settings:**")
+    st.write("Steps the plant hour by hour over the mine life of each feed, with feed ramp-up, "
+             "planned shutdowns and grade decline.")
+    
+    life_defaults = scenarios.get(production_scenario, scenarios["15Mtpa Case"])
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sulphide_life = st.number_input("Sulphide Mine Life (years)", 1, 40, life_defaults['mine_life_sulphide'], 1,
+                                        key="ts_sulphide_life")
+        oxide_life = st.number_input("Oxide Mine Life (years)", 1, 40, life_defaults['mine_life_oxide'], 1,
+                                     key="ts_oxide_life")
+    with col2:
+        ts_availability = st.slider("Plant Availability (%)", 70, 100, 92, 1, key="ts_availability")
+        ts_shutdown_days = st.slider("Annual Shutdown (days)", 0, 30, 10, 1, key="ts_shutdown")
+    with col3:
+        ts_ramp_up_months = st.slider("Feed Ramp-Up (months)", 0, 24, 6, 1, key="ts_ramp_up")
+        ts_grade_decline = st.slider("Grade Decline (%/year)", 0.0, 5.0, 1.0, 0.5, key="ts_grade_decline")
+    
+    if st.button("Run Time Series Simulation", type="primary"):
+        start_time = time.perf_counter()
+        plant = simulate_plant(feed_composition, process_params, feed_type)
+        mine_life = {'oxide': oxide_life, 'sulphide': sulphide_life}
+        hours = max(mine_life[process] for process in ['oxide', 'sulphide']
+                    if process in plant.results) * HOURS_PER_YEAR
+        
+        # Availability drops to zero for the shutdown at the start of every year
+        day_of_year = period_index(hours, 'day') % 365
+        availability = (day_of_year >= ts_shutdown_days) * ts_availability / 100
+        # Linear ramp-up of the feed rates, one step per month
+        ramp_up = expand_profile(np.minimum(1, np.arange(1, ts_ramp_up_months + 2) / (ts_ramp_up_months + 1)),
+                                 'month', hours)
+        feed_rates = {'oxide': process_params['oxide_feed_rate'] * ramp_up,
+                      'sulphide': process_params['sulphide_feed_rate'] * ramp_up}
+        grade_factor = expand_profile((1 - ts_grade_decline / 100) ** np.arange(hours // HOURS_PER_YEAR), 'year', hours)
+        grades = {metal: grade * grade_factor for metal, grade in feed_composition.items()}
+        
+        series = simulate_mine_life(grades, process_params, metal_prices, mine_life, feed_type,
+                                    feed_rates=feed_rates, availability=availability)
+        elapsed = time.perf_counter() - start_time
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Life-of-Mine Revenue", f"${series['revenue'].sum():,.0f}")
+        with col2:
+            st.metric("Ore Processed", f"{series['processed'].sum() / 1e6:,.1f} Mt")
+        with col3:
+            st.metric("Average Annual Revenue", f"${series['annual']['revenue'].mean():,.0f}/year")
+        st.caption(f"{series['hours']:,} hourly steps in {elapsed:.2f} s")
+        
+        # Daily curves, downsampled and drawn with WebGL
+        day = np.arange(1, len(series['daily']['revenue']) + 1)
+        cumulative_revenue = np.cumsum(series['daily']['revenue'])
+        keep = downsample_index(cumulative_revenue)
+        fig_revenue_curve = px.line(x=day[keep] / 365, y=cumulative_revenue[keep], render_mode='webgl',
+                                    title="Cumulative Revenue",
+                                    labels={'x': 'Year', 'y': 'Cumulative Revenue ($)'})
+        plotly_chart(fig_revenue_curve, use_container_width=True)
+        
+        payable = series['production'].sum(axis=0) > 0
+        cumulative_production = np.cumsum(series['daily']['production'][:, payable], axis=0)
+        keep = downsample_index(cumulative_production)
+        cumulative_metal_df = pd.DataFrame(cumulative_production[keep], columns=np.array(series['metals'])[payable])
+        cumulative_metal_df['Year'] = day[keep] / 365
+        cumulative_metal_df = cumulative_metal_df.melt(id_vars='Year', var_name='Metal',
+                                                       value_name='Cumulative Production (kg)')
+        fig_metal_curve = px.line(cumulative_metal_df, x='Year', y='Cumulative Production (kg)', facet_col='Metal',
+                                  facet_col_wrap=3, render_mode='webgl', title="Cumulative Metal Production")
+        fig_metal_curve.update_yaxes(matches=None, showticklabels=True)
+        plotly_chart(fig_metal_curve, use_container_width=True)
+        
+        annual_df = pd.DataFrame(series['annual']['production'], columns=series['metals'])
+        annual_df.insert(0, 'Year', np.arange(1, len(annual_df) + 1))
+        annual_df.insert(1, 'Ore Processed (Mt)', series['annual']['processed'].sum(axis=1) / 1e6)
+        annual_df['Revenue ($)'] = series['annual']['revenue']
+        st.write("**Annual Production (kg) and Revenue:**")
+        st.dataframe(annual_df, use_container_width=True)
 
-# Feed selection
-feed_type = st.sidebar.selectbox("Select Feed Type:", ["Oxide Feed", "Sulphide Feed", "Both Feeds"])
 
-if production_scenario == "Custom":
-    # Custom input parameters
-    st.sidebar.subheader("Feed Composition")
+def npv_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Scheduled NPV/IRR of the predefined scenarios over schedule variants"""
+    st.write("**Life-of-Mine NPV Settings:**")
+    st.write("Schedules each predefined scenario year by year from its tonnage, throughput and mine life, "
+             "runs the plant model for every year and discounts the cash flows. Schedule variants compare "
+             "the cases under uncertainty.")
     
-    # Calculate individual metal grades from 3E grade
-    total_3e_grade = st.sidebar.slider("3E Grade (Pd+Pt+Au) g/t", 0.1, 2.0, 0.95, 0.05)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        discount_rate = st.slider("Discount Rate (%)", 0.0, 20.0, float(DEFAULT_ECONOMICS['discount_rate']), 0.5,
+                                  key="npv_discount")
+        price_escalation = st.slider("Price Escalation (%/year)", -5.0, 10.0, 0.0, 0.5, key="npv_price_esc")
+        cost_escalation = st.slider("Cost Escalation (%/year)", -5.0, 10.0, 0.0, 0.5, key="npv_cost_esc")
+        npv_grade_decline = st.slider("Grade Decline (%/year)", 0.0, 5.0, 0.0, 0.5, key="npv_grade_decline")
+    with col2:
+        capex = st.number_input("Initial Capital ($)", 0, 10**10, 10000000, 1000000, key="npv_capex")
+        mining_cost = st.number_input("Mining Cost ($/t mined)", 0.0, 10.0, 0.0, 0.001, format="%.3f",
+                                      key="npv_mining_cost")
+        processing_cost = st.number_input("Processing Cost ($/t processed)", 0.0, 10.0, 0.0, 0.001, format="%.3f",
+                                          key="npv_processing_cost")
+    with col3:
+        npv_variants = st.number_input("Schedule Variants", 100, 100000, 5000, 100, key="npv_variants")
+        st.write("**Variation (±% standard deviation)**")
+        npv_variation = {
+            'tonnage': st.slider("Tonnage", 0, 25, 5, 1, key="npv_tonnage_var"),
+            'grade': st.slider("Grade", 0, 25, 10, 1, key="npv_grade_var"),
+            'price': st.slider("Price", 0, 40, 15, 1, key="npv_price_var",
+                               help="Not used when metal prices follow a price model"),
+            'cost': st.slider("Costs", 0, 40, 10, 1, key="npv_cost_var"),
+            'capex': st.slider("Capital", 0, 40, 15, 1, key="npv_capex_var")
+        }
     
-    # Approximate split of 3E metals (based on typical ratios)
-    pd_ratio = st.sidebar.slider("Pd ratio in 3E (%)", 30, 70, 50, 5) / 100
-    pt_ratio = st.sidebar.slider("Pt ratio in 3E (%)", 20, 50, 30, 5) / 100
-    au_ratio = 1 - pd_ratio - pt_ratio
+    npv_price_model = price_model_inputs("npv", horizon=False)
+    if npv_price_model is not None:
+        # Every variant follows its own price path instead of a flat price factor
+        npv_variation['price'] = 0
     
-    pd_grade = total_3e_grade * pd_ratio / 1000  # Convert g/t to %
-    pt_grade = total_3e_grade * pt_ratio / 1000
-    au_grade = total_3e_grade * au_ratio / 1000
+    if st.button("Run Life-of-Mine NPV", type="primary"):
+        start_time = time.perf_counter()
+        economics = {
+            'discount_rate': discount_rate,
+            'price_escalation': price_escalation,
+            'cost_escalation': cost_escalation,
+            'capex': capex,
+            'mining_cost': mining_cost,
+            'processing_cost': processing_cost
+        }
+        factors = schedule_variants(int(npv_variants), npv_variation)
+        base_cases = {}
+        variant_cases = {}
+        for case_name, case_data in scenarios.items():
+            base_cases[case_name] = scenario_npv(case_data, process_params, metal_prices, feed_type, economics,
+                                                 npv_grade_decline)
+            variant_cases[case_name] = scenario_npv(case_data, process_params, metal_prices, feed_type, economics,
+                                                    npv_grade_decline, factors, npv_price_model)
+        elapsed = time.perf_counter() - start_time
+        
+        columns = st.columns(len(base_cases))
+        for column, (case_name, base) in zip(columns, base_cases.items()):
+            with column:
+                st.metric(f"{case_name} NPV", f"${base['npv'][0]:,.0f}")
+                irr_text = f"{base['irr'][0]:.1f}%" if np.isfinite(base['irr'][0]) else "n/a"
+                st.metric(f"{case_name} IRR", irr_text)
+        st.caption(f"{len(base_cases) * (int(npv_variants) + 1):,} schedules evaluated in {elapsed:.2f} s")
+        
+        cash_flow_df = pd.concat([
+            pd.DataFrame({'Year': np.arange(len(base['cash_flow'][0])), 'Cash Flow ($)': base['cash_flow'][0],
+                          'Case': case_name})
+            for case_name, base in base_cases.items()
+        ])
+        fig_cash_flow = px.bar(cash_flow_df, x='Year', y='Cash Flow ($)', color='Case', barmode='group',
+                               title="Annual Cash Flow (Base Case)")
+        plotly_chart(fig_cash_flow, use_container_width=True)
+        
+        # Every case binned on the server over the same edges
+        npv_edges = np.histogram_bin_edges(np.concatenate([v['npv'] for v in variant_cases.values()]), 60)
+        fig_npv = go.Figure([histogram_bar(np.histogram(variants['npv'], npv_edges)[0], npv_edges, name=case_name,
+                                           opacity=0.6)
+                             for case_name, variants in variant_cases.items()])
+        fig_npv.update_layout(barmode='overlay', title="NPV Distribution over Schedule Variants",
+                              xaxis_title="NPV ($)", yaxis_title="Variants")
+        plotly_chart(fig_npv, use_container_width=True)
+        
+        # P10-P90 band of cumulative cash flow by year, from the variant quantiles
+        fig_band = go.Figure()
+        for case_name, variants in variant_cases.items():
+            p10, p50, p90 = np.percentile(np.cumsum(variants['cash_flow'], axis=1), [10, 50, 90], axis=0)
+            year = np.arange(len(p50))
+            fig_band.add_trace(go.Scatter(x=year, y=p90, mode='lines', line=dict(width=0), showlegend=False,
+                                          legendgroup=case_name))
+            fig_band.add_trace(go.Scatter(x=year, y=p10, mode='lines', line=dict(width=0), fill='tonexty',
+                                          name=f"{case_name} P10-P90", legendgroup=case_name))
+            fig_band.add_trace(go.Scatter(x=year, y=p50, mode='lines', name=f"{case_name} P50",
+                                          legendgroup=case_name))
+        fig_band.update_layout(title="Cumulative Cash Flow over Schedule Variants", xaxis_title="Year",
+                               yaxis_title="Cumulative Cash Flow ($)")
+        plotly_chart(fig_band, use_container_width=True)
+        
+        if npv_price_model is not None:
+            # Paths of the longest case, relative to the sidebar prices (all cases share the same draws)
+            npv_price_paths = max(variant_cases.values(), key=lambda v: v['metal_prices'].shape[1])['metal_prices']
+            spot = np.array([metal_prices[metal] for metal in METALS])
+            traded = spot > 0
+            p10, p50, p90 = np.percentile(npv_price_paths[:, :, traded] / spot[traded] * 100, [10, 50, 90], axis=0)
+            year = np.arange(1, len(p50) + 1)
+            fig_prices = go.Figure()
+            for column, metal in enumerate(np.array(METALS)[traded]):
+                color = px.colors.qualitative.Plotly[column]
+                fig_prices.add_trace(go.Scatter(x=np.concatenate([year, year[::-1]]),
+                                                y=np.concatenate([p90[:, column], p10[::-1, column]]),
+                                                fill='toself', fillcolor=color, opacity=0.2, line=dict(width=0),
+                                                legendgroup=metal, name=f"{metal} P10-P90"))
+                fig_prices.add_trace(go.Scatter(x=year, y=p50[:, column], mode='lines', line=dict(color=color),
+                                                legendgroup=metal, name=f"{metal} P50"))
+            fig_prices.update_layout(title="Simulated Metal Prices over Schedule Variants", xaxis_title="Year",
+                                     yaxis_title="Price (% of current)")
+            plotly_chart(fig_prices, use_container_width=True)
+        
+        npv_summary_df = pd.DataFrame({
+            'Case': list(variant_cases),
+            'P10 NPV ($)': [np.percentile(v['npv'], 10) for v in variant_cases.values()],
+            'P50 NPV ($)': [np.percentile(v['npv'], 50) for v in variant_cases.values()],
+            'P90 NPV ($)': [np.percentile(v['npv'], 90) for v in variant_cases.values()],
+            'P(NPV > 0) (%)': [np.mean(v['npv'] > 0) * 100 for v in variant_cases.values()],
+            'Median IRR (%)': [np.nanmedian(v['irr']) if np.isfinite(v['irr']).any() else np.nan
+                               for v in variant_cases.values()]
+        })
+        st.dataframe(npv_summary_df, use_container_width=True)
+
+
+def block_model_panel(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Recovered metal and revenue of a block model, by domain and period"""
+    st.write("**Block Model Evaluation:**")
+    st.write("Streams a block model (one row per block with tonnes, metal grades and optional domain, period and "
+             "process columns) through the plant in chunks and totals recovered metal and revenue by domain and "
+             "period. Blocks are routed by their process column (oxide, sulphide or waste).")
     
-    cu_grade = st.sidebar.slider("Copper (%)", 0.05, 0.5, 0.11, 0.01)
-    ni_grade = st.sidebar.slider("Nickel (%)", 0.05, 0.5, 0.16, 0.01) if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
-    co_grade = st.sidebar.slider("Cobalt (%)", 0.005, 0.05, 0.017, 0.001) if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
+    col1, col2 = st.columns(2)
+    with col1:
+        block_path = st.text_input("Block Model Path on the Server (.csv, .parquet or .npy)", key="block_path").strip()
+    with col2:
+        block_upload = st.file_uploader("Or Upload a Block Model", type=["csv", "parquet", "npy"], key="block_upload")
     
-    # Process parameters
-    st.sidebar.subheader("Process Parameters")
-    oxide_throughput_mtpa = st.sidebar.slider("Oxide Throughput (Mtpa)", 0.5, 5.0, 2.0, 0.5)
-    sulphide_throughput_mtpa = st.sidebar.slider("Sulphide Throughput (Mtpa)", 5.0, 35.0, 15.0, 2.5)
+    if block_upload is not None:
+        block_source = block_upload
+        block_inputs = {'source': block_upload.name, 'size': block_upload.size, 'version': block_upload.file_id}
+    elif block_path and os.path.isfile(block_path):
+        block_source = block_path
+        block_inputs = {'source': os.path.abspath(block_path), 'size': os.path.getsize(block_path),
+                        'version': os.path.getmtime(block_path)}
+    else:
+        if block_path:
+            st.error(f"No file at {block_path}")
+        return
+    # Prices are applied to the totals on every rerun, so they are not part of the key
+    block_key = result_key('block_model', {**block_inputs, 'process_params': process_params, 'feed_type': feed_type})
     
-    # Convert to tonnes per hour
-    oxide_throughput = oxide_throughput_mtpa * 1000000 / (365 * 24)
-    sulphide_throughput = sulphide_throughput_mtpa * 1000000 / (365 * 24)
+    if st.button("Evaluate Block Model", type="primary"):
+        block_progress = st.empty()
+        start_time = time.perf_counter()
+        try:
+            summary = block_model_summary(block_source, process_params, None, feed_type,
+                                          progress=lambda blocks: block_progress.write(f"{blocks:,} blocks read"))
+        except (ImportError, ValueError) as error:
+            st.error(f"Could not evaluate the block model: {error}")
+            return
+        st.session_state['block_summary'] = (block_key, summary, time.perf_counter() - start_time)
+        block_progress.empty()
     
-    # Recovery rates
-    st.sidebar.subheader("Recovery Rates (%)")
-    pd_recovery = st.sidebar.slider("Pd Recovery", 70, 85, 78, 1)
-    pt_recovery = st.sidebar.slider("Pt Recovery", 35, 55, 45, 1)
-    au_recovery = st.sidebar.slider("Au Recovery", 60, 75, 66, 1)
-    ni_recovery = st.sidebar.slider("Ni Recovery", 35, 50, 43, 1)
-    cu_recovery = st.sidebar.slider("Cu Recovery", 70, 85, 80, 1)
-    co_recovery = st.sidebar.slider("Co Recovery", 35, 50, 42, 1)
+    stored_key, summary, elapsed = st.session_state.get('block_summary', (None, None, None))
+    if stored_key != block_key:
+        return
     
-else:
-    # Use predefined scenario
-    scenario_data = scenarios[production_scenario]
+    revenue = value(summary['recovered'], metal_prices)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Blocks", f"{summary['blocks'].sum():,}")
+    with col2:
+        st.metric("Total Tonnes", f"{summary['tonnes'].sum():,.0f} t")
+    with col3:
+        st.metric("Processed Tonnes", f"{summary['processed_tonnes'].sum():,.0f} t")
+    with col4:
+        st.metric("Revenue", f"${revenue.sum():,.0f}")
+    st.caption(f"{summary['blocks'].sum():,} blocks evaluated in {elapsed:.2f} s "
+               f"({summary['blocks'].sum() / max(elapsed, 1e-9):,.0f} blocks/s)")
     
-    st.sidebar.subheader(f"{production_scenario} Parameters")
-    st.sidebar.write(f"**Total Material to be Mined:** {scenario_data['total_mined']} Mt")
-    st.sidebar.write(f"**Total Material Processed:** {scenario_data['total_processed']} Mt")
-    st.sidebar.write(f"**Mine Life (Sulphide):** {scenario_data['mine_life_sulphide']} years")
-    st.sidebar.write(f"**Mine Life (Oxide):** {scenario_data['mine_life_oxide']} years")
+    block_df = pd.DataFrame({
+        'Domain': summary['domain'],
+        'Period': summary['period'],
+        'Blocks': summary['blocks'],
+        'Tonnes': summary['tonnes'],
+        'Processed Tonnes': summary['processed_tonnes'],
+        **{f'{metal} Grade (%)': summary['grade'][:, column] for column, metal in enumerate(METALS)},
+        **{f'{metal} Recovered (kg)': summary['recovered'][:, column] for column, metal in enumerate(METALS)},
+        'Revenue ($)': revenue
+    })
     
-    # Set grades based on scenario
-    total_3e_grade = scenario_data['3E_grade']
+    fig_blocks = px.bar(block_df, x='Period', y='Revenue ($)', color='Domain',
+                        title="Revenue by Period and Domain")
+    plotly_chart(fig_blocks, use_container_width=True)
     
-    # Approximate 3E metal split (typical ratios)
-    pd_grade = total_3e_grade * 0.5 / 1000  # 50% of 3E, convert g/t to %
-    pt_grade = total_3e_grade * 0.3 / 1000  # 30% of 3E
-    au_grade = total_3e_grade * 0.2 / 1000  # 20% of 3E
+    st.write("**Totals by Domain and Period:**")
+    st.dataframe(block_df, use_container_width=True)
     
-    cu_grade = scenario_data['cu_grade']
-    ni_grade = scenario_data['ni_grade'] if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
-    co_grade = scenario_data['co_grade'] if feed_type in ["Sulphide Feed", "Both Feeds"] else 0
+    st.write("**Grade-Tonnage and Cutoff Grade:**")
+    st.write("Ranks the blocks once by NSR (revenue per tonne after recovery) or 3E grade (Pd + Pt + Au) and keeps "
+             "running totals in that order, so the tonnes, grade and value above any cutoff are a binary search "
+             "away instead of another pass through the plant. Waste blocks are never processed.")
     
-    # Set throughput (convert Mtpa to t/h)
-    oxide_throughput = scenario_data['oxide_throughput'] * 1000000 / (365 * 24)
-    sulphide_throughput = scenario_data['sulphide_throughput'] * 1000000 / (365 * 24)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        cutoff_key = st.selectbox("Cutoff Key", list(CUTOFF_KEYS), format_func=CUTOFF_KEYS.get, key="cutoff_key")
+    with col2:
+        cutoff_processing_cost = st.number_input("Processing Cost ($/t processed)", 0.0, 10.0, 0.0, 0.001,
+                                                 format="%.3f", key="cutoff_processing_cost")
+    with col3:
+        cutoff_capacity = st.number_input("Plant Capacity (t, 0 = unlimited)", 0.0, 1e12, 0.0, 1e6, format="%.0f",
+                                          key="cutoff_capacity")
     
-    # Set recovery rates
-    pd_recovery = scenario_data['pd_recovery']
-    pt_recovery = scenario_data['pt_recovery']
-    au_recovery = scenario_data['au_recovery']
-    ni_recovery = scenario_data['ni_recovery']
-    cu_recovery = scenario_data['cu_recovery']
-    co_recovery = scenario_data['co_recovery']
-
-# Additional process parameters
-st.sidebar.subheader("Process Stage Parameters")
-
-# Oxide Process Controls
-if feed_type in ["Oxide Feed", "Both Feeds"]:
-    st.sidebar.write("**Oxide Process Controls:**")
-    oxide_feed_rate = st.sidebar.number_input("Oxide Feed Rate (t/h)", 100, 2000, int(oxide_throughput), 50, key="oxide_feed")
-    sizing_efficiency = st.sidebar.slider("Sizing Efficiency (%)", 85, 99, 98, 1, key="sizing_eff")
-    oxide_grinding_efficiency = st.sidebar.slider("Oxide Grinding Efficiency (%)", 85, 98, 92, 1, key="oxide_grind_eff")
-    leaching_efficiency = st.sidebar.slider("Leaching Efficiency (%)", 80, 95, 88, 1, key="leach_eff")
+    # NSR rankings are re-sorted in memory when prices change, so prices are not part of the key
+    ranking_key = result_key('grade_tonnage', {**block_inputs, 'process_params': process_params,
+                                               'feed_type': feed_type, 'cutoff_key': cutoff_key})
+    if st.button("Rank Blocks for Cutoff Analysis"):
+        start_time = time.perf_counter()
+        try:
+            grade_tonnage = GradeTonnage.from_blocks(block_source, process_params, metal_prices, feed_type, cutoff_key)
+        except (ImportError, ValueError) as error:
+            st.error(f"Could not rank the block model: {error}")
+            return
+        st.session_state['grade_tonnage'] = (ranking_key, grade_tonnage, time.perf_counter() - start_time)
     
-    # Individual metal recoveries in leaching
-    st.sidebar.write("*Leaching Metal Recoveries:*")
-    oxide_pd_recovery = st.sidebar.slider("Oxide Pd Recovery (%)", 70, 85, pd_recovery, 1, key="oxide_pd_rec")
-    oxide_au_recovery = st.sidebar.slider("Oxide Au Recovery (%)", 85, 95, 90, 1, key="oxide_au_rec")
-else:
-    oxide_feed_rate = 0
-    sizing_efficiency = 98
-    oxide_grinding_efficiency = 92
-    leaching_efficiency = 88
-    oxide_pd_recovery = 75
-    oxide_au_recovery = 90
-
-# Sulphide Process Controls
-if feed_type in ["Sulphide Feed", "Both Feeds"]:
-    st.sidebar.write("**Sulphide Process Controls:**")
-    sulphide_feed_rate = st.sidebar.number_input("Sulphide Feed Rate (t/h)", 500, 5000, int(sulphide_throughput), 100, key="sulphide_feed")
-    crushing_efficiency = st.sidebar.slider("Crushing Efficiency (%)", 90, 99, 98, 1, key="crush_eff")
-    sulphide_grinding_efficiency = st.sidebar.slider("Sulphide Grinding Efficiency (%)", 85, 98, 92, 1, key="sulphide_grind_eff")
+    stored_key, grade_tonnage, ranking_elapsed = st.session_state.get('grade_tonnage', (None, None, None))
+    if stored_key != ranking_key:
+        return
+    if cutoff_key == 'nsr' and grade_tonnage.metal_prices != metal_prices:
+        grade_tonnage = grade_tonnage.reprice(metal_prices)
+        st.session_state['grade_tonnage'] = (stored_key, grade_tonnage, ranking_elapsed)
     
-    # Flotation stage controls
-    st.sidebar.write("*Flotation Stage Controls:*")
-    cu_flotation_efficiency = st.sidebar.slider("Cu Flotation Efficiency (%)", 75, 95, 85, 1, key="cu_flot_eff")
-    cu_flotation_recovery = st.sidebar.slider("Cu Flotation Recovery (%)", 70, 85, cu_recovery, 1, key="cu_flot_rec")
+    start_time = time.perf_counter()
+    gt_curve = grade_tonnage.curve(metal_prices=metal_prices)
+    curve_elapsed = time.perf_counter() - start_time
+    optimum = grade_tonnage.optimal_cutoff(metal_prices, cutoff_processing_cost, cutoff_capacity or None)
+    optimum_elapsed = time.perf_counter() - start_time - curve_elapsed
+    gt_profit = gt_curve['revenue'] - cutoff_processing_cost * gt_curve['tonnes']
+    key_label = CUTOFF_KEYS[cutoff_key]
     
-    ni_flotation_efficiency = st.sidebar.slider("Ni Flotation Efficiency (%)", 70, 90, 80, 1, key="ni_flot_eff")
-    ni_flotation_recovery = st.sidebar.slider("Ni Flotation Recovery (%)", 35, 50, ni_recovery, 1, key="ni_flot_rec")
-    co_flotation_recovery = st.sidebar.slider("Co Flotation Recovery (%)", 35, 50, co_recovery, 1, key="co_flot_rec")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(f"Optimal Cutoff {key_label}",
+                  f"{optimum['cutoff']:,.4f}" if np.isfinite(optimum['cutoff']) else "Process nothing")
+    with col2:
+        st.metric("Tonnes Above Cutoff", f"{optimum['tonnes']:,.0f} t")
+    with col3:
+        st.metric(f"Mean {key_label} Above Cutoff", f"{optimum['mean_key']:,.4f}")
+    with col4:
+        st.metric("Revenue less Processing", f"${optimum['profit']:,.0f}")
+    st.caption(f"{len(grade_tonnage):,} blocks ranked in {ranking_elapsed:.2f} s; {len(gt_curve['cutoff']):,} "
+               f"cutoffs answered in {curve_elapsed * 1000:.1f} ms, every block's key scored as a cutoff in "
+               f"{optimum_elapsed * 1000:.0f} ms")
     
-    # PGM distribution in concentrates
-    st.sidebar.write("*PGM Distribution:*")
-    pgm_to_cu_concentrate = st.sidebar.slider("PGMs to Cu Concentrate (%)", 60, 85, 70, 5, key="pgm_cu_dist")
-    pgm_to_ni_concentrate = st.sidebar.slider("PGMs to Ni Concentrate (%)", 10, 35, 25, 5, key="pgm_ni_dist")
+    fig_gt = make_subplots(specs=[[{"secondary_y": True}]])
+    fig_gt.add_trace(go.Scatter(x=gt_curve['cutoff'], y=gt_curve['tonnes'], name="Tonnes Above Cutoff"))
+    fig_gt.add_trace(go.Scatter(x=gt_curve['cutoff'], y=gt_curve['mean_key'], name=f"Mean {key_label} Above Cutoff"),
+                     secondary_y=True)
+    fig_gt.update_layout(title="Grade-Tonnage Curve", xaxis_title=f"Cutoff {key_label}")
+    fig_gt.update_yaxes(title_text="Tonnes", secondary_y=False)
+    fig_gt.update_yaxes(title_text=key_label, secondary_y=True)
     
-    # Downstream processing
-    st.sidebar.write("*Downstream Processing:*")
-    pressure_oxidation_efficiency = st.sidebar.slider("Pressure Oxidation Efficiency (%)", 90, 98, 95, 1, key="press_ox_eff")
+    fig_cutoff = go.Figure()
+    fig_cutoff.add_trace(go.Scatter(x=gt_curve['cutoff'], y=gt_curve['revenue'], name="Revenue"))
+    fig_cutoff.add_trace(go.Scatter(x=gt_curve['cutoff'], y=gt_profit, name="Revenue less Processing"))
+    if np.isfinite(optimum['cutoff']):
+        fig_cutoff.add_vline(x=optimum['cutoff'], line_dash="dash", line_color="red", annotation_text="Optimum")
+    fig_cutoff.update_layout(title="Value Above Cutoff", xaxis_title=f"Cutoff {key_label}", yaxis_title="$")
     
-    # Final metal recoveries from concentrates
-    st.sidebar.write("*Final Metal Recovery from Concentrates:*")
-    final_cu_recovery = st.sidebar.slider("Final Cu Recovery (%)", 85, 98, 95, 1, key="final_cu_rec")
-    final_pd_recovery = st.sidebar.slider("Final Pd Recovery (%)", 85, 98, pd_recovery, 1, key="final_pd_rec")
-    final_pt_recovery = st.sidebar.slider("Final Pt Recovery (%)", 80, 95, pt_recovery, 1, key="final_pt_rec")
-    final_au_recovery = st.sidebar.slider("Final Au Recovery (%)", 85, 98, au_recovery, 1, key="final_au_rec")
-    final_ni_recovery = st.sidebar.slider("Final Ni Recovery (%)", 85, 98, 92, 1, key="final_ni_rec")
-    final_co_recovery = st.sidebar.slider("Final Co Recovery (%)", 85, 98, 90, 1, key="final_co_rec")
-else:
-    sulphide_feed_rate = 0
-    crushing_efficiency = 98
-    sulphide_grinding_efficiency = 92
-    cu_flotation_efficiency = 85
-    cu_flotation_recovery = 80
-    ni_flotation_efficiency = 80
-    ni_flotation_recovery = 43
-    co_flotation_recovery = 42
-    pgm_to_cu_concentrate = 70
-    pgm_to_ni_concentrate = 25
-    pressure_oxidation_efficiency = 95
-    final_cu_recovery = 95
-    final_pd_recovery = 78
-    final_pt_recovery = 45
-    final_au_recovery = 66
-    final_ni_recovery = 92
-    final_co_recovery = 90
+    col1, col2 = st.columns(2)
+    with col1:
+        plotly_chart(fig_gt, use_container_width=True)
+    with col2:
+        plotly_chart(fig_cutoff, use_container_width=True)
 
-# Interactive metal prices
-st.sidebar.subheader("Metal Prices (USD/kg)")
-metal_prices = {
-    'Cu': st.sidebar.number_input("Copper Price", 1.0, 20.0, 8.5, 0.1),
-    'Pd': st.sidebar.number_input("Palladium Price", 10000, 80000, 32000, 1000),
-    'Pt': st.sidebar.number_input("Platinum Price", 10000, 60000, 28000, 1000),
-    'Au': st.sidebar.number_input("Gold Price", 30000, 100000, 65000, 1000),
-    'Ni': st.sidebar.number_input("Nickel Price", 5.0, 50.0, 18.0, 1.0),
-    'Co': st.sidebar.number_input("Cobalt Price", 10.0, 80.0, 35.0, 1.0)
+
+ANALYSIS_PANELS = {
+    "Monte Carlo Simulation": monte_carlo_panel,
+    "Risk Analysis": risk_panel,
+    "Sensitivity Analysis": sensitivity_panel,
+    "Process Optimization": optimization_panel,
+    "Mine Life Time Series": time_series_panel,
+    "Life-of-Mine NPV": npv_panel,
+    "Block Model": block_model_panel
 }
 
-class MetallurgicalPlant:
-    def __init__(self, feed_composition, process_params):
-        self.feed_composition = feed_composition
-        self.process_params = process_params
-        self.results = {}
-        self.stage_results = {}
-        self.material_flow_warnings = []
-        self.bottlenecks = []
-        
-    def validate_material_flow(self, stage_name, required_mass, available_mass, process_type="oxide"):
-        """Validate if upstream process can provide sufficient material for downstream process"""
-        if required_mass > available_mass:
-            shortage = required_mass - available_mass
-            shortage_percent = (shortage / required_mass) * 100
-            
-            warning = {
-                'process_type': process_type,
-                'stage': stage_name,
-                'required_mass': required_mass,
-                'available_mass': available_mass,
-                'shortage': shortage,
-                'shortage_percent': shortage_percent,
-                'severity': 'Critical' if shortage_percent > 50 else 'High' if shortage_percent > 25 else 'Moderate'
-            }
-            
-            self.material_flow_warnings.append(warning)
-            return False
-        return True
-        
-    def check_process_bottlenecks(self):
-        """Identify process bottlenecks based on material flow constraints"""
-        self.bottlenecks = []
-        
-        # Check oxide process bottlenecks
-        if 'oxide' in self.stage_results:
-            oxide_stages = self.stage_results['oxide']
-            
-            # Check each stage capacity vs demand
-            stages = ['sizing', 'grinding', 'leaching']
-            stage_masses = [
-                oxide_stages['sizing']['mass'],
-                oxide_stages['grinding']['mass'],
-                oxide_stages['leaching']['mass']
-            ]
-            
-            # Find the limiting stage
-            min_throughput_idx = stage_masses.index(min(stage_masses))
-            min_throughput = stage_masses[min_throughput_idx]
-            
-            if min_throughput < oxide_stages['feed']['mass'] * 0.8:  # If significant loss
-                self.bottlenecks.append({
-                    'process': 'Oxide',
-                    'stage': stages[min_throughput_idx],
-                    'limiting_throughput': min_throughput,
-                    'feed_rate': oxide_stages['feed']['mass'],
-                    'efficiency_loss': (1 - min_throughput / oxide_stages['feed']['mass']) * 100
-                })
-        
-        # Check sulphide process bottlenecks
-        if 'sulphide' in self.stage_results:
-            sulphide_stages = self.stage_results['sulphide']
-            
-            # Check crushing -> grinding -> flotation capacity
-            crushing_output = sulphide_stages['crushing']['mass']
-            grinding_output = sulphide_stages['grinding']['mass']
-            flotation_capacity = sulphide_stages['cu_flotation']['concentrate_mass'] + sulphide_stages['ni_flotation']['concentrate_mass']
-            
-            if grinding_output < crushing_output * 0.9:
-                self.bottlenecks.append({
-                    'process': 'Sulphide',
-                    'stage': 'grinding',
-                    'limiting_throughput': grinding_output,
-                    'upstream_capacity': crushing_output,
-                    'efficiency_loss': (1 - grinding_output / crushing_output) * 100
-                })
-            
-            if flotation_capacity < grinding_output * 0.3:  # Expected concentrate yield
-                self.bottlenecks.append({
-                    'process': 'Sulphide',
-                    'stage': 'flotation',
-                    'limiting_throughput': flotation_capacity,
-                    'upstream_capacity': grinding_output,
-                    'efficiency_loss': (1 - flotation_capacity / (grinding_output * 0.3)) * 100
-                })
-        
-    def process_oxide_feed(self):
-        """Process oxide feed through sizing, grinding, and leaching with material flow validation"""
-        # Stage 1: Feed
-        feed_mass = self.process_params['oxide_feed_rate']
-        feed_pd = feed_mass * self.feed_composition['Pd'] / 100
-        feed_au = feed_mass * self.feed_composition['Au'] / 100
-        
-        # Stage 2: Sizing
-        sizing_efficiency = self.process_params['sizing_efficiency'] / 100
-        sizing_capacity = feed_mass * 1.2  # Sizing equipment can handle 20% more than feed rate
-        
-        # Check if sizing can handle the feed rate
-        if not self.validate_material_flow("Sizing", feed_mass, sizing_capacity, "oxide"):
-            # Reduce throughput to equipment capacity
-            effective_feed_mass = sizing_capacity
-        else:
-            effective_feed_mass = feed_mass
-            
-        sized_mass = effective_feed_mass * sizing_efficiency
-        sized_pd = feed_pd * (effective_feed_mass / feed_mass) * sizing_efficiency
-        sized_au = feed_au * (effective_feed_mass / feed_mass) * sizing_efficiency
-        sizing_losses = effective_feed_mass - sized_mass
-        
-        # Stage 3: Grinding
-        grinding_efficiency = self.process_params['oxide_grinding_efficiency'] / 100
-        grinding_capacity = sized_mass * 1.1  # Grinding can handle 10% more than sized output
-        
-        # Check grinding capacity constraint
-        if not self.validate_material_flow("Grinding", sized_mass, grinding_capacity, "oxide"):
-            effective_sized_mass = grinding_capacity
-            grinding_efficiency_adjusted = grinding_efficiency * 0.95  # Reduce efficiency when overloaded
-        else:
-            effective_sized_mass = sized_mass
-            grinding_efficiency_adjusted = grinding_efficiency
-            
-        ground_mass = effective_sized_mass * grinding_efficiency_adjusted
-        ground_pd = sized_pd * (effective_sized_mass / sized_mass) * grinding_efficiency_adjusted
-        ground_au = sized_au * (effective_sized_mass / sized_mass) * grinding_efficiency_adjusted
-        grinding_losses = effective_sized_mass - ground_mass
-        
-        # Stage 4: Leaching
-        leaching_efficiency = self.process_params['leaching_efficiency'] / 100
-        leaching_capacity = ground_mass * 1.05  # Leaching can handle 5% more than ground output
-        
-        # Check leaching capacity
-        if not self.validate_material_flow("Leaching", ground_mass, leaching_capacity, "oxide"):
-            effective_ground_mass = leaching_capacity
-        else:
-            effective_ground_mass = ground_mass
-            
-        leach_mass = effective_ground_mass * leaching_efficiency
-        
-        # Individual metal recoveries in leaching
-        pd_recovery_rate = self.process_params['oxide_pd_recovery'] / 100
-        au_recovery_rate = self.process_params['oxide_au_recovery'] / 100
-        
-        pd_recovered = ground_pd * (effective_ground_mass / ground_mass) * pd_recovery_rate
-        au_recovered = ground_au * (effective_ground_mass / ground_mass) * au_recovery_rate
-        
-        # Stage 5: Tailings
-        tailings_mass = effective_ground_mass - leach_mass
-        tailings_pd = ground_pd * (effective_ground_mass / ground_mass) - pd_recovered
-        tailings_au = ground_au * (effective_ground_mass / ground_mass) - au_recovered
-        
-        # Store stage-by-stage results
-        self.stage_results['oxide'] = {
-            'feed': {'mass': feed_mass, 'pd': feed_pd, 'au': feed_au},
-            'sizing': {'mass': sized_mass, 'pd': sized_pd, 'au': sized_au, 'losses': sizing_losses, 'capacity': sizing_capacity},
-            'grinding': {'mass': ground_mass, 'pd': ground_pd, 'au': ground_au, 'losses': grinding_losses, 'capacity': grinding_capacity},
-            'leaching': {'mass': leach_mass, 'pd_recovered': pd_recovered, 'au_recovered': au_recovered, 'capacity': leaching_capacity},
-            'tailings': {'mass': tailings_mass, 'pd': tailings_pd, 'au': tailings_au}
-        }
-        
-        self.results['oxide'] = {
-            'feed_mass': feed_mass,
-            'sized_mass': sized_mass,
-            'ground_mass': ground_mass,
-            'pd_recovered': pd_recovered,
-            'au_recovered': au_recovered,
-            'tailings_mass': tailings_mass,
-            'leach_solution_mass': leach_mass
-        }
-        
-    def process_sulphide_feed(self):
-        """Process sulphide feed through all stages with detailed material flow validation"""
-        # Stage 1: Feed
-        feed_mass = self.process_params['sulphide_feed_rate']
-        feed_cu = feed_mass * self.feed_composition['Cu'] / 100
-        feed_pd = feed_mass * self.feed_composition['Pd'] / 100
-        feed_pt = feed_mass * self.feed_composition['Pt'] / 100
-        feed_au = feed_mass * self.feed_composition['Au'] / 100
-        feed_ni = feed_mass * self.feed_composition['Ni'] / 100
-        feed_co = feed_mass * self.feed_composition['Co'] / 100
-        
-        # Stage 2: Crushing
-        crushing_efficiency = self.process_params['crushing_efficiency'] / 100
-        crushing_capacity = feed_mass * 1.3  # Crushers typically have higher capacity
-        
-        if not self.validate_material_flow("Crushing", feed_mass, crushing_capacity, "sulphide"):
-            effective_feed_mass = crushing_capacity
-        else:
-            effective_feed_mass = feed_mass
-            
-        crushed_mass = effective_feed_mass * crushing_efficiency
-        crushed_cu = feed_cu * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushed_pd = feed_pd * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushed_pt = feed_pt * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushed_au = feed_au * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushed_ni = feed_ni * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushed_co = feed_co * (effective_feed_mass / feed_mass) * crushing_efficiency
-        crushing_losses = effective_feed_mass - crushed_mass
-        
-        # Stage 3: Grinding
-        grinding_efficiency = self.process_params['sulphide_grinding_efficiency'] / 100
-        grinding_capacity = crushed_mass * 0.95  # Grinding is often the bottleneck
-        
-        if not self.validate_material_flow("Grinding", crushed_mass, grinding_capacity, "sulphide"):
-            effective_crushed_mass = grinding_capacity
-            grinding_efficiency_adjusted = grinding_efficiency * 0.92  # Reduced efficiency when overloaded
-        else:
-            effective_crushed_mass = crushed_mass
-            grinding_efficiency_adjusted = grinding_efficiency
+
+@profiled_fragment
+def analysis_section(feed_composition, process_params, metal_prices, feed_type, production_scenario):
+    """Multi-scenario analysis: its widgets rerun only this fragment, not the page above it"""
+    st.subheader("🎯 Multi-Scenario Analysis & Risk Assessment")
+    
+    # Analysis type selection
+    analysis_type = st.selectbox("Select Analysis Type:", list(ANALYSIS_PANELS))
+    with profiling.section(analysis_type):
+        ANALYSIS_PANELS[analysis_type](feed_composition, process_params, metal_prices, feed_type, production_scenario)
+
+
+profiling.begin("Multi-scenario analysis")
+
+# Multi-Scenario Analysis & Risk Assessment
+analysis_section(feed_composition, process_params, metal_prices, feed_type, production_scenario)
+
+
+@profiled_fragment
+def economics_section(plant, metal_prices, feed_type):
+    """Plant value per process and revenue breakdown by metal"""
+    profiling.begin("Economic analysis")
+
+    # Economic analysis
+    st.subheader("💰 Economic Analysis")
+
+    col1, col2, col3 = st.columns(3)
+
+    plant_values = process_values(plant.results, metal_prices)
+    total_value_per_hour = total_value(plant.results, metal_prices)
+
+    if 'oxide' in plant_values:
+        with col1:
+            st.metric("Oxide Feed Value", f"${plant_values['oxide']:,.0f}/hour")
+
+    if 'sulphide' in plant_values:
+        with col2:
+            st.metric("Sulphide Feed Value", f"${plant_values['sulphide']:,.0f}/hour")
+
+    with col3:
+        st.metric("Total Plant Value", f"${total_value_per_hour:,.0f}/hour")
+        st.metric("Daily Revenue", f"${total_value_per_hour * 24:,.0f}/day")
+
+    # Revenue breakdown
+    if feed_type in ["Oxide Feed", "Sulphide Feed", "Both Feeds"]:
+        st.subheader("📊 Revenue Breakdown by Metal")
+        
+        # Create revenue breakdown chart
+        metals_produced = []
+        revenue_values = []
+        
+        for process_type, metal_values in metal_revenue(plant.results, metal_prices).items():
+            for metal, metal_value in metal_values.items():
+                if plant.results[process_type][f'{metal.lower()}_recovered'] > 0:
+                    metals_produced.append(f'{metal} ({process_type.title()})')
+                    revenue_values.append(metal_value)
+        
+        if metals_produced:
+            fig_revenue = px.pie(
+                values=revenue_values,
+                names=metals_produced,
+                title="Revenue Contribution by Metal ($/hour)"
+            )
+            plotly_chart(fig_revenue, use_container_width=True)
             
-        ground_mass = effective_crushed_mass * grinding_efficiency_adjusted
-        ground_cu = crushed_cu * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        ground_pd = crushed_pd * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        ground_pt = crushed_pt * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        ground_au = crushed_au * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        ground_ni = crushed_ni * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        ground_co = crushed_co * (effective_crushed_mass / crushed_mass) * grinding_efficiency_adjusted
-        grinding_losses = effective_crushed_mass - ground_mass
-        
-        # Stage 4: Copper Flotation
-        cu_flotation_efficiency = self.process_params['cu_flotation_efficiency'] / 100
-        cu_flotation_recovery = self.process_params['cu_flotation_recovery'] / 100
-        pgm_to_cu_concentrate = self.process_params['pgm_to_cu_concentrate'] / 100
-        
-        cu_flotation_capacity = ground_mass * 1.1  # Flotation capacity
-        
-        if not self.validate_material_flow("Cu Flotation", ground_mass, cu_flotation_capacity, "sulphide"):
-            effective_ground_mass = cu_flotation_capacity
-        else:
-            effective_ground_mass = ground_mass
-        
-        # Copper concentrate mass and metals
-        cu_concentrate_mass = effective_ground_mass * 0.15  # Typical concentrate yield
-        cu_in_concentrate = ground_cu * (effective_ground_mass / ground_mass) * cu_flotation_recovery
-        pd_in_cu_concentrate = ground_pd * (effective_ground_mass / ground_mass) * pgm_to_cu_concentrate
-        pt_in_cu_concentrate = ground_pt * (effective_ground_mass / ground_mass) * pgm_to_cu_concentrate
-        au_in_cu_concentrate = ground_au * (effective_ground_mass / ground_mass) * pgm_to_cu_concentrate
-        
-        # Remaining material after Cu flotation
-        remaining_after_cu = effective_ground_mass - cu_concentrate_mass
-        remaining_pd = ground_pd * (effective_ground_mass / ground_mass) - pd_in_cu_concentrate
-        remaining_pt = ground_pt * (effective_ground_mass / ground_mass) - pt_in_cu_concentrate
-        remaining_au = ground_au * (effective_ground_mass / ground_mass) - au_in_cu_concentrate
-        remaining_ni = ground_ni * (effective_ground_mass / ground_mass)
-        remaining_co = ground_co * (effective_ground_mass / ground_mass)
-        
-        # Stage 5: Nickel Flotation
-        ni_flotation_efficiency = self.process_params['ni_flotation_efficiency'] / 100
-        ni_flotation_recovery = self.process_params['ni_flotation_recovery'] / 100
-        co_flotation_recovery = self.process_params['co_flotation_recovery'] / 100
-        pgm_to_ni_concentrate = self.process_params['pgm_to_ni_concentrate'] / 100
-        
-        ni_flotation_capacity = remaining_after_cu * 1.05
-        
-        if not self.validate_material_flow("Ni Flotation", remaining_after_cu, ni_flotation_capacity, "sulphide"):
-            effective_remaining_mass = ni_flotation_capacity
-        else:
-            effective_remaining_mass = remaining_after_cu
-        
-        # Nickel concentrate
-        ni_concentrate_mass = effective_remaining_mass * 0.20  # Typical concentrate yield
-        ni_in_concentrate = remaining_ni * (effective_remaining_mass / remaining_after_cu) * ni_flotation_recovery
-        co_in_concentrate = remaining_co * (effective_remaining_mass / remaining_after_cu) * co_flotation_recovery
-        pd_in_ni_concentrate = remaining_pd * (effective_remaining_mass / remaining_after_cu) * pgm_to_ni_concentrate
-        pt_in_ni_concentrate = remaining_pt * (effective_remaining_mass / remaining_after_cu) * pgm_to_ni_concentrate
-        au_in_ni_concentrate = remaining_au * (effective_remaining_mass / remaining_after_cu) * pgm_to_ni_concentrate
-        
-        # Tailings after flotation
-        flotation_tailings = effective_remaining_mass - ni_concentrate_mass
-        
-        # Stage 6: Pressure Oxidation
-        pressure_ox_efficiency = self.process_params['pressure_oxidation_efficiency'] / 100
-        pressure_ox_capacity = (cu_concentrate_mass + ni_concentrate_mass) * 1.02
-        
-        total_concentrate = cu_concentrate_mass + ni_concentrate_mass
-        if not self.validate_material_flow("Pressure Oxidation", total_concentrate, pressure
+            # Revenue breakdown table
+            revenue_df = pd.DataFrame({
+                'Metal': metals_produced,
+                'Revenue ($/hour)': [f"${val:,.0f}" for val in revenue_values],
+                'Revenue ($/day)': [f"${val*24:,.0f}" for val in revenue_values],
+                'Revenue ($/year)': [f"${val*24*365:,.0f}" for val in revenue_values]
+            })
+            st.dataframe(revenue_df, use_container_width=True)
+
+
+economics_section(plant, metal_prices, feed_type)
+
+
+profiling.begin("Cache statistics")
+
+# Cache statistics (rendered last so the counts include this rerun)
+with st.sidebar.expander("🗄️ Simulation Cache"):
+    for cache_name, info in cache_stats().items():
+        st.write(f"**{cache_name.replace('_', ' ').title()}:** {info['hits']} hits, {info['misses']} misses, {info['currsize']}/{info['maxsize']} entries")
+    disk_store = result_store()
+    if disk_store is not None:
+        store_info = disk_store.stats()
+        st.write(f"**Result Store:** {store_info['hits']} hits, {store_info['misses']} misses, {store_info['entries']} entries, {store_info['bytes'] / 1e6:,.1f}/{store_info['max_bytes'] / 1e6:,.0f} MB")
+
+# Per-section timings of the last full rerun (inclusive: nested entries are also counted in their section)
+profiling.end_page()
+if profiling.enabled():
+    with st.sidebar.expander("⏱️ Performance (last full rerun)", expanded=True):
+        timings_table("Times are inclusive: model stages, tables, styling and Plotly serialization are also counted in the page section they ran in. Model stages are absent on a cache hit. Interacting with a section reruns only that section; its timings are shown under it.")
+
+# Footer
+st.markdown("---")
+st.markdown("**Note:** This simulator uses simplified metallurgical models for demonstration purposes. Actual plant performance may vary based on ore characteristics, equipment efficiency, and operating conditions.")
@@ -0,0 +1,85 @@
+"""Headless metallurgical plant model for the PGE process simulator.
+
+Importing this package has no Streamlit or UI side effects, so batch jobs,
+worker processes and tests can use the model directly.
+"""
+from .batch import run_batch_simulation, simulate_oxide_batch, simulate_sulphide_batch
+from .blocks import block_model_summary, evaluate_blocks, read_block_chunks
+from .cache import assay_grade_model, cache_stats, clear_caches, simulate_plant, stage_tables, transfer_model
+from .cutoff import CUTOFF_KEYS, GradeTonnage
+from .grades import covariance_grade_model, fit_grade_model, grade_factors, read_assays
+from .montecarlo import run_monte_carlo, stream_monte_carlo
+from .optimize import optimize_process
+from .plant import MetallurgicalPlant
+from .prices import DEFAULT_PRICE_MODEL, PRICE_MODELS, price_paths, sample_prices
+from .reliability import FAILURE_MODES, run_risk_analysis, value_risk
+from .results import StageResults
+from .revenue import PAYABLE_METALS, metal_revenue, payable_production, price_sweep, process_values, total_value
+from .sampling import SAMPLERS, latin_hypercube, normal_deviates, norm_cdf, norm_ppf, sobol_points
+from .schedule import evaluate_schedules, scenario_npv, scenario_schedule
+from .scenarios import (FEED_TYPES, METALS, PROCESS_PARAM_RANGES, mtpa_to_tph, scenario_feed_composition,
+                        scenarios)
+from .sensitivity import sobol_indices, tornado_analysis
+from .streaming import RunningStats, StreamingHistogram
+from .timeseries import simulate_mine_life
+from .transfer import TransferModel
+
+__all__ = [
+    'CUTOFF_KEYS',
+    'DEFAULT_PRICE_MODEL',
+    'FAILURE_MODES',
+    'FEED_TYPES',
+    'GradeTonnage',
+    'METALS',
+    'MetallurgicalPlant',
+    'PAYABLE_METALS',
+    'PRICE_MODELS',
+    'PROCESS_PARAM_RANGES',
+    'RunningStats',
+    'SAMPLERS',
+    'StageResults',
+    'StreamingHistogram',
+    'TransferModel',
+    'assay_grade_model',
+    'block_model_summary',
+    'cache_stats',
+    'clear_caches',
+    'covariance_grade_model',
+    'evaluate_blocks',
+    'evaluate_schedules',
+    'fit_grade_model',
+    'grade_factors',
+    'latin_hypercube',
+    'metal_revenue',
+    'mtpa_to_tph',
+    'norm_cdf',
+    'norm_ppf',
+    'normal_deviates',
+    'optimize_process',
+    'payable_production',
+    'price_paths',
+    'price_sweep',
+    'process_values',
+    'read_assays',
+    'read_block_chunks',
+    'run_batch_simulation',
+    'run_monte_carlo',
+    'run_risk_analysis',
+    'sample_prices',
+    'scenario_feed_composition',
+    'scenario_npv',
+    'scenario_schedule',
+    'scenarios',
+    'simulate_mine_life',
+    'simulate_plant',
+    'simulate_oxide_batch',
+    'simulate_sulphide_batch',
+    'sobol_indices',
+    'sobol_points',
+    'stage_tables',
+    'stream_monte_carlo',
+    'total_value',
+    'tornado_analysis',
+    'transfer_model',
+    'value_risk',
+]
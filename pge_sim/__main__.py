@@ -0,0 +1,7 @@
+"""Command-line batch scenario runner: python -m pge_sim (see pge_sim.runner)"""
+import sys
+
+from .runner import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Reductions of large result arrays to chart-sized data.
+
+Charts are drawn from these instead of raw samples, so the payload sent to
+the browser depends on the number of bins or points kept, not on the number
+of Monte Carlo iterations, replications or hourly steps.
+"""
+import numpy as np
+
+# Points kept per chart by downsample_index
+MAX_CHART_POINTS = 2000
+
+# Bins of the fine histogram a density curve is estimated from
+DENSITY_BINS = 512
+
+
+def histogram(values, bins=50):
+    """Counts and edges of the finite values in bins equal-width bins"""
+    values = np.asarray(values, dtype=float).ravel()
+    return np.histogram(values[np.isfinite(values)], bins)
+
+
+def density(counts, edges, points=200, bandwidth=None):
+    """Gaussian kernel density curve (x, density per unit of x) of binned data.
+
+    Each bin counts as its centre; bandwidth defaults to Silverman's rule
+    from the binned mean and standard deviation, and is never narrower than
+    one bin.
+    """
+    counts = np.asarray(counts, dtype=float)
+    centers = (edges[:-1] + edges[1:]) / 2
+    total = counts.sum()
+    if total == 0:
+        return centers, np.zeros_like(centers)
+    if bandwidth is None:
+        mean = counts @ centers / total
+        std = np.sqrt(counts @ (centers - mean) ** 2 / total)
+        bandwidth = 1.06 * std * total ** -0.2
+    bandwidth = max(bandwidth, np.diff(edges).max())
+
+    x = np.linspace(edges[0], edges[-1], points)
+    kernel = np.exp(-0.5 * ((x[:, np.newaxis] - centers) / bandwidth) ** 2)
+    return x, kernel @ counts / (total * bandwidth * np.sqrt(2 * np.pi))
+
+
+def downsample_index(values, max_points=MAX_CHART_POINTS):
+    """Sorted indices of about max_points rows of values that keep the shape of each series.
+
+    values is a series (n,) or several sharing an x axis (n, k). The rows
+    are split into equal buckets and each bucket keeps the rows holding the
+    minimum and maximum of every series, plus the first and last row, so
+    peaks and troughs survive the reduction.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    rows, series = values.shape
+    if rows <= max_points:
+        return np.arange(rows)
+
+    size = int(np.ceil(rows / max(1, max_points // (2 * series))))
+    buckets = int(np.ceil(rows / size))
+    padded = np.full((buckets * size, series), np.nan)
+    padded[:rows] = values
+    padded = padded.reshape(buckets, size, series)
+    offsets = (np.arange(buckets) * size)[:, np.newaxis]
+    low = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1) + offsets
+    high = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1) + offsets
+    return np.unique(np.concatenate([[0, rows - 1], low.ravel(), high.ravel()]))
@@ -0,0 +1,221 @@
+"""Block-model evaluation: recovered metal and revenue by domain and period.
+
+A block model has one row per block with its tonnes and metal grades (%,
+columns named as for assays, e.g. 'Pd' or 'pt_pct'), plus optional columns:
+
+- domain: label the results are grouped by (default 'all'; blank cells are
+  grouped as '(none)')
+- period: mining period the block is scheduled in (default 'all'; blank
+  cells as for domain)
+- process: the flowsheet the block is sent to, 'oxide', 'sulphide' or
+  'waste' (default: the only process of the feed type)
+
+Every flowsheet is linear in the metal it is fed once its overload branches
+are fixed by the process parameters (see transfer.TransferModel), so a
+block's payable metal is its contained metal times the transfer
+coefficients of its process. Blocks are read in chunks (CSV and Parquet
+through runner.read_chunks, .npy memory-mapped) and each chunk is reduced to
+per-group sums before the next is read, so memory depends on the chunk size
+and the number of domain/period groups, not on the size of the file.
+
+Metal is in the plant model's production units (production per hour times
+hours of feed, labelled kg in the app); revenue is that times the metal
+prices, so aggregated results can be re-priced without rereading the file.
+"""
+import os
+
+import numpy as np
+
+from .cache import transfer_model
+from .grades import assay_columns
+from .revenue import value
+from .runner import read_chunks
+from .scenarios import METALS
+
+# Blocks per chunk
+BLOCK_CHUNK_SIZE = 500000
+
+# Accepted names of the tonnage column (case-insensitive)
+TONNES_COLUMNS = ('tonnes', 'tonnage', 'tons', 'mass')
+
+# Process a block is sent to, by the start of its process label (case-insensitive)
+PROCESS_LABELS = {'ox': 'oxide', 'sul': 'sulphide', 'waste': 'waste'}
+
+# Group label used when a block model has no domain or period column
+ALL = 'all'
+
+# Group label of blocks with a blank domain or period
+MISSING = '(none)'
+
+
+def _column_names(chunk):
+    return list(chunk.dtype.names) if isinstance(chunk, np.ndarray) else list(chunk.columns)
+
+
+def read_block_chunks(source, chunk_size=BLOCK_CHUNK_SIZE):
+    """Chunks of a block model file: DataFrames for CSV and Parquet, structured array slices for .npy.
+
+    source is a path or a file object with a name (e.g. an upload). A .npy
+    file must hold a structured array with one field per column; from a
+    path it is memory-mapped, so only the chunk being evaluated is read.
+    """
+    name = getattr(source, 'name', source)
+    if str(name).lower().endswith('.npy'):
+        blocks = np.load(source, mmap_mode='r' if isinstance(source, (str, os.PathLike)) else None)
+        if blocks.dtype.names is None:
+            raise ValueError("A .npy block model must be a structured array with one field per column")
+        for start in range(0, len(blocks), chunk_size):
+            yield blocks[start:start + chunk_size]
+        return
+    yield from read_chunks(source, chunk_size)
+
+
+def block_columns(columns):
+    """{role: column} for the tonnes, grade (one per metal), domain, period and process columns found"""
+    lowered = {str(column).strip().lower(): column for column in columns}
+    tonnes = next((lowered[name] for name in TONNES_COLUMNS if name in lowered), None)
+    if tonnes is None:
+        raise ValueError(f"Block model needs a tonnes column ({', '.join(TONNES_COLUMNS)})")
+    grades = assay_columns([column for column in columns if column != tonnes])
+    if not grades:
+        raise ValueError(f"Block model needs at least one grade column named after a metal ({', '.join(METALS)})")
+    roles = {'tonnes': tonnes, **grades}
+    for role in ('domain', 'period', 'process'):
+        if role in lowered:
+            roles[role] = lowered[role]
+    return roles
+
+
+def _block_routes(labels, processes):
+    """Row of the transfer coefficients for each block's process; len(processes) for waste or unknown processes"""
+    # Imported here so the headless model does not need pandas
+    import pandas as pd
+
+    codes, names = pd.factorize(np.asarray(labels), use_na_sentinel=False)
+    rows = np.full(len(names), len(processes))
+    for index, label in enumerate(names):
+        process_type = next((process for prefix, process in PROCESS_LABELS.items()
+                             if str(label).strip().lower().startswith(prefix)), None)
+        if process_type is None:
+            raise ValueError(f"Unknown block process '{label}': use oxide, sulphide or waste")
+        if process_type in processes:
+            rows[index] = processes.index(process_type)
+    return rows[codes]
+
+
+def _block_inputs(blocks, roles, processes):
+    """Tonnes, contained metal (one row per metal in METALS) and coefficient row (see _block_routes) of every block"""
+    tonnes = np.nan_to_num(np.asarray(blocks[roles['tonnes']], dtype=float))
+    contained = np.zeros((len(METALS), len(tonnes)))
+    for row, metal in enumerate(METALS):
+        if metal in roles:
+            np.multiply(tonnes / 100, np.nan_to_num(np.asarray(blocks[roles[metal]], dtype=float)), out=contained[row])
+
+    if 'process' in roles:
+        routes = _block_routes(blocks[roles['process']], processes)
+    elif len(processes) == 1:
+        routes = np.zeros(len(tonnes), dtype=int)
+    else:
+        raise ValueError("With both feeds the block model needs a process column (oxide, sulphide or waste)")
+    return tonnes, contained, routes
+
+
+def _route_coefficients(model):
+    """Transfer coefficients per route: one row per process of model, then a row of zeros for waste"""
+    return np.vstack([model.coefficients, np.zeros(len(METALS))])
+
+
+def evaluate_blocks(blocks, process_params, feed_type="Both Feeds"):
+    """Tonnes, contained and payable metal (one column per metal in METALS) of every block in a chunk.
+
+    Missing or non-finite tonnes and grades count as 0. Blocks sent to a
+    process the feed type does not run are treated like waste: nothing is
+    recovered from them.
+    """
+    model = transfer_model(process_params, feed_type)
+    tonnes, contained, routes = _block_inputs(blocks, block_columns(_column_names(blocks)), model.processes)
+    return {
+        'tonnes': tonnes,
+        'contained': contained.T,
+        'recovered': contained.T * _route_coefficients(model)[routes],
+        'processed': routes < len(model.processes)
+    }
+
+
+def _group_codes(blocks, roles, role):
+    """Integer code of every block's domain or period, and the label of each code"""
+    # Imported here so the headless model does not need pandas
+    import pandas as pd
+
+    if role not in roles:
+        return np.zeros(len(blocks), dtype=int), [ALL]
+    codes, labels = pd.factorize(np.asarray(blocks[roles[role]]), use_na_sentinel=False)
+    return codes, [MISSING if pd.isna(label) else label for label in np.asarray(labels).tolist()]
+
+
+def _group_order(group):
+    """Sort key of a (domain, period) group: numeric labels first, so mixed label types never compare"""
+    return tuple((isinstance(label, str), label) for label in group)
+
+
+def block_model_summary(source, process_params, metal_prices=None, feed_type="Both Feeds",
+                        chunk_size=BLOCK_CHUNK_SIZE, progress=None):
+    """Stream a block model through the plant and total it by domain and period.
+
+    source is a block model file (see read_block_chunks) or an iterable of
+    chunks. Returns columnar arrays with one row per (domain, period),
+    sorted: domain, period, blocks, tonnes, processed_tonnes, grade (mean %,
+    weighted by tonnes), contained and recovered (one column per metal in
+    METALS) and, with metal_prices, revenue. progress, if given, is called
+    with the number of blocks read so far.
+    """
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+        source = read_block_chunks(source, chunk_size)
+    model = transfer_model(process_params, feed_type)
+    routes_count = len(model.processes) + 1
+    # Per (domain, period): one row per route of block count, tonnes and contained metal
+    totals = {}
+    blocks_read = 0
+
+    for chunk in source:
+        roles = block_columns(_column_names(chunk))
+        tonnes, contained, routes = _block_inputs(chunk, roles, model.processes)
+        domain_codes, domains = _group_codes(chunk, roles, 'domain')
+        period_codes, periods = _group_codes(chunk, roles, 'period')
+
+        # Payable metal is linear in contained metal, so blocks are summed per route and valued once per group
+        keys, codes = np.unique((domain_codes * len(periods) + period_codes) * routes_count + routes,
+                                return_inverse=True)
+        sums = np.stack([np.bincount(codes, minlength=len(keys))] +
+                        [np.bincount(codes, weights=weights, minlength=len(keys))
+                         for weights in (tonnes, *contained)], axis=1)
+        for key, row in zip(keys, sums):
+            group_key, route = divmod(key, routes_count)
+            group = (domains[group_key // len(periods)], periods[group_key % len(periods)])
+            if group not in totals:
+                totals[group] = np.zeros((routes_count, sums.shape[1]))
+            totals[group][route] += row
+
+        blocks_read += len(tonnes)
+        if progress is not None:
+            progress(blocks_read)
+
+    if not totals:
+        raise ValueError("Block model has no blocks")
+    groups = sorted(totals, key=_group_order)
+    sums = np.array([totals[group] for group in groups])
+    tonnes = sums[:, :, 1].sum(axis=1)
+    contained = sums[:, :, 2:]
+    summary = {
+        'domain': np.array([domain for domain, _ in groups]),
+        'period': np.array([period for _, period in groups]),
+        'blocks': sums[:, :, 0].sum(axis=1).astype(int),
+        'tonnes': tonnes,
+        'processed_tonnes': sums[:, :-1, 1].sum(axis=1),
+        'grade': contained.sum(axis=1) * 100 / np.where(tonnes > 0, tonnes, 1)[:, np.newaxis],
+        'contained': contained.sum(axis=1),
+        'recovered': np.einsum('grm,rm->gm', contained, _route_coefficients(model))
+    }
+    if metal_prices is not None:
+        summary['revenue'] = value(summary['recovered'], metal_prices)
+    return summary
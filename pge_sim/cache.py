@@ -0,0 +1,90 @@
+"""Memoized base simulation, derived stage tables and assay grade models.
+
+Results are held in process-wide, size-bounded LRU caches keyed on the feed
+composition, process parameters and feed type (or the assay file contents), so
+every session served by the same process shares them. Cached objects are
+returned by reference and must be treated as read-only.
+"""
+from functools import lru_cache
+
+from .grades import fit_grade_model, read_assays
+from .plant import MetallurgicalPlant
+from .transfer import TransferModel
+
+# Maximum number of distinct input sets retained per cache
+CACHE_SIZE = 256
+
+
+def freeze(mapping):
+    """Hashable, order-independent key for a dict of scalar inputs"""
+    return tuple(sorted((name, float(value)) for name, value in mapping.items()))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_plant(feed_key, params_key, feed_type):
+    plant = MetallurgicalPlant(dict(feed_key), dict(params_key))
+    plant.run_simulation(feed_type)
+    return plant
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_transfer_model(params_key, feed_type):
+    return TransferModel(dict(params_key), feed_type)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_stage_tables(feed_key, params_key, feed_type):
+    # Imported here so the headless model does not need pandas
+    from .tables import capacity_utilization_table, oxide_process_table, pgm_distribution_table, sulphide_process_table
+
+    stage_results = _cached_plant(feed_key, params_key, feed_type).stage_results
+    tables = {'capacity': capacity_utilization_table(stage_results)}
+    if 'oxide' in stage_results:
+        tables['oxide_process'] = oxide_process_table(stage_results['oxide'])
+    if 'sulphide' in stage_results:
+        tables['sulphide_process'] = sulphide_process_table(stage_results['sulphide'])
+        coefficients = _cached_transfer_model(params_key, feed_type).coefficient_table()['sulphide']
+        tables['pgm_distribution'] = pgm_distribution_table(stage_results['sulphide'], coefficients)
+    return tables
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_grade_model(assay_csv):
+    return fit_grade_model(read_assays(assay_csv))
+
+
+def simulate_plant(feed_composition, process_params, feed_type="Both Feeds"):
+    """Simulated MetallurgicalPlant for these inputs, reused from the cache when seen before"""
+    return _cached_plant(freeze(feed_composition), freeze(process_params), feed_type)
+
+
+def transfer_model(process_params, feed_type="Both Feeds"):
+    """Flowsheet compiled to feed-to-payable transfer coefficients for these parameters, cached"""
+    return _cached_transfer_model(freeze(process_params), feed_type)
+
+
+def stage_tables(feed_composition, process_params, feed_type="Both Feeds"):
+    """Oxide/sulphide process, PGM distribution and capacity tables for these inputs, cached"""
+    return _cached_stage_tables(freeze(feed_composition), freeze(process_params), feed_type)
+
+
+def assay_grade_model(assay_csv):
+    """Grade model fitted to the bytes of an assay CSV (see grades.fit_grade_model), fitted once per file"""
+    return _cached_grade_model(bytes(assay_csv))
+
+
+def cache_stats():
+    """Hit/miss counts and current size of each cache"""
+    return {
+        name: cached.cache_info()._asdict()
+        for name, cached in [('simulation', _cached_plant), ('transfer_model', _cached_transfer_model),
+                             ('stage_tables', _cached_stage_tables), ('grade_model', _cached_grade_model)]
+    }
+
+
+def clear_caches():
+    """Drop all memoized results"""
+    _cached_plant.cache_clear()
+    _cached_transfer_model.cache_clear()
+    _cached_stage_tables.cache_clear()
+    _cached_grade_model.cache_clear()
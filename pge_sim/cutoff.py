@@ -0,0 +1,164 @@
+"""Grade-tonnage curves and cutoff optimization over a block model.
+
+Blocks are ranked once by a cutoff key, either NSR (net smelter return: the
+revenue per tonne after recovery, at given metal prices) or 3E grade
+(Pd + Pt + Au, g/t), and prefix sums of tonnes, key x tonnes and payable
+metal are kept in key order. The blocks at or above any cutoff are then a
+suffix of that order, found by binary search, and their totals are a
+difference of two prefix sums, so a sweep of thousands of cutoffs never
+touches the plant model or the individual blocks again.
+"""
+import os
+
+import numpy as np
+
+from .blocks import BLOCK_CHUNK_SIZE, evaluate_blocks, read_block_chunks
+from .revenue import metal_vector, value
+from .scenarios import METALS
+
+# Keys blocks can be ranked by, with their display labels
+CUTOFF_KEYS = {'nsr': "NSR ($/t)", '3e': "3E Grade (g/t)"}
+
+# Metals summed in the 3E grade
+METALS_3E = ['Pd', 'Pt', 'Au']
+
+# Cutoffs a grade-tonnage curve is evaluated at
+CUTOFF_POINTS = 2000
+
+# g/t per % grade
+GRAMS_PER_TONNE_PER_PERCENT = 1e4
+
+
+def _prefix_sum(values, order):
+    """Cumulative sums of values taken in order along the first axis, with a leading row of zeros"""
+    values = np.asarray(values, dtype=float)
+    prefix = np.zeros((len(values) + 1, *values.shape[1:]))
+    np.take(values, order, axis=0, out=prefix[1:])
+    np.cumsum(prefix[1:], axis=0, out=prefix[1:])
+    return prefix
+
+
+class GradeTonnage:
+    """Blocks ranked by a cutoff key, answering any cutoff from prefix sums.
+
+    key holds the key of every block in ascending order; tonnes, key_tonnes
+    and recovered (one column per metal in METALS) are prefix sums in that
+    order with a leading zero row. Blocks that are never processed (routed
+    to waste) have a key of -inf, so no cutoff includes them. With the NSR
+    key, metal_prices are the prices the blocks were ranked at.
+    """
+
+    def __init__(self, key, tonnes, recovered, key_name='nsr', metal_prices=None):
+        key = np.asarray(key, dtype=float)
+        order = np.argsort(key, kind='stable')
+        tonnes = np.asarray(tonnes, dtype=float)
+        self.key_name = key_name
+        self.metal_prices = metal_prices
+        self.key = key[order]
+        self.tonnes = _prefix_sum(tonnes, order)
+        self.key_tonnes = _prefix_sum(np.where(np.isfinite(key), key, 0) * tonnes, order)
+        self.recovered = _prefix_sum(recovered, order)
+        # Rank of the first block that is processed at all
+        self.first_processed = np.searchsorted(self.key, -np.inf, side='right')
+
+    @classmethod
+    def from_blocks(cls, source, process_params, metal_prices=None, feed_type="Both Feeds", key_name='nsr',
+                    chunk_size=BLOCK_CHUNK_SIZE):
+        """Rank the blocks of a block model (a file, see blocks.read_block_chunks, or an iterable of chunks).
+
+        The NSR key needs metal_prices. Per-block values are held in memory
+        while ranking: about 80 bytes per block.
+        """
+        if key_name not in CUTOFF_KEYS:
+            raise ValueError(f"Unknown cutoff key: {key_name}")
+        if key_name == 'nsr' and metal_prices is None:
+            raise ValueError("Ranking blocks by NSR needs metal prices")
+        if isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+            source = read_block_chunks(source, chunk_size)
+
+        keys, tonnes, recovered = [], [], []
+        for chunk in source:
+            evaluated = evaluate_blocks(chunk, process_params, feed_type)
+            if key_name == 'nsr':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    key = value(evaluated['recovered'], metal_prices) / evaluated['tonnes']
+            else:
+                key = (evaluated['contained'][:, [METALS.index(metal) for metal in METALS_3E]].sum(axis=1) /
+                       evaluated['tonnes'] * GRAMS_PER_TONNE_PER_PERCENT)
+            keys.append(np.where(evaluated['processed'] & (evaluated['tonnes'] > 0), key, -np.inf))
+            tonnes.append(evaluated['tonnes'])
+            recovered.append(evaluated['recovered'])
+        if not keys:
+            raise ValueError("Block model has no blocks")
+        return cls(np.concatenate(keys), np.concatenate(tonnes), np.concatenate(recovered), key_name,
+                   metal_prices if key_name == 'nsr' else None)
+
+    def __len__(self):
+        return len(self.key)
+
+    def block_values(self):
+        """Tonnes and payable metal of each block in key order, recovered from the prefix sums"""
+        return np.diff(self.tonnes), np.diff(self.recovered, axis=0)
+
+    def reprice(self, metal_prices):
+        """The same blocks ranked by NSR at new metal prices (the one re-sort a price change needs)"""
+        tonnes, recovered = self.block_values()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            key = np.where(np.isfinite(self.key), value(recovered, metal_prices) / tonnes, -np.inf)
+        return GradeTonnage(key, tonnes, recovered, 'nsr', metal_prices)
+
+    def first_above(self, cutoffs):
+        """Rank (in key order) of the first block at or above each cutoff; blocks from there on are included"""
+        return np.searchsorted(self.key, cutoffs, side='left')
+
+    def above(self, cutoffs, metal_prices=None):
+        """Blocks, tonnes, mean key and payable metal (METALS on the last axis) at or above each cutoff.
+
+        cutoffs may be a scalar or an array; with metal_prices, revenue is
+        included as well.
+        """
+        return self._suffix(self.first_above(cutoffs), cutoffs, metal_prices)
+
+    def _suffix(self, first, cutoffs, metal_prices=None):
+        """Totals (as for above()) of the blocks from rank first on, for the given cutoffs"""
+        tonnes = self.tonnes[-1] - self.tonnes[first]
+        key_tonnes = self.key_tonnes[-1] - self.key_tonnes[first]
+        result = {
+            'cutoff': np.asarray(cutoffs, dtype=float),
+            'blocks': len(self.key) - np.maximum(first, self.first_processed),
+            'tonnes': tonnes,
+            'mean_key': np.divide(key_tonnes, tonnes, out=np.full(np.shape(tonnes), np.nan), where=tonnes > 0),
+            'recovered': self.recovered[-1] - self.recovered[first]
+        }
+        if metal_prices is not None:
+            result['revenue'] = value(result['recovered'], metal_prices)
+        return result
+
+    def curve(self, points=CUTOFF_POINTS, metal_prices=None):
+        """Grade-tonnage curve: above() at points cutoffs spread evenly over the range of block keys"""
+        if self.first_processed == len(self.key):
+            return self.above(np.zeros(0), metal_prices)
+        return self.above(np.linspace(self.key[self.first_processed], self.key[-1], points), metal_prices)
+
+    def optimal_cutoff(self, metal_prices, processing_cost=0.0, max_tonnes=None):
+        """Cutoff maximizing revenue less processing cost ($/t) over the blocks above it.
+
+        Every distinct cutoff (each block's key) is scored at once from the
+        prefix sums; blocks sharing a key are taken or left together, as a
+        cutoff would. max_tonnes caps the tonnes processed (e.g. plant
+        capacity over the mine life), which raises the cutoff until the
+        blocks above it fit. Returns the cutoff and the totals above it; the
+        cutoff is inf when processing nothing is best.
+        """
+        tonnes = self.tonnes[-1] - self.tonnes
+        profit = (self.recovered[-1] - self.recovered) @ metal_vector(metal_prices) - processing_cost * tonnes
+        # Candidate suffixes start at the first block of a key (or take nothing)
+        feasible = np.ones(len(tonnes), dtype=bool)
+        feasible[1:-1] = self.key[1:] != self.key[:-1]
+        feasible[:self.first_processed] = False
+        if max_tonnes is not None:
+            feasible &= tonnes <= max_tonnes
+        best = int(np.argmax(np.where(feasible, profit, -np.inf)))
+        result = self._suffix(best, self.key[best] if best < len(self.key) else np.inf, metal_prices)
+        result['profit'] = profit[best]
+        return result
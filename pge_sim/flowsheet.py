@@ -0,0 +1,349 @@
+"""Declarative flowsheet graphs compiled to vectorized execution plans.
+
+A flowsheet is plain data: the components it tracks, the process parameter
+holding its feed rate and a list of stage nodes. Each node names its input
+streams, an optional capacity (a multiple of the mass fed to it) with an
+optional efficiency derating when overloaded, and per-component split
+factors giving the share of each component sent to its product stream; the
+rest goes to its reject stream. Split factors and derating refer to process
+parameters (in %) or are constants, so a new circuit (a second grinding line,
+a scavenger flotation bank, oxide ore routed to flotation) is a new
+definition rather than new code.
+
+FlowsheetPlan checks the graph, orders the nodes topologically and runs them
+over one (stream, component, sample) array, so every stage is a handful of
+whole-array operations however many components or samples there are.
+"""
+import numpy as np
+
+from .results import StageResults
+
+MASS = 'mass'
+
+# Split key applying to every component without its own entry
+ALL_COMPONENTS = '*'
+
+
+def _flow_ratio(effective_mass, mass):
+    """Fraction of a stream passed on after capacity limiting (1 where the stream is empty)"""
+    return np.divide(effective_mass, mass, out=np.ones_like(mass), where=mass != 0)
+
+
+def _row_index(rows):
+    """A slice for consecutive rows, otherwise an index array"""
+    if rows == list(range(rows[0], rows[-1] + 1)):
+        return slice(rows[0], rows[-1] + 1)
+    return np.array(rows)
+
+
+def _factor(spec, params):
+    """A split or derating factor: a process parameter name (in %) or a constant fraction"""
+    if isinstance(spec, str):
+        return params[spec] / 100
+    return spec
+
+
+class FlowsheetPlan:
+    """A flowsheet definition compiled to a topologically ordered execution plan.
+
+    Streams are the feed plus the product ('node') and reject ('node.reject')
+    stream of every node. All flows live in one array with a row per stream
+    and component (then a capacity and a throughput row per node) and a
+    column per sample. run() returns stage results, results and capacity
+    checks shaped by the definition's 'stage_results' and 'results' reports,
+    whose entries reference 'stream.component', 'node.capacity' or
+    'node.throughput' (the mass fed to the node); the stage results are a
+    StageResults over that array.
+    """
+
+    def __init__(self, definition):
+        self.components = list(definition['components'])
+        if self.components[0] != MASS:
+            raise ValueError(f"The first flowsheet component must be '{MASS}'")
+        self.feed_rate = definition['feed_rate']
+        self.payable = definition.get('payable')
+
+        nodes = {node['name']: node for node in definition['nodes']}
+        if 'feed' in nodes or len(nodes) != len(definition['nodes']):
+            raise ValueError("Flowsheet node names must be unique and may not be 'feed'")
+        self.nodes = self._topological_order(nodes)
+
+        self.streams = ['feed']
+        for node in self.nodes:
+            self.streams += [node['name'], f"{node['name']}.reject"]
+        self.rows = len(self.streams) * len(self.components) + 2 * len(self.nodes)
+
+        self.stage_rows = {
+            stage: {field: self._row(ref) for field, ref in values.items()}
+            for stage, values in definition.get('stage_results', {}).items()
+        }
+        self.result_rows = {key: self._row(ref) for key, ref in definition.get('results', {}).items()}
+
+        # Streams read downstream need every component; reported ones only the components shown
+        reported = set(self.result_rows.values())
+        reported.update(row for fields in self.stage_rows.values() for row in fields.values())
+        consumed = {self.streams.index(name) for node in self.nodes for name in node['inputs']}
+        if self.payable is not None:
+            consumed.add(self.streams.index(self.payable))
+
+        self.steps = []
+        for node in self.nodes:
+            splits = node.get('splits', {})
+            default = splits.get(ALL_COMPONENTS, 0)
+            specs = [splits.get(component, default) for component in self.components]
+            # Component rows (after mass) grouped by split factor; zero splits send everything to the reject
+            groups = {}
+            for row, spec in enumerate(specs[1:]):
+                if spec != 0:
+                    groups.setdefault(spec, []).append(row)
+
+            reject = self.streams.index(f"{node['name']}.reject")
+            reject_rows = set(range(self._stream_row(reject), self._stream_row(reject + 1)))
+            if reject in consumed or reject_rows - {self._stream_row(reject)} & reported:
+                reject_components = 'all'
+            elif reject_rows & reported:
+                reject_components = MASS
+            else:
+                reject_components = None
+
+            self.steps.append({
+                'name': node['name'],
+                'label': node.get('label', node['name'].replace('_', ' ').title()),
+                'inputs': [self.streams.index(name) for name in node['inputs']],
+                'product': self.streams.index(node['name']),
+                'reject': reject,
+                'reject_components': reject_components,
+                'capacity': node.get('capacity'),
+                'capacity_row': self._row(f"{node['name']}.capacity"),
+                'throughput_row': self._row(f"{node['name']}.throughput"),
+                'report_throughput': self._row(f"{node['name']}.throughput") in reported,
+                'limit_flow': node.get('limit_flow', True),
+                'derating': node.get('derating'),
+                'mass_split': specs[0],
+                'groups': [(spec, _row_index(rows)) for spec, rows in groups.items()],
+                'factors': list(dict.fromkeys([spec for spec in specs if spec != 0]))
+            })
+
+    @staticmethod
+    def _topological_order(nodes):
+        """Nodes ordered so every node follows the nodes feeding it, keeping definition order where free"""
+        upstream = {}
+        for name, node in nodes.items():
+            if not node['inputs']:
+                raise ValueError(f"Flowsheet node '{name}' has no inputs")
+            upstream[name] = set()
+            for stream in node['inputs']:
+                source = stream.split('.')[0]
+                if source != 'feed' and source not in nodes:
+                    raise ValueError(f"Flowsheet node '{name}' takes unknown stream '{stream}'")
+                if source != 'feed':
+                    upstream[name].add(source)
+
+        order = []
+        while upstream:
+            ready = [name for name, sources in upstream.items() if not sources - set(order)]
+            if not ready:
+                raise ValueError(f"Flowsheet has a cycle through: {', '.join(upstream)}")
+            order.append(ready[0])
+            del upstream[ready[0]]
+        return [nodes[name] for name in order]
+
+    def _stream_row(self, stream):
+        """First row (the mass) of a stream in the flow array"""
+        return stream * len(self.components)
+
+    def _row(self, ref):
+        """Flow array row of 'stream.component', 'node.capacity' or 'node.throughput'"""
+        stream, _, field = ref.rpartition('.')
+        if field in ['capacity', 'throughput']:
+            node = [node['name'] for node in self.nodes].index(stream)
+            return self._stream_row(len(self.streams)) + 2 * node + (field == 'throughput')
+        if stream not in self.streams or field not in self.components:
+            raise ValueError(f"Unknown flowsheet reference '{ref}'")
+        return self._stream_row(self.streams.index(stream)) + self.components.index(field)
+
+    def _execute(self, feed, params):
+        """Run every step; returns the flow array and the capacity checks"""
+        feed_mass = np.asarray(params[self.feed_rate], dtype=float)
+        buffer = np.zeros((self.rows, feed_mass.size))
+        flows = buffer[:self._stream_row(len(self.streams))].reshape(len(self.streams), len(self.components), -1)
+        flows[0, 0] = feed_mass
+        for row, component in enumerate(self.components[1:], start=1):
+            flows[0, row] = feed_mass * feed[component] / 100
+
+        checks = []
+        for step in self.steps:
+            inputs = step['inputs']
+            mass = flows[inputs[0], 0]
+            for stream in inputs[1:]:
+                mass = mass + flows[stream, 0]
+            if step['report_throughput']:
+                buffer[step['throughput_row']] = mass
+            factors = {spec: _factor(spec, params) for spec in step['factors']}
+
+            ratio = None
+            effective_mass = mass
+            if step['capacity'] is not None:
+                capacity = np.multiply(mass, step['capacity'], out=buffer[step['capacity_row']])
+                overloaded = mass > capacity
+                checks.append({'stage': step['label'], 'required_mass': mass, 'available_mass': capacity})
+                # Without any overload the flow ratio is exactly 1 and efficiencies are unchanged
+                if overloaded.any():
+                    if step['limit_flow']:
+                        # Reduce throughput to equipment capacity where the stage is overloaded
+                        effective_mass = np.where(overloaded, capacity, mass)
+                        ratio = _flow_ratio(effective_mass, mass)
+                    if step['derating'] is not None:
+                        derating = _factor(step['derating'], params)
+                        factors = {spec: np.where(overloaded, factor * derating, factor)
+                                   for spec, factor in factors.items()}
+
+            product = flows[step['product']]
+            reject = flows[step['reject']]
+            if step['mass_split'] != 0:
+                product[0] = effective_mass * factors[step['mass_split']]
+            if step['reject_components'] is not None:
+                reject[0] = effective_mass - product[0]
+
+            # Other components pass through in proportion to the capacity-limited flow
+            product_components = product[1:]
+            reject_components = reject[1:] if step['reject_components'] == 'all' else None
+            for position, stream in enumerate(inputs):
+                passed = flows[stream, 1:] if ratio is None else flows[stream, 1:] * ratio
+                for spec, rows in step['groups']:
+                    if position == 0:
+                        product_components[rows] = passed[rows] * factors[spec]
+                    else:
+                        product_components[rows] += passed[rows] * factors[spec]
+                if reject_components is not None:
+                    if position == 0:
+                        reject_components[:] = passed
+                    else:
+                        reject_components += passed
+            if reject_components is not None:
+                for spec, rows in step['groups']:
+                    reject_components[rows] -= product_components[rows]
+
+        return buffer, checks
+
+    def run(self, feed, params):
+        """Simulate every sample: returns StageResults, its flat results and the capacity checks"""
+        buffer, checks = self._execute(feed, params)
+        stage_results = StageResults(buffer, self.stage_rows, self.result_rows)
+        return stage_results, stage_results.results, checks
+
+    def transfer_coefficients(self, params):
+        """Fraction of each component fed to the flowsheet that reaches the payable stream.
+
+        Capacities scale with the mass fed to each stage, so overloads do not
+        depend on the feed rate or grades; one run with unit flow of every
+        component gives the coefficients for any feed.
+        """
+        unit_params = dict(params)
+        unit_params[self.feed_rate] = 1.0
+        unit_feed = {component: 100.0 for component in self.components[1:]}
+        buffer, _ = self._execute(unit_feed, unit_params)
+        payable = self._stream_row(self.streams.index(self.payable))
+        return {component: float(buffer[payable + row, 0]) for row, component in enumerate(self.components) if row}
+
+
+def _stage_report(node, components, losses=True):
+    """Stage results entry with the product mass and components of a node"""
+    report = {MASS: f'{node}.{MASS}'}
+    report.update({component.lower(): f'{node}.{component}' for component in components})
+    if losses:
+        report['losses'] = f'{node}.reject.{MASS}'
+    report['capacity'] = f'{node}.capacity'
+    return report
+
+
+OXIDE_FLOWSHEET = {
+    'components': [MASS, 'Pd', 'Au'],
+    'feed_rate': 'oxide_feed_rate',
+    'payable': 'leaching',
+    'nodes': [
+        # Sizing equipment can handle 20% more than feed rate
+        {'name': 'sizing', 'inputs': ['feed'], 'capacity': 1.2,
+         'splits': {ALL_COMPONENTS: 'sizing_efficiency'}},
+        # Grinding can handle 10% more than sized output; efficiency drops when overloaded
+        {'name': 'grinding', 'inputs': ['sizing'], 'capacity': 1.1, 'derating': 0.95,
+         'splits': {ALL_COMPONENTS: 'oxide_grinding_efficiency'}},
+        # Leaching can handle 5% more than ground output
+        {'name': 'leaching', 'inputs': ['grinding'], 'capacity': 1.05,
+         'splits': {MASS: 'leaching_efficiency', 'Pd': 'oxide_pd_recovery', 'Au': 'oxide_au_recovery'}}
+    ],
+    'stage_results': {
+        'feed': {MASS: 'feed.mass', 'pd': 'feed.Pd', 'au': 'feed.Au'},
+        'sizing': _stage_report('sizing', ['Pd', 'Au']),
+        'grinding': _stage_report('grinding', ['Pd', 'Au']),
+        'leaching': {MASS: 'leaching.mass', 'pd_recovered': 'leaching.Pd', 'au_recovered': 'leaching.Au',
+                     'capacity': 'leaching.capacity'},
+        'tailings': {MASS: 'leaching.reject.mass', 'pd': 'leaching.reject.Pd', 'au': 'leaching.reject.Au'}
+    },
+    'results': {
+        'feed_mass': 'feed.mass',
+        'sized_mass': 'sizing.mass',
+        'ground_mass': 'grinding.mass',
+        'pd_recovered': 'leaching.Pd',
+        'au_recovered': 'leaching.Au',
+        'tailings_mass': 'leaching.reject.mass',
+        'leach_solution_mass': 'leaching.mass'
+    }
+}
+
+SULPHIDE_METALS = ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']
+
+SULPHIDE_FLOWSHEET = {
+    'components': [MASS] + SULPHIDE_METALS,
+    'feed_rate': 'sulphide_feed_rate',
+    'payable': 'refining',
+    'nodes': [
+        # Crushers typically have higher capacity
+        {'name': 'crushing', 'inputs': ['feed'], 'capacity': 1.3,
+         'splits': {ALL_COMPONENTS: 'crushing_efficiency'}},
+        # Grinding is often the bottleneck; efficiency drops when overloaded
+        {'name': 'grinding', 'inputs': ['crushing'], 'capacity': 0.95, 'derating': 0.92,
+         'splits': {ALL_COMPONENTS: 'sulphide_grinding_efficiency'}},
+        # Typical concentrate yield of 15%; PGMs split between the Cu and Ni concentrates
+        {'name': 'cu_flotation', 'label': 'Cu Flotation', 'inputs': ['grinding'], 'capacity': 1.1,
+         'splits': {MASS: 0.15, 'Cu': 'cu_flotation_recovery', 'Pd': 'pgm_to_cu_concentrate',
+                    'Pt': 'pgm_to_cu_concentrate', 'Au': 'pgm_to_cu_concentrate'}},
+        # Typical concentrate yield of 20%
+        {'name': 'ni_flotation', 'label': 'Ni Flotation', 'inputs': ['cu_flotation.reject'], 'capacity': 1.05,
+         'splits': {MASS: 0.20, 'Ni': 'ni_flotation_recovery', 'Co': 'co_flotation_recovery',
+                    'Pd': 'pgm_to_ni_concentrate', 'Pt': 'pgm_to_ni_concentrate', 'Au': 'pgm_to_ni_concentrate'}},
+        # Efficiency drops when overloaded, but the autoclave does not limit the flow
+        {'name': 'pressure_oxidation', 'inputs': ['cu_flotation', 'ni_flotation'], 'capacity': 1.02,
+         'limit_flow': False, 'derating': 0.95,
+         'splits': {MASS: 1, ALL_COMPONENTS: 'pressure_oxidation_efficiency'}},
+        {'name': 'refining', 'inputs': ['pressure_oxidation'],
+         'splits': {metal: f'final_{metal.lower()}_recovery' for metal in SULPHIDE_METALS}}
+    ],
+    'stage_results': {
+        'feed': {MASS: 'feed.mass', **{metal.lower(): f'feed.{metal}' for metal in SULPHIDE_METALS}},
+        'crushing': _stage_report('crushing', SULPHIDE_METALS),
+        'grinding': _stage_report('grinding', SULPHIDE_METALS),
+        'cu_flotation': {'concentrate_mass': 'cu_flotation.mass', 'cu': 'cu_flotation.Cu', 'pd': 'cu_flotation.Pd',
+                         'pt': 'cu_flotation.Pt', 'au': 'cu_flotation.Au', 'capacity': 'cu_flotation.capacity'},
+        'ni_flotation': {'concentrate_mass': 'ni_flotation.mass', 'ni': 'ni_flotation.Ni', 'co': 'ni_flotation.Co',
+                         'pd': 'ni_flotation.Pd', 'pt': 'ni_flotation.Pt', 'au': 'ni_flotation.Au',
+                         'capacity': 'ni_flotation.capacity'},
+        'pressure_oxidation': {MASS: 'pressure_oxidation.throughput', 'cu': 'pressure_oxidation.Cu',
+                               'ni': 'pressure_oxidation.Ni', 'co': 'pressure_oxidation.Co',
+                               'capacity': 'pressure_oxidation.capacity'},
+        'final_products': {metal.lower(): f'refining.{metal}' for metal in SULPHIDE_METALS},
+        'tailings': {MASS: 'ni_flotation.reject.mass'}
+    },
+    'results': {
+        'feed_mass': 'feed.mass',
+        'crushed_mass': 'crushing.mass',
+        'ground_mass': 'grinding.mass',
+        'cu_concentrate_mass': 'cu_flotation.mass',
+        'ni_concentrate_mass': 'ni_flotation.mass',
+        **{f'{metal.lower()}_recovered': f'refining.{metal}' for metal in SULPHIDE_METALS},
+        'tailings_mass': 'ni_flotation.reject.mass'
+    }
+}
+
+# Standard flowsheet of each process
+FLOWSHEETS = {'oxide': OXIDE_FLOWSHEET, 'sulphide': SULPHIDE_FLOWSHEET}
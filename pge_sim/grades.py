@@ -0,0 +1,145 @@
+"""Correlated feed grade variation from assay data or a log-grade covariance.
+
+A grade model is a Gaussian copula on log-grades, held as a plain dict so
+it can be hashed into result keys and sent to worker processes:
+
+- metals: the metals it covers, in METALS order
+- correlation: correlation of their normal scores (metals x metals)
+- log_quantiles: log of grade relative to the mean grade at each of
+  QUANTILE_LEVELS (levels x metals), for marginals fitted to assays; or
+- sigma: standard deviation of log-grade per metal, for lognormal marginals
+
+grade_factors() maps independent standard normal deviates (from any of the
+samplers) to correlated multiplicative grade factors with mean about 1, so
+the base grades stay the centre of the distribution. Drawing a correlated
+block costs one small matrix product plus an interpolation per metal.
+"""
+import io
+
+import numpy as np
+
+from .sampling import norm_cdf, norm_ppf
+from .scenarios import METALS
+
+# Probability levels at which fitted marginals are tabulated
+QUANTILE_LEVELS = np.linspace(0, 1, 101)
+
+# Fewest complete assays a model can be fitted from
+MIN_ASSAYS = 10
+
+# Smallest eigenvalue kept when repairing a fitted correlation matrix
+MIN_EIGENVALUE = 1e-6
+
+# Typical correlation of log-grades in a PGE-Cu-Ni deposit, rows and columns in METALS order
+DEFAULT_GRADE_CORRELATION = np.array([
+    # Cu   Pd    Pt    Au    Ni    Co
+    [1.00, 0.50, 0.45, 0.40, 0.75, 0.60],
+    [0.50, 1.00, 0.85, 0.60, 0.55, 0.40],
+    [0.45, 0.85, 1.00, 0.55, 0.50, 0.35],
+    [0.40, 0.60, 0.55, 1.00, 0.35, 0.25],
+    [0.75, 0.55, 0.50, 0.35, 1.00, 0.80],
+    [0.60, 0.40, 0.35, 0.25, 0.80, 1.00]
+])
+
+
+def assay_columns(columns):
+    """{metal: column} for the columns named after a metal, e.g. 'Pd', 'pd_pct' or 'Pd (%)'"""
+    matched = {}
+    for column in columns:
+        name = str(column).strip().lower()
+        for metal in METALS:
+            symbol = metal.lower()
+            if metal not in matched and name.startswith(symbol) and not name[len(symbol):len(symbol) + 1].isalpha():
+                matched[metal] = column
+    return matched
+
+
+def read_assays(source):
+    """{metal: grades (%)} from an assay CSV (path, file object or bytes) with one column per metal"""
+    # Imported here so the headless model does not need pandas
+    import pandas as pd
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    table = pd.read_csv(source)
+    columns = assay_columns(table.columns)
+    if not columns:
+        raise ValueError(f"No assay columns named after a metal ({', '.join(METALS)})")
+    return {metal: pd.to_numeric(table[column], errors='coerce').to_numpy(dtype=float)
+            for metal, column in columns.items()}
+
+
+def _repair_correlation(correlation):
+    """Nearest positive definite correlation matrix by eigenvalue clipping (unchanged when already valid)"""
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    if eigenvalues.min() >= MIN_EIGENVALUE:
+        return correlation
+    repaired = eigenvectors @ np.diag(np.maximum(eigenvalues, MIN_EIGENVALUE)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(repaired))
+    return repaired / np.outer(scale, scale)
+
+
+def fit_grade_model(assays):
+    """Gaussian copula grade model fitted to assays ({metal: grades (%)}).
+
+    Only assays with a positive grade for every metal are used. Marginals
+    are the empirical distributions of grade relative to the mean grade;
+    the copula correlation is that of the normal scores of the ranks.
+    """
+    metals = [metal for metal in METALS if metal in assays]
+    if not metals:
+        raise ValueError("Assays need at least one metal column")
+    grades = np.column_stack([np.asarray(assays[metal], dtype=float) for metal in metals])
+    grades = grades[(np.isfinite(grades) & (grades > 0)).all(axis=1)]
+    if len(grades) < MIN_ASSAYS:
+        raise ValueError(f"Need at least {MIN_ASSAYS} assays with a positive grade for every metal, "
+                         f"got {len(grades)}")
+
+    log_ratios = np.log(grades / grades.mean(axis=0))
+    ranks = log_ratios.argsort(axis=0).argsort(axis=0)
+    scores = norm_ppf((ranks + 0.5) / len(grades))
+    correlation = np.corrcoef(scores, rowvar=False).reshape(len(metals), len(metals))
+    return {
+        'metals': metals,
+        'correlation': _repair_correlation(correlation),
+        'log_quantiles': np.quantile(log_ratios, QUANTILE_LEVELS, axis=0),
+        'assays': len(grades)
+    }
+
+
+def covariance_grade_model(covariance, metals=METALS):
+    """Lognormal grade model from a covariance matrix of natural-log grades (metals in the given order)"""
+    covariance = np.asarray(covariance, dtype=float)
+    if covariance.shape != (len(metals), len(metals)) or not np.allclose(covariance, covariance.T):
+        raise ValueError(f"Covariance matrix must be symmetric and {len(metals)} x {len(metals)}")
+    sigma = np.sqrt(np.diag(covariance))
+    if not (sigma > 0).all():
+        raise ValueError("Every log-grade variance must be positive")
+    correlation = covariance / np.outer(sigma, sigma)
+    if np.linalg.eigvalsh(correlation).min() <= 0:
+        raise ValueError("Covariance matrix is not positive definite")
+    order = np.argsort([METALS.index(metal) for metal in metals])
+    return {
+        'metals': [metals[i] for i in order],
+        'correlation': correlation[np.ix_(order, order)],
+        'sigma': sigma[order]
+    }
+
+
+def grade_factors(grade_model, deviates, metals):
+    """Correlated grade factors, one column per metal in metals, from independent standard normal deviates.
+
+    deviates has one column per entry of metals, which must all be covered
+    by grade_model; the correlation between them comes from the model.
+    """
+    columns = [grade_model['metals'].index(metal) for metal in metals]
+    correlation = np.asarray(grade_model['correlation'], dtype=float)[np.ix_(columns, columns)]
+    scores = np.asarray(deviates, dtype=float) @ np.linalg.cholesky(correlation).T
+
+    if 'sigma' in grade_model:
+        sigma = np.asarray(grade_model['sigma'], dtype=float)[columns]
+        return np.exp(sigma * scores - sigma ** 2 / 2)
+    levels = norm_cdf(scores)
+    log_quantiles = np.asarray(grade_model['log_quantiles'], dtype=float)
+    return np.exp(np.column_stack([np.interp(levels[:, i], QUANTILE_LEVELS, log_quantiles[:, column])
+                                   for i, column in enumerate(columns)]))
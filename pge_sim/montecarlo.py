@@ -0,0 +1,306 @@
+"""Monte Carlo analysis over parameter variations, chunked across a process pool"""
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import run_batch_simulation
+from .grades import grade_factors
+from .prices import sample_prices
+from .results import StageResults
+from .revenue import payable_production, value
+from .sampling import normal_deviates
+from .scenarios import METALS
+from .streaming import RunningStats, StreamingHistogram
+
+# Iterations per chunk. Each chunk draws from its own spawned SeedSequence, so
+# results depend on the seed and chunk boundaries but never on the worker count.
+CHUNK_SIZE = 8192
+
+# Clipping bounds (%) for varied efficiencies and recoveries
+EFFICIENCY_BOUNDS = {
+    'sizing_efficiency': (80, 99),
+    'oxide_grinding_efficiency': (80, 99),
+    'sulphide_grinding_efficiency': (80, 99)
+}
+
+RECOVERY_BOUNDS = {
+    'oxide_pd_recovery': (60, 90),
+    'final_cu_recovery': (70, 98),
+    'final_pd_recovery': (60, 98)
+}
+
+# Lowest grade (%) a varied metal grade may fall to
+MIN_GRADE = 0.001
+
+# Float type of retained per-stage Monte Carlo results (halves their memory)
+RETAINED_DTYPE = np.float32
+
+# One process pool sized to the machine, shared by every caller (Streamlit sessions run in threads)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variation_columns(feed_composition, feed_type="Both Feeds"):
+    """(variation kind, input name) for every perturbed input, in sampling order"""
+    columns = []
+    if feed_type in ["Oxide Feed", "Both Feeds"]:
+        columns.append(('feed_rate', 'oxide_feed_rate'))
+    if feed_type in ["Sulphide Feed", "Both Feeds"]:
+        columns.append(('feed_rate', 'sulphide_feed_rate'))
+    columns += [('efficiency', name) for name in EFFICIENCY_BOUNDS]
+    columns += [('grade', metal) for metal in METALS if feed_composition[metal] > 0]
+    columns += [('recovery', name) for name in RECOVERY_BOUNDS]
+    return columns
+
+
+def apply_variations(deviates, feed_composition, process_params, variation, feed_type="Both Feeds",
+                     grade_model=None):
+    """Perturb the base inputs with standard normal deviates.
+
+    deviates has one row per sample and one column per variation_columns()
+    entry; each column is scaled by the ±% in variation['feed_rate'],
+    variation['efficiency'], variation['grade'] or variation['recovery'].
+    With a grade_model (see grades.py) the grades of the metals it covers
+    are varied together by grades.grade_factors instead, so their spread
+    and correlation come from the model rather than variation['grade'].
+    """
+    varied_feed = dict(feed_composition)
+    varied_params = dict(process_params)
+    columns = variation_columns(feed_composition, feed_type)
+
+    correlated = {}
+    if grade_model is not None:
+        grade_columns = [(column, name) for column, (kind, name) in enumerate(columns)
+                         if kind == 'grade' and name in grade_model['metals']]
+        if grade_columns:
+            indices, metals = zip(*grade_columns)
+            factors = grade_factors(grade_model, deviates[:, list(indices)], metals)
+            correlated = dict(zip(metals, factors.T))
+
+    for column, (kind, name) in enumerate(columns):
+        if name in correlated:
+            # Copula factors are always positive, so low base grades need no floor
+            varied_feed[name] = feed_composition[name] * correlated[name]
+            continue
+        factor = 1 + deviates[:, column] * (variation[kind] / 100)
+        if kind == 'grade':
+            varied_feed[name] = np.maximum(MIN_GRADE, feed_composition[name] * factor)
+        elif kind == 'efficiency':
+            varied_params[name] = np.clip(process_params[name] * factor, *EFFICIENCY_BOUNDS[name])
+        elif kind == 'recovery':
+            varied_params[name] = np.clip(process_params[name] * factor, *RECOVERY_BOUNDS[name])
+        else:
+            varied_params[name] = process_params[name] * factor
+
+    return varied_feed, varied_params
+
+
+def evaluate_samples(varied_feed, varied_params, metal_prices, feed_type="Both Feeds", retain_stages=False):
+    """Payable production, revenue and key metal production for a batch of varied inputs.
+
+    production has one column per metal in METALS (summed over processes);
+    total_value is left out when metal_prices is None. With retain_stages
+    the compact per-stage results of every process are kept as well, under
+    'stage_results'.
+    """
+    batch = run_batch_simulation(varied_feed, varied_params, feed_type)
+    production = sum(payable_production(batch['results']).values()) + np.zeros((batch['size'], len(METALS)))
+
+    evaluated = {
+        'production': production,
+        'cu_recovered': production[:, METALS.index('Cu')],
+        'pd_recovered': production[:, METALS.index('Pd')],
+        'au_recovered': production[:, METALS.index('Au')]
+    }
+    if metal_prices is not None:
+        evaluated['total_value'] = value(production, metal_prices)
+    if retain_stages:
+        evaluated['stage_results'] = {
+            process_type: stage_results.compact(RETAINED_DTYPE)
+            for process_type, stage_results in batch['stage_results'].items()
+        }
+    return evaluated
+
+
+def _run_chunk(task):
+    """Draw and evaluate one chunk of iterations from its own random stream"""
+    (seed_sequence, start, size, feed_composition, process_params, metal_prices, variation, feed_type,
+     sampler, sampler_seed, retain_stages, price_model, grade_model) = task
+    rng = np.random.default_rng(seed_sequence)
+    dimensions = len(variation_columns(feed_composition, feed_type))
+    deviates = normal_deviates(sampler, rng, size, dimensions, start=start, seed=sampler_seed)
+    varied_feed, varied_params = apply_variations(deviates, feed_composition, process_params, variation, feed_type,
+                                                  grade_model)
+    if price_model is not None and metal_prices is not None:
+        # Drawn after the input deviates, so the inputs do not depend on whether prices vary
+        metal_prices = sample_prices(metal_prices, size, price_model, rng)
+    evaluated = evaluate_samples(varied_feed, varied_params, metal_prices, feed_type, retain_stages)
+    if price_model is not None and metal_prices is not None:
+        evaluated['metal_prices'] = metal_prices
+    return evaluated
+
+
+def get_executor():
+    """Shared process pool with one worker per CPU, created on first use and shut down at exit.
+
+    Callers limit their parallelism by the number of chunks they keep in
+    flight (see iter_chunk_results), so the pool never has to be resized
+    or shut down while another thread may be submitting to it.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers only import the headless pge_sim package
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+        return _executor
+
+
+def chunk_sizes(iterations, chunk_size=CHUNK_SIZE):
+    """Split an iteration count into fixed-size chunks"""
+    full_chunks, remainder = divmod(int(iterations), chunk_size)
+    return [chunk_size] * full_chunks + ([remainder] if remainder else [])
+
+
+def iter_chunk_results(tasks, workers=1, function=_run_chunk):
+    """Evaluate chunk tasks with function in order, keeping at most two chunks per worker in flight"""
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+
+    executor = get_executor()
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Stopping early (e.g. on convergence) abandons the queued chunks
+        for future in pending:
+            future.cancel()
+
+
+def run_monte_carlo(feed_composition, process_params, metal_prices, variation, iterations,
+                    feed_type="Both Feeds", seed=42, workers=None, chunk_size=CHUNK_SIZE, sampler="Random",
+                    retain_stages=False, price_model=None, grade_model=None):
+    """Run a Monte Carlo analysis, spreading chunks of iterations over worker processes.
+
+    Each chunk is seeded from numpy.random.SeedSequence(seed).spawn(), so the
+    output is bit-for-bit identical for any number of workers. sampler is one
+    of sampling.SAMPLERS; Latin hypercube strata are drawn per chunk and Sobol
+    chunks take consecutive ranges of one sequence scrambled with seed.
+    Returns columnar arrays: iteration, production (kg/h, one column per
+    metal in METALS), total_value ($/hour), cu_recovered, pd_recovered and
+    au_recovered. With metal_prices None only the physical results are
+    returned, to be valued later (revenue.value or revenue.price_sweep on
+    production) at any prices. With a price_model (see prices.sample_prices)
+    every iteration is valued at its own correlated draw of metal_prices,
+    returned as 'metal_prices' (one row per iteration, METALS columns), so
+    price risk adds to the input variations. A grade_model varies the
+    grades jointly (see apply_variations). With retain_stages,
+    'stage_results' also holds a StageResults per process with the full
+    per-stage detail of every iteration in RETAINED_DTYPE (about 280 MB for
+    a million iterations of both feeds).
+    """
+    if iterations < 1:
+        raise ValueError("Monte Carlo analysis needs at least one iteration")
+
+    sizes = chunk_sizes(iterations, chunk_size)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(sizes))
+    starts = np.cumsum([0] + sizes[:-1])
+    tasks = [
+        (seed_sequence, int(start), size, feed_composition, process_params, metal_prices, variation, feed_type,
+         sampler, seed, retain_stages, price_model, grade_model)
+        for seed_sequence, start, size in zip(seed_sequences, starts, sizes)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    chunks = list(iter_chunk_results(tasks, workers))
+
+    stage_results = [chunk.pop('stage_results') for chunk in chunks] if retain_stages else None
+    results = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    results['iteration'] = np.arange(1, len(results['production']) + 1)
+    if retain_stages:
+        results['stage_results'] = {
+            process_type: StageResults.concatenate([chunk[process_type] for chunk in stage_results])
+            for process_type in stage_results[0]
+        }
+    return results
+
+
+def stream_monte_carlo(feed_composition, process_params, metal_prices, variation, max_iterations,
+                       feed_type="Both Feeds", batch_size=1000, tolerance=0.5, confidence_level=95,
+                       min_iterations=2000, seed=42, workers=None, sampler="Random", price_model=None,
+                       grade_model=None):
+    """Run a Monte Carlo analysis batch by batch with online statistics.
+
+    Yields a snapshot after every batch with the running mean, standard
+    deviation, min/max, the confidence interval half-width of the mean and
+    streaming estimates of the lower/upper confidence quantiles and median of
+    total_value. Samples are not retained, so memory stays constant. Stops once
+    the half-width falls below tolerance (% of the running mean) after at least
+    min_iterations, or when max_iterations is reached; the final snapshot has
+    'converged' set accordingly and carries the StreamingHistogram sketch.
+    sampler, price_model and grade_model are as for run_monte_carlo.
+    """
+    if max_iterations < 1:
+        raise ValueError("Monte Carlo analysis needs at least one iteration")
+
+    sizes = chunk_sizes(max_iterations, batch_size)
+    root_sequence = np.random.SeedSequence(seed)
+    # Spawning one child at a time yields the same streams as spawn(len(sizes))
+    starts = np.cumsum([0] + sizes[:-1])
+    tasks = (
+        (root_sequence.spawn(1)[0], int(start), size, feed_composition, process_params, metal_prices, variation,
+         feed_type, sampler, seed, False, price_model, grade_model)
+        for start, size in zip(starts, sizes)
+    )
+
+    stats = RunningStats()
+    sketch = StreamingHistogram()
+    tail = (100 - confidence_level) / 200
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+
+    chunk_results = iter_chunk_results(tasks, workers)
+    try:
+        for batch_number, chunk in enumerate(chunk_results, start=1):
+            stats.update(chunk['total_value'])
+            sketch.update(chunk['total_value'])
+
+            half_width = stats.half_width(confidence_level)
+            relative_half_width = half_width / abs(stats.mean) * 100 if stats.mean else np.inf
+            converged = stats.count >= min_iterations and relative_half_width < tolerance
+            finished = converged or batch_number == len(sizes)
+            lower, median, upper = sketch.quantile([tail, 0.5, 1 - tail])
+
+            yield {
+                'batch': batch_number,
+                'iterations': stats.count,
+                'mean': float(stats.mean),
+                'std': float(stats.std),
+                'min': float(stats.min),
+                'max': float(stats.max),
+                'half_width': float(half_width),
+                'relative_half_width': float(relative_half_width),
+                'lower': float(lower),
+                'median': float(median),
+                'upper': float(upper),
+                'converged': bool(converged),
+                'finished': bool(finished),
+                'sketch': sketch
+            }
+
+            if finished:
+                break
+    finally:
+        chunk_results.close()
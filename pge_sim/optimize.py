@@ -0,0 +1,177 @@
+"""Constrained process optimization: maximize revenue over the sidebar control ranges"""
+import numpy as np
+
+from .batch import run_batch_simulation
+from .revenue import total_value
+from .scenarios import OXIDE_PARAMS, PROCESS_PARAM_RANGES, SULPHIDE_PARAMS
+
+# Highest combined share (%) of PGMs reporting to the Cu and Ni concentrates
+MAX_PGM_SPLIT = 100
+
+
+def optimization_params(feed_type="Both Feeds"):
+    """Process parameters that affect revenue for this feed type, in search order"""
+    names = []
+    if feed_type in ["Oxide Feed", "Both Feeds"]:
+        names += OXIDE_PARAMS
+    if feed_type in ["Sulphide Feed", "Both Feeds"]:
+        names += SULPHIDE_PARAMS
+    return names
+
+
+def _overload_margins(checks):
+    """Required minus available mass for every material flow check, shape (samples, checks)"""
+    if not checks:
+        return None
+    return np.column_stack([
+        np.asarray(check['required_mass'] - check['available_mass'], dtype=float) for check in checks
+    ])
+
+
+def evaluate_candidates(candidates, names, feed_composition, process_params, metal_prices, feed_type="Both Feeds",
+                        allowed_overloads=None):
+    """Revenue ($/hour) and constraint violation for every row of candidates (one column per name).
+
+    The violation is zero for a feasible candidate. It adds up the excess of
+    the PGM split over MAX_PGM_SPLIT and the mass by which each material flow
+    check is overloaded, except for checks flagged in allowed_overloads.
+    """
+    params = dict(process_params)
+    for column, name in enumerate(names):
+        params[name] = candidates[:, column]
+
+    batch = run_batch_simulation(feed_composition, params, feed_type)
+    revenue = total_value(batch['results'], metal_prices) + np.zeros(len(candidates))
+
+    split = (np.zeros(len(candidates)) + params['pgm_to_cu_concentrate'] + params['pgm_to_ni_concentrate'])
+    violation = np.maximum(0, split - MAX_PGM_SPLIT) if feed_type != "Oxide Feed" else np.zeros(len(candidates))
+
+    margins = _overload_margins(batch['material_flow_checks'])
+    if margins is not None:
+        if allowed_overloads is not None:
+            margins = margins[:, ~allowed_overloads]
+        violation = violation + np.maximum(0, margins).sum(axis=1)
+    return revenue, violation
+
+
+def _better(revenue, violation, other_revenue, other_violation):
+    """Feasibility rules: feasible beats infeasible, then lower violation, then higher revenue"""
+    return np.where(
+        (violation == 0) & (other_violation == 0),
+        revenue >= other_revenue,
+        violation <= other_violation
+    )
+
+
+def _snap_to_steps(values, lower, upper, steps):
+    """Round candidate values to the slider steps, inside the bounds"""
+    return np.clip(lower + np.round((values - lower) / steps) * steps, lower, upper)
+
+
+def optimize_process(feed_composition, process_params, metal_prices, feed_type="Both Feeds", population_size=None,
+                     generations=300, mutation=0.5, crossover=0.9, tolerance=1e-9, seed=42):
+    """Maximize revenue over the sidebar control ranges with vectorized differential evolution.
+
+    Each generation evaluates the whole population in one batch simulation.
+    Constraints are handled with feasibility rules: the PGM split to the Cu
+    and Ni concentrates may not exceed MAX_PGM_SPLIT, and no material flow
+    check may be overloaded unless it already is at the current settings
+    (sulphide grinding capacity is 95% of the crushed mass, so that check is
+    overloaded for every setting). The current settings seed the population,
+    the result is rounded to the slider steps and controls that do not change
+    revenue are left where they are.
+
+    Returns a dict with the optimized names, current and recommended values,
+    current and optimized revenue, the uplift ($/hour and %), feasibility,
+    the best revenue per generation and the number of evaluations.
+    """
+    names = optimization_params(feed_type)
+    lower, upper, steps = (np.array([PROCESS_PARAM_RANGES[name][i] for name in names], dtype=float)
+                           for i in range(3))
+    dimensions = len(names)
+    size = population_size or max(40, 10 * dimensions)
+    rng = np.random.default_rng(seed)
+
+    current = np.array([float(process_params[name]) for name in names])
+    base_batch = run_batch_simulation(feed_composition, process_params, feed_type)
+    allowed_overloads = np.array([bool(check['overloaded']) for check in base_batch['material_flow_checks']])
+
+    def evaluate(candidates):
+        return evaluate_candidates(candidates, names, feed_composition, process_params, metal_prices, feed_type,
+                                   allowed_overloads)
+
+    population = lower + (upper - lower) * rng.random((size, dimensions))
+    population[0] = np.clip(current, lower, upper)
+    revenue, violation = evaluate(population)
+    base_revenue, base_violation = evaluate(current[np.newaxis])
+    evaluations = size + 1
+    history = []
+
+    for _ in range(generations):
+        # DE/rand/1/bin: three distinct partners per member, none of them the member itself
+        partners = np.argsort(rng.random((size, size)) + 2 * np.eye(size), axis=1)[:, :3]
+        a, b, c = (population[partners[:, k]] for k in range(3))
+        mutant = a + mutation * (b - c)
+        # Components pushed out of bounds land between the parent and the bound
+        mutant = np.where(mutant < lower, lower + rng.random(mutant.shape) * (population - lower), mutant)
+        mutant = np.where(mutant > upper, upper - rng.random(mutant.shape) * (upper - population), mutant)
+
+        cross = rng.random((size, dimensions)) < crossover
+        cross[np.arange(size), rng.integers(0, dimensions, size)] = True
+        trial = np.where(cross, mutant, population)
+
+        trial_revenue, trial_violation = evaluate(trial)
+        evaluations += size
+        keep = _better(trial_revenue, trial_violation, revenue, violation)
+        population[keep] = trial[keep]
+        revenue[keep] = trial_revenue[keep]
+        violation[keep] = trial_violation[keep]
+
+        feasible = violation == 0
+        history.append(float(revenue[feasible].max()) if feasible.any() else np.nan)
+        if feasible.all() and np.ptp(revenue) <= tolerance * max(1.0, abs(revenue.max())):
+            break
+
+    # Best member, then the best of its step-rounded neighbours (rounding can break the PGM split)
+    best = population[np.lexsort((-revenue, violation))[0]]
+    snapped = np.stack([
+        _snap_to_steps(best, lower, upper, steps),
+        _snap_to_steps(best - steps / 2, lower, upper, steps)
+    ])
+    snapped_revenue, snapped_violation = evaluate(snapped)
+    evaluations += len(snapped)
+    choice = np.lexsort((-snapped_revenue, snapped_violation))[0]
+    recommended = snapped[choice]
+    optimized_revenue = float(snapped_revenue[choice])
+    feasible = bool(snapped_violation[choice] == 0)
+
+    # Leave controls that make no difference to revenue at their current settings
+    if feasible:
+        restored = np.tile(recommended, (dimensions, 1))
+        restored[np.arange(dimensions), np.arange(dimensions)] = current
+        restored_revenue, restored_violation = evaluate(restored)
+        unchanged = (restored_violation == 0) & (restored_revenue >= optimized_revenue)
+        candidate = np.where(unchanged, current, recommended)
+        candidate_revenue, candidate_violation = evaluate(candidate[np.newaxis])
+        evaluations += dimensions + 1
+        if candidate_violation[0] == 0 and candidate_revenue[0] >= optimized_revenue:
+            recommended, optimized_revenue = candidate, float(candidate_revenue[0])
+
+    # Never recommend something worse than a feasible current operating point
+    if base_violation[0] == 0 and (not feasible or optimized_revenue < base_revenue[0]):
+        recommended, optimized_revenue, feasible = current, float(base_revenue[0]), True
+
+    base_revenue = float(base_revenue[0])
+    uplift = optimized_revenue - base_revenue
+    return {
+        'names': names,
+        'current': current,
+        'recommended': recommended,
+        'base_revenue': base_revenue,
+        'optimized_revenue': optimized_revenue,
+        'uplift': uplift,
+        'uplift_percent': uplift / base_revenue * 100 if base_revenue else np.nan,
+        'feasible': feasible,
+        'history': np.array(history),
+        'evaluations': evaluations
+    }
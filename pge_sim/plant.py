@@ -0,0 +1,132 @@
+"""Single-plant model: stage results, material flow validation and bottlenecks"""
+from .batch import _broadcast_inputs, simulate_oxide_batch, simulate_sulphide_batch
+from .profiling import timed
+
+# Bottleneck thresholds: least oxide stage output as a share of the feed, sulphide
+# grinding output as a share of crushing output, and expected concentrate yield
+OXIDE_THROUGHPUT_RATIO = 0.8
+GRINDING_THROUGHPUT_RATIO = 0.9
+CONCENTRATE_YIELD = 0.3
+
+
+class MetallurgicalPlant:
+    def __init__(self, feed_composition, process_params):
+        self.feed_composition = feed_composition
+        self.process_params = process_params
+        self.results = {}
+        self.stage_results = {}
+        self.material_flow_warnings = []
+        self.bottlenecks = []
+        
+    def validate_material_flow(self, stage_name, required_mass, available_mass, process_type="oxide"):
+        """Validate if upstream process can provide sufficient material for downstream process"""
+        if required_mass > available_mass:
+            shortage = required_mass - available_mass
+            shortage_percent = (shortage / required_mass) * 100
+            
+            warning = {
+                'process_type': process_type,
+                'stage': stage_name,
+                'required_mass': required_mass,
+                'available_mass': available_mass,
+                'shortage': shortage,
+                'shortage_percent': shortage_percent,
+                'severity': 'Critical' if shortage_percent > 50 else 'High' if shortage_percent > 25 else 'Moderate'
+            }
+            
+            self.material_flow_warnings.append(warning)
+            return False
+        return True
+        
+    @timed
+    def check_process_bottlenecks(self):
+        """Identify process bottlenecks based on material flow constraints"""
+        self.bottlenecks = []
+        
+        # Check oxide process bottlenecks
+        if 'oxide' in self.stage_results:
+            oxide_stages = self.stage_results['oxide']
+            
+            # Check each stage capacity vs demand
+            stages = ['sizing', 'grinding', 'leaching']
+            stage_masses = [
+                oxide_stages['sizing']['mass'],
+                oxide_stages['grinding']['mass'],
+                oxide_stages['leaching']['mass']
+            ]
+            
+            # Find the limiting stage
+            min_throughput_idx = stage_masses.index(min(stage_masses))
+            min_throughput = stage_masses[min_throughput_idx]
+            
+            if min_throughput < oxide_stages['feed']['mass'] * OXIDE_THROUGHPUT_RATIO:  # If significant loss
+                self.bottlenecks.append({
+                    'process': 'Oxide',
+                    'stage': stages[min_throughput_idx],
+                    'limiting_throughput': min_throughput,
+                    'feed_rate': oxide_stages['feed']['mass'],
+                    'efficiency_loss': (1 - min_throughput / oxide_stages['feed']['mass']) * 100
+                })
+        
+        # Check sulphide process bottlenecks
+        if 'sulphide' in self.stage_results:
+            sulphide_stages = self.stage_results['sulphide']
+            
+            # Check crushing -> grinding -> flotation capacity
+            crushing_output = sulphide_stages['crushing']['mass']
+            grinding_output = sulphide_stages['grinding']['mass']
+            flotation_capacity = sulphide_stages['cu_flotation']['concentrate_mass'] + sulphide_stages['ni_flotation']['concentrate_mass']
+            
+            if grinding_output < crushing_output * GRINDING_THROUGHPUT_RATIO:
+                self.bottlenecks.append({
+                    'process': 'Sulphide',
+                    'stage': 'grinding',
+                    'limiting_throughput': grinding_output,
+                    'upstream_capacity': crushing_output,
+                    'efficiency_loss': (1 - grinding_output / crushing_output) * 100
+                })
+            
+            if flotation_capacity < grinding_output * CONCENTRATE_YIELD:
+                self.bottlenecks.append({
+                    'process': 'Sulphide',
+                    'stage': 'flotation',
+                    'limiting_throughput': flotation_capacity,
+                    'upstream_capacity': grinding_output,
+                    'efficiency_loss': (1 - flotation_capacity / (grinding_output * CONCENTRATE_YIELD)) * 100
+                })
+        
+    def _apply_batch(self, process_type, simulate):
+        """Run one flowsheet through the batch engine as a single sample and store its compact results"""
+        feed, params = _broadcast_inputs(self.feed_composition, self.process_params)
+        stage_results, results, checks = simulate(feed, params)
+        
+        for check in checks:
+            self.validate_material_flow(check['stage'], float(check['required_mass'][0]), float(check['available_mass'][0]), process_type)
+        
+        self.stage_results[process_type] = stage_results.sample(0)
+        self.results[process_type] = self.stage_results[process_type].results
+        
+    @timed
+    def process_oxide_feed(self):
+        """Process oxide feed through sizing, grinding, and leaching with material flow validation"""
+        self._apply_batch('oxide', simulate_oxide_batch)
+        
+    @timed
+    def process_sulphide_feed(self):
+        """Process sulphide feed through all stages with detailed material flow validation"""
+        self._apply_batch('sulphide', simulate_sulphide_batch)
+        
+    @timed
+    def run_simulation(self, feed_type="Both Feeds"):
+        """Run the complete simulation with material flow validation"""
+        # Clear previous warnings and bottlenecks
+        self.material_flow_warnings = []
+        self.bottlenecks = []
+        
+        if feed_type in ["Oxide Feed", "Both Feeds"]:
+            self.process_oxide_feed()
+        if feed_type in ["Sulphide Feed", "Both Feeds"]:
+            self.process_sulphide_feed()
+            
+        # Check for process bottlenecks after simulation
+        self.check_process_bottlenecks()
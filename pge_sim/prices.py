@@ -0,0 +1,117 @@
+"""Correlated stochastic metal price paths.
+
+The log price of each metal in METALS follows either geometric Brownian
+motion or a mean-reverting (exponential Ornstein-Uhlenbeck) process started
+from the spot prices. Shocks are correlated across metals through the
+Cholesky factor of a correlation matrix and all paths are drawn in one
+batch: a (paths, years, metals) block of standard normals, one product with
+the factor and an exact transition per year, so millions of sample-years
+cost a fraction of a second. Both processes have exact transitions over any
+interval, so prices at a single horizon take one step however far ahead it
+is.
+"""
+import numpy as np
+
+from .revenue import metal_vector
+from .scenarios import METALS
+
+PRICE_MODELS = ["Geometric Brownian Motion", "Mean Reverting"]
+
+# Annual volatility (%) of each metal price
+DEFAULT_VOLATILITY = {'Cu': 22, 'Pd': 35, 'Pt': 28, 'Au': 15, 'Ni': 30, 'Co': 40}
+
+# Correlation of log price changes, rows and columns in METALS order
+DEFAULT_CORRELATION = np.array([
+    # Cu   Pd    Pt    Au    Ni    Co
+    [1.00, 0.30, 0.35, 0.20, 0.65, 0.40],
+    [0.30, 1.00, 0.60, 0.35, 0.30, 0.20],
+    [0.35, 0.60, 1.00, 0.50, 0.35, 0.20],
+    [0.20, 0.35, 0.50, 1.00, 0.15, 0.10],
+    [0.65, 0.30, 0.35, 0.15, 1.00, 0.45],
+    [0.40, 0.20, 0.20, 0.10, 0.45, 1.00]
+])
+
+# drift in %/year (GBM), reversion speed in 1/year (half-life ln 2 / reversion
+# years), long_run prices ({metal: price}, default the spot prices) and the
+# horizon (years ahead) of single-horizon samples
+DEFAULT_PRICE_MODEL = {
+    'model': "Geometric Brownian Motion",
+    'volatility': DEFAULT_VOLATILITY,
+    'correlation': DEFAULT_CORRELATION,
+    'drift': 0,
+    'reversion': 0.5,
+    'long_run': None,
+    'horizon': 1
+}
+
+
+def correlation_factor(correlation):
+    """Lower Cholesky factor of a METALS correlation matrix; ValueError if it is not a valid correlation matrix"""
+    correlation = np.asarray(correlation, dtype=float)
+    if correlation.shape != (len(METALS), len(METALS)):
+        raise ValueError(f"Correlation matrix must be {len(METALS)} x {len(METALS)}")
+    if not np.allclose(correlation, correlation.T):
+        raise ValueError("Correlation matrix must be symmetric")
+    if not np.allclose(np.diag(correlation), 1) or np.abs(correlation).max() > 1:
+        raise ValueError("Correlation matrix needs a unit diagonal and entries between -1 and 1")
+    try:
+        return np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix is not positive definite") from None
+
+
+def _transition(log_return, interval, shocks, model, spot):
+    """Exact step of log prices relative to spot (METALS on the last axis) over interval years"""
+    sigma = metal_vector(model['volatility']) / 100
+    if model['model'] == "Geometric Brownian Motion":
+        return log_return + (model['drift'] / 100 - sigma ** 2 / 2) * interval + sigma * np.sqrt(interval) * shocks
+    if model['model'] == "Mean Reverting":
+        kappa = model['reversion']
+        if kappa <= 0:
+            raise ValueError("Mean reversion speed must be positive")
+        level = 0.0
+        if model.get('long_run') is not None:
+            with np.errstate(divide='ignore'):
+                level = np.log(metal_vector(model['long_run']) / np.where(spot > 0, spot, 1))
+        # Level whose stationary distribution has a mean price of long_run
+        level = level - sigma ** 2 / (4 * kappa)
+        decay = np.exp(-kappa * interval)
+        return (level + (log_return - level) * decay +
+                sigma * np.sqrt((1 - decay ** 2) / (2 * kappa)) * shocks)
+    raise ValueError(f"Unknown price model: {model['model']}")
+
+
+def _correlated_shocks(rng, shape, model):
+    return rng.standard_normal((*shape, len(METALS))) @ correlation_factor(model['correlation']).T
+
+
+def price_paths(metal_prices, size, years, price_model=None, rng=None):
+    """Correlated metal price paths, shape (size, years, METALS).
+
+    Column t holds the prices t years after the spot metal_prices (a dict or
+    price vector), so column 0 is the spot price itself, as for the first
+    year of a schedule. price_model overrides DEFAULT_PRICE_MODEL.
+    """
+    model = {**DEFAULT_PRICE_MODEL, **(price_model or {})}
+    rng = np.random.default_rng() if rng is None else rng
+    spot = metal_vector(metal_prices)
+
+    # Year-major, so every step works on one contiguous block of paths
+    shocks = _correlated_shocks(rng, (max(years - 1, 0), size), model)
+    log_returns = np.zeros((years, size, len(METALS)))
+    if model['model'] == "Geometric Brownian Motion":
+        # Independent increments: the path is a cumulative sum of one-year steps
+        np.cumsum(_transition(0.0, 1, shocks, model, spot), axis=0, out=log_returns[1:])
+    else:
+        for year in range(1, years):
+            log_returns[year] = _transition(log_returns[year - 1], 1, shocks[year - 1], model, spot)
+    return spot * np.exp(log_returns.transpose(1, 0, 2))
+
+
+def sample_prices(metal_prices, size, price_model=None, rng=None):
+    """Correlated metal prices price_model['horizon'] years after the spot metal_prices, shape (size, METALS)"""
+    model = {**DEFAULT_PRICE_MODEL, **(price_model or {})}
+    rng = np.random.default_rng() if rng is None else rng
+    spot = metal_vector(metal_prices)
+    log_returns = _transition(0.0, model['horizon'], _correlated_shocks(rng, (size,), model), model, spot)
+    return spot * np.exp(log_returns)
@@ -0,0 +1,138 @@
+"""Opt-in wall-clock instrumentation of model stages and page sections.
+
+Timings are kept per thread, so every Streamlit session (which reruns its
+script on its own thread) sees only its own numbers. Profiling is off unless
+PGE_SIM_PROFILE is set (to 1, true, on or yes) or enable() is called; while
+off, timed functions only pay for one attribute check and section() returns
+a shared no-op context manager.
+
+Three kinds of hook are recorded under their name as a call count and total
+seconds: @timed functions and section() blocks (which may nest and count
+inclusive time), and begin(name), which closes the page section opened by
+the previous begin() and opens the next, so a top-to-bottom script can be
+split into sections without re-indenting it.
+
+start_page() and end_page() bracket a full script run. Streamlit reruns a
+fragment on its own, without the code around it, so a fragment checks
+page_running() to tell whether it is being timed as part of a page run or
+has to start (and show) timings of its own.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+PROFILE_ENV = 'PGE_SIM_PROFILE'
+
+
+def env_enabled():
+    """Whether PGE_SIM_PROFILE turns profiling on"""
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'on', 'yes')
+
+
+class _State(threading.local):
+    def __init__(self):
+        self.enabled = env_enabled()
+        self.records = {}
+        self.current = None
+        self.page = False
+
+
+_state = _State()
+_disabled = nullcontext()
+
+
+def enable(flag=True):
+    """Turn profiling on or off for the calling thread"""
+    _state.enabled = bool(flag)
+
+
+def enabled():
+    return _state.enabled
+
+
+def reset():
+    """Drop the calling thread's timings, e.g. at the start of a rerun"""
+    _state.records = {}
+    _state.current = None
+
+
+def start_page(flag):
+    """Start timing a full script run: enable profiling if flag and drop earlier timings"""
+    enable(flag)
+    reset()
+    _state.page = True
+
+
+def page_running():
+    """Whether a full script run started with start_page() is still in progress on this thread"""
+    return _state.page
+
+
+def end_page():
+    """End the open page section and the full script run"""
+    end()
+    _state.page = False
+
+
+def _record(name, elapsed):
+    record = _state.records.get(name)
+    if record is None:
+        _state.records[name] = [1, elapsed]
+    else:
+        record[0] += 1
+        record[1] += elapsed
+
+
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def section(name):
+    """Context manager timing its block under name while profiling is on"""
+    return _timer(name) if _state.enabled else _disabled
+
+
+def timed(function):
+    """Decorator timing every call of function under its qualified name while profiling is on"""
+    name = function.__qualname__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _state.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def begin(name):
+    """End the open page section, if any, and start timing the next one"""
+    if not _state.enabled:
+        return
+    now = time.perf_counter()
+    end(now)
+    _state.current = (name, now)
+
+
+def end(now=None):
+    """End the open page section"""
+    if _state.current is not None:
+        name, start = _state.current
+        _record(name, (time.perf_counter() if now is None else now) - start)
+        _state.current = None
+
+
+def timings():
+    """{name: {'calls', 'seconds'}} recorded on the calling thread since reset(), in first-seen order"""
+    return {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in _state.records.items()}
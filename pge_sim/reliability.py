@@ -0,0 +1,176 @@
+"""Discrete-event simulation of equipment failures and supply disruptions.
+
+Each failure mode alternates between running and down: times to failure
+are exponential with mean MTBF and repair (or disruption) times lognormal
+with mean MTTR. Every replication is one year of plant operation, and all
+replications are stepped together: the event queue holds the next event time
+of each mode per replication and each step pops the earliest event of every
+replication at once. The simulation only records how long each replication
+spends in each combination of modes down; what a combination costs comes
+from running the flowsheets once per combination with the failed equipment
+taken out, so outages propagate through the real plant (e.g. with the Cu
+flotation train down its feed still reaches Ni flotation). Revenue is the
+production of each combination valued at the metal prices (value_risk), so
+a stored analysis is re-priced without simulating again.
+"""
+import numpy as np
+
+from .batch import run_batch_simulation
+from .revenue import payable_production, value
+from .scenarios import METALS
+from .timeseries import HOURS_PER_YEAR
+
+# Failure modes: process affected (None for both), MTBF and MTTR (hours) and the
+# effect while down: process parameter overrides and factors on feed rates and grades
+FAILURE_MODES = {
+    'crusher': {'label': 'Crusher', 'process': 'sulphide', 'mtbf': 500, 'mttr': 8,
+                'params': {'crushing_efficiency': 0}},
+    'mill': {'label': 'Mill', 'process': 'sulphide', 'mtbf': 1000, 'mttr': 12,
+             'params': {'sulphide_grinding_efficiency': 0}},
+    'cu_flotation': {'label': 'Cu Flotation Train', 'process': 'sulphide', 'mtbf': 1500, 'mttr': 6,
+                     'params': {'cu_flotation_recovery': 0, 'pgm_to_cu_concentrate': 0}},
+    'ni_flotation': {'label': 'Ni Flotation Train', 'process': 'sulphide', 'mtbf': 1500, 'mttr': 6,
+                     'params': {'ni_flotation_recovery': 0, 'co_flotation_recovery': 0, 'pgm_to_ni_concentrate': 0}},
+    'supply': {'label': 'Supply Disruption', 'process': None, 'mtbf': 720, 'mttr': 48,
+               'feed_rate_factor': 0.7, 'grade_factor': 0.8}
+}
+
+# Coefficient of variation of repair times
+REPAIR_CV = 0.5
+
+
+def active_modes(modes, feed_type="Both Feeds"):
+    """Names of the failure modes that affect the processes run for this feed type"""
+    processes = []
+    if feed_type in ["Oxide Feed", "Both Feeds"]:
+        processes.append('oxide')
+    if feed_type in ["Sulphide Feed", "Both Feeds"]:
+        processes.append('sulphide')
+    return [name for name, mode in modes.items() if mode.get('process') in processes + [None]]
+
+
+def simulate_outages(modes, replications, horizon=HOURS_PER_YEAR, seed=42, repair_cv=REPAIR_CV):
+    """Step every replication from failure to repair over horizon hours.
+
+    Returns columnar arrays with one row per replication: state_hours
+    (hours spent in each combination of modes down, column bit i set when
+    mode i is down), and failures and downtime (hours) per mode. Failure
+    clocks run regardless of the state of other equipment.
+    """
+    rng = np.random.default_rng(seed)
+    mtbf = np.array([float(mode['mtbf']) for mode in modes.values()])
+    mttr = np.array([float(mode['mttr']) for mode in modes.values()])
+    sigma = np.sqrt(np.log1p(repair_cv ** 2))
+    mu = np.log(mttr) - sigma ** 2 / 2
+    count = len(mtbf)
+
+    now = np.zeros(replications)
+    state = np.zeros(replications, dtype=np.int64)
+    next_event = rng.exponential(mtbf, (replications, count))
+    failures = np.zeros((replications, count), dtype=np.int64)
+    # (replication, state) cells and the hours spent in them, summed once at the end
+    cells, hours = [], []
+
+    running = np.arange(replications)
+    while running.size:
+        mode = np.argmin(next_event[running], axis=1)
+        event_time = next_event[running, mode]
+        until = np.minimum(event_time, horizon)
+        cells.append(running * 2 ** count + state[running])
+        hours.append(until - now[running])
+        now[running] = until
+
+        # Events past the horizon end the replication
+        live = event_time < horizon
+        running, mode = running[live], mode[live]
+        failing = (state[running] >> mode) & 1 == 0
+        state[running] ^= 1 << mode
+        failures[running[failing], mode[failing]] += 1
+        repair = rng.lognormal(mu[mode], sigma)
+        uptime = rng.exponential(mtbf[mode])
+        next_event[running, mode] = now[running] + np.where(failing, repair, uptime)
+
+    state_hours = np.bincount(np.concatenate(cells), weights=np.concatenate(hours),
+                              minlength=replications * 2 ** count).reshape(replications, 2 ** count)
+    down = (np.arange(2 ** count)[:, np.newaxis] >> np.arange(count)) & 1
+    return {
+        'state_hours': state_hours,
+        'failures': failures,
+        'downtime': state_hours @ down
+    }
+
+
+def state_production(modes, feed_composition, process_params, feed_type="Both Feeds"):
+    """Payable production per metal in METALS (per hour) for every combination of modes down.
+
+    Row i has mode j down when bit j of i is set; all combinations go
+    through the batch engine in one call.
+    """
+    states = np.arange(2 ** len(modes))
+    feed = {metal: np.full(len(states), float(grade)) for metal, grade in feed_composition.items()}
+    params = {name: np.full(len(states), float(param)) for name, param in process_params.items()}
+    for bit, mode in enumerate(modes.values()):
+        down = (states >> bit) & 1 == 1
+        for name, param in mode.get('params', {}).items():
+            params[name][down] = param
+        for name in ['oxide_feed_rate', 'sulphide_feed_rate']:
+            params[name][down] *= mode.get('feed_rate_factor', 1)
+        for metal in feed:
+            feed[metal][down] *= mode.get('grade_factor', 1)
+
+    results = run_batch_simulation(feed, params, feed_type)['results']
+    return sum(payable_production(results).values()) + np.zeros((len(states), len(METALS)))
+
+
+def run_risk_analysis(feed_composition, process_params, metal_prices, modes=None, feed_type="Both Feeds",
+                      replications=10000, horizon=HOURS_PER_YEAR, seed=42):
+    """Annual lost production and revenue from equipment failures and supply disruptions.
+
+    modes defaults to FAILURE_MODES; only modes affecting the processes of
+    this feed type are simulated. Returns columnar arrays with one row per
+    replication: lost_production (one column per metal in METALS),
+    failures, downtime (hours) and state_hours, plus the mode names and
+    labels, the production rate of every combination of modes down
+    (state_production) and the horizon. Unless metal_prices is None the
+    revenue figures of value_risk are included as well.
+    """
+    modes = FAILURE_MODES if modes is None else modes
+    names = active_modes(modes, feed_type)
+    modes = {name: modes[name] for name in names}
+
+    outages = simulate_outages(modes, replications, horizon, seed)
+    production_rates = state_production(modes, feed_composition, process_params, feed_type)
+    state_hours = outages['state_hours']
+
+    risk = {
+        'names': names,
+        'labels': [modes[name]['label'] for name in names],
+        'horizon': horizon,
+        'state_hours': state_hours,
+        'state_production': production_rates,
+        'lost_production': production_rates[0] * horizon - state_hours @ production_rates,
+        'failures': outages['failures'],
+        'downtime': outages['downtime']
+    }
+    if metal_prices is not None:
+        risk.update(value_risk(risk, metal_prices))
+    return risk
+
+
+def value_risk(risk, metal_prices):
+    """Revenue figures of a risk analysis at metal_prices.
+
+    Returns revenue and lost_revenue ($, one row per replication),
+    mode_loss ($, the revenue lost per mode counting its downtime as if it
+    were the only one down) and the failure-free base_revenue.
+    """
+    revenue_rates = value(risk['state_production'], metal_prices)
+    revenue = risk['state_hours'] @ revenue_rates
+    base_revenue = revenue_rates[0] * risk['horizon']
+    single_loss = revenue_rates[0] - revenue_rates[2 ** np.arange(len(risk['names']))]
+    return {
+        'base_revenue': float(base_revenue),
+        'revenue': revenue,
+        'lost_revenue': base_revenue - revenue,
+        'mode_loss': risk['downtime'] * single_loss
+    }
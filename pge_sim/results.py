@@ -0,0 +1,128 @@
+"""Compact array-backed stage results: one float array per flowsheet with a named index"""
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class Record(Mapping):
+    """Named rows of a StageResults array: the fields of one stage, or the flat results"""
+
+    __slots__ = ('_owner', '_rows')
+
+    def __init__(self, owner, rows):
+        self._owner = owner
+        self._rows = rows
+
+    def __getitem__(self, field):
+        return self._owner.row(self._rows[field])
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class StageResults(Mapping):
+    """Stage × field float array for one flowsheet, with a column per sample.
+
+    Reads like the nested {stage: {field: value}} dicts it replaces:
+    results['crushing']['mass'] is a row of data, a 1-D view for a batch or
+    a float for a single sample taken with sample(). stages maps each stage
+    to {field: row} and result_rows maps the flat results (MetallurgicalPlant
+    .results) onto the same rows, so nothing is stored twice. Results fresh
+    from the flowsheet engine share its working array; compact() keeps only
+    the named rows, optionally in a smaller float type, for retention.
+    """
+
+    __slots__ = ('data', 'stages', 'result_rows', 'scalar')
+
+    def __init__(self, data, stages, result_rows, scalar=False):
+        self.data = data
+        self.stages = stages
+        self.result_rows = result_rows
+        self.scalar = scalar
+
+    def row(self, index):
+        """One row of data: a float for a single sample, otherwise a view"""
+        if self.scalar:
+            return float(self.data[index, 0])
+        return self.data[index]
+
+    def __getitem__(self, stage):
+        return Record(self, self.stages[stage])
+
+    def __iter__(self):
+        return iter(self.stages)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def __repr__(self):
+        return f"StageResults({len(self.stages)} stages, {self.data.shape[0]} rows, {self.size} samples)"
+
+    @property
+    def size(self):
+        """Number of samples"""
+        return self.data.shape[1]
+
+    @property
+    def results(self):
+        """Flat results keyed as in MetallurgicalPlant.results"""
+        return Record(self, self.result_rows)
+
+    @property
+    def index(self):
+        """(stage, field) of every stage result, in order"""
+        return [(stage, field) for stage, fields in self.stages.items() for field in fields]
+
+    def _used_rows(self):
+        rows = {row for fields in self.stages.values() for row in fields.values()}
+        return sorted(rows.union(self.result_rows.values()))
+
+    def _remapped(self, data, rows, scalar=False):
+        position = {row: new for new, row in enumerate(rows)}
+        stages = {stage: {field: position[row] for field, row in fields.items()} for stage, fields in self.stages.items()}
+        result_rows = {key: position[row] for key, row in self.result_rows.items()}
+        return StageResults(data, stages, result_rows, scalar)
+
+    def compact(self, dtype=None):
+        """Copy holding only the named rows (once each), optionally converted to dtype"""
+        rows = self._used_rows()
+        if rows == list(range(self.data.shape[0])) and dtype in (None, self.data.dtype):
+            return self
+        return self._remapped(self.data[rows].astype(dtype or self.data.dtype, copy=False), rows)
+
+    def sample(self, index=0):
+        """One sample as compact single-column results whose fields read as floats"""
+        rows = self._used_rows()
+        return self._remapped(self.data[rows, index:index + 1].astype(float), rows, scalar=True)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """Join results with the same layout (e.g. Monte Carlo chunks) along the sample axis"""
+        first = parts[0]
+        return cls(np.concatenate([part.data for part in parts], axis=1), first.stages, first.result_rows)
+
+    def to_frame(self):
+        """DataFrame with a row per sample and (stage, field) columns.
+
+        Compact results are wrapped without copying; the columns follow the
+        data rows, each named by the first stage field (else result) stored
+        there.
+        """
+        import pandas as pd
+
+        compact = self.compact()
+        labels = {}
+        for stage, fields in compact.stages.items():
+            for field, row in fields.items():
+                labels.setdefault(row, (stage, field))
+        for key, row in compact.result_rows.items():
+            labels.setdefault(row, ('results', key))
+        columns = pd.MultiIndex.from_tuples([labels[row] for row in range(compact.data.shape[0])],
+                                            names=['stage', 'field'])
+        return pd.DataFrame(compact.data.T, columns=columns, copy=False)
@@ -0,0 +1,69 @@
+"""Valuation of plant production at metal prices.
+
+Physical results and prices are kept apart: payable_production() reduces
+plant results to payable metal with METALS on the last axis, and every
+revenue figure is that production times a price vector. Production that is
+cached or retained (e.g. Monte Carlo samples) can therefore be re-valued
+at new prices without running a flowsheet again.
+"""
+import numpy as np
+
+from .scenarios import METALS
+
+# Metals recovered to saleable product by each process
+PAYABLE_METALS = {
+    'oxide': ['Pd', 'Au'],
+    'sulphide': ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']
+}
+
+
+def metal_vector(values):
+    """Array with METALS on the last axis from a dict of metal values (missing metals are 0) or an array"""
+    if isinstance(values, dict):
+        return np.stack(np.broadcast_arrays(*[np.asarray(values.get(metal, 0), dtype=float) for metal in METALS]),
+                        axis=-1)
+    return np.asarray(values, dtype=float)
+
+
+def payable_production(results):
+    """Payable production (kg/h) per process, with METALS on the last axis; works on single results or batch arrays"""
+    return {
+        process_type: metal_vector({metal: results[process_type][f'{metal.lower()}_recovered'] for metal in metals})
+        for process_type, metals in PAYABLE_METALS.items() if process_type in results
+    }
+
+
+def value(production, metal_prices):
+    """Revenue ($/hour) of production (METALS on the last axis) at metal_prices, a dict or price vector (broadcast)"""
+    return np.einsum('...m,...m->...', production, metal_vector(metal_prices))
+
+
+def price_sweep(production, price_decks):
+    """Revenue ($/hour) of every production row under every price deck, as (rows, decks).
+
+    price_decks is an array with one deck per row and METALS on the last
+    axis, or a dict of price arrays keyed by metal. One matrix product, so
+    millions of retained samples are re-priced in milliseconds.
+    """
+    return np.asarray(production, dtype=float) @ np.atleast_2d(metal_vector(price_decks)).T
+
+
+def metal_revenue(results, metal_prices):
+    """Revenue ($/hour) per process and metal; works on single results or batch arrays"""
+    prices = metal_vector(metal_prices)
+    return {
+        process_type: {metal: production[..., METALS.index(metal)] * prices[..., METALS.index(metal)]
+                       for metal in PAYABLE_METALS[process_type]}
+        for process_type, production in payable_production(results).items()
+    }
+
+
+def process_values(results, metal_prices):
+    """Total revenue ($/hour) of each process"""
+    return {process_type: value(production, metal_prices)
+            for process_type, production in payable_production(results).items()}
+
+
+def total_value(results, metal_prices):
+    """Total plant revenue ($/hour) across all processes"""
+    return sum(process_values(results, metal_prices).values())
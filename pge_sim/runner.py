@@ -0,0 +1,229 @@
+"""Headless batch scenario runner: stream scenario rows from CSV or Parquet through the plant model.
+
+Usage:
+    python -m pge_sim scenarios.csv results.parquet --feed-type "Both Feeds" --workers 8
+
+Each input row is one scenario. Columns named after a metal (Cu, Pd, ...) are
+feed grades (%), columns named after a process parameter are process
+parameters and '<metal>_price' columns are metal prices; --defaults names a
+JSON file of {column: value} for inputs missing from the file. Any other
+columns (e.g. a scenario id) are copied to the output. Rows are read, spread
+over worker processes and written in chunks, so memory stays bounded however
+large the file is. Parquet needs pyarrow.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from .batch import run_batch_simulation
+from .montecarlo import iter_chunk_results
+from .plant import CONCENTRATE_YIELD, GRINDING_THROUGHPUT_RATIO, OXIDE_THROUGHPUT_RATIO
+from .revenue import PAYABLE_METALS, process_values
+from .scenarios import FEED_TYPES, METALS, OXIDE_PARAMS, SULPHIDE_PARAMS
+
+# Scenario rows per chunk
+RUNNER_CHUNK_SIZE = 100000
+
+PRICE_SUFFIX = '_price'
+
+
+def process_columns(feed_type="Both Feeds"):
+    """Process parameters used by the processes run for this feed type"""
+    columns = []
+    if feed_type in ["Oxide Feed", "Both Feeds"]:
+        columns += OXIDE_PARAMS
+    if feed_type in ["Sulphide Feed", "Both Feeds"]:
+        columns += SULPHIDE_PARAMS
+    return columns
+
+
+def input_columns(feed_type="Both Feeds"):
+    """Column name of every model input: grades, process parameters, then prices"""
+    return METALS + process_columns(feed_type) + [f'{metal}{PRICE_SUFFIX}' for metal in METALS]
+
+
+def _file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension == '.csv' or path.lower().endswith('.csv.gz'):
+        return 'csv'
+    raise ValueError(f"Unsupported file type '{path}': use .csv, .csv.gz or .parquet")
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Reading or writing Parquet needs pyarrow (pip install pyarrow)") from error
+    return pyarrow, pyarrow.parquet
+
+
+def read_chunks(path, chunk_size=RUNNER_CHUNK_SIZE):
+    """Iterate over the rows of a CSV or Parquet file (or named file object) as DataFrames of at most chunk_size rows"""
+    import pandas as pd
+
+    if _file_format(getattr(path, 'name', path)) == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+    _, parquet = _pyarrow_parquet()
+    for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to one CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = _file_format(path)
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, frame):
+        if self.format == 'csv':
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        else:
+            pyarrow, parquet = _pyarrow_parquet()
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = parquet.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _stage_labels(flags):
+    """';'-joined names of the flagged stages per row, from {name: boolean array}"""
+    labels = np.full(len(next(iter(flags.values()))), '', dtype=object)
+    for name, flagged in flags.items():
+        labels = np.where(flagged, np.where(labels == '', name, labels + ';' + name), labels)
+    return labels
+
+
+def bottleneck_flags(stage_results):
+    """{'process:stage': boolean array} with the bottleneck rules of MetallurgicalPlant, per sample"""
+    flags = {}
+    if 'oxide' in stage_results:
+        oxide = stage_results['oxide']
+        stages = ['sizing', 'grinding', 'leaching']
+        masses = np.stack([oxide[stage]['mass'] for stage in stages])
+        limited = masses.min(axis=0) < oxide['feed']['mass'] * OXIDE_THROUGHPUT_RATIO
+        limiting = masses.argmin(axis=0)
+        for index, stage in enumerate(stages):
+            flags[f'oxide:{stage}'] = limited & (limiting == index)
+    if 'sulphide' in stage_results:
+        sulphide = stage_results['sulphide']
+        ground = sulphide['grinding']['mass']
+        concentrate = sulphide['cu_flotation']['concentrate_mass'] + sulphide['ni_flotation']['concentrate_mass']
+        flags['sulphide:grinding'] = ground < sulphide['crushing']['mass'] * GRINDING_THROUGHPUT_RATIO
+        flags['sulphide:flotation'] = concentrate < ground * CONCENTRATE_YIELD
+    return flags
+
+
+def evaluate_chunk(task):
+    """Evaluate one chunk of scenario rows; returns the output DataFrame"""
+    frame, defaults, feed_type = task
+    inputs = {column: frame[column].to_numpy(dtype=float) if column in frame else defaults[column]
+              for column in input_columns(feed_type)}
+    missing = [column for column, value in inputs.items() if value is None]
+    if missing:
+        raise ValueError(f"No values for {', '.join(missing)}: add the columns or pass them in --defaults")
+
+    feed = {metal: inputs[metal] for metal in METALS}
+    params = {name: inputs[name] for name in process_columns(feed_type)}
+    prices = {metal: inputs[f'{metal}{PRICE_SUFFIX}'] for metal in METALS}
+    batch = run_batch_simulation(feed, params, feed_type)
+    size = len(frame)
+
+    model_columns = set(input_columns())
+    output = frame[[column for column in frame.columns if column not in model_columns]].copy()
+    for metal in METALS:
+        output[f'{metal}_production'] = sum(
+            results[f'{metal.lower()}_recovered'] for process_type, results in batch['results'].items()
+            if metal in PAYABLE_METALS[process_type]
+        ) + np.zeros(size)
+    values = process_values(batch['results'], prices)
+    for process_type, value in values.items():
+        output[f'{process_type}_revenue'] = value + np.zeros(size)
+    output['revenue'] = sum(values.values()) + np.zeros(size)
+
+    checks = batch['material_flow_checks']
+    overloaded = {f"{check['process_type']}:{check['stage']}": check['overloaded'] + np.zeros(size, dtype=bool)
+                  for check in checks}
+    shortage = [np.where(check['overloaded'], (check['required_mass'] - check['available_mass']) /
+                         np.where(check['required_mass'] > 0, check['required_mass'], 1) * 100, 0)
+                for check in checks]
+    output['warnings'] = sum(flags.astype(int) for flags in overloaded.values()) + np.zeros(size, dtype=int)
+    output['max_shortage_percent'] = np.max(shortage, axis=0) + np.zeros(size) if shortage else np.zeros(size)
+    output['warning_stages'] = _stage_labels(overloaded) if overloaded else ''
+    bottlenecks = bottleneck_flags(batch['stage_results'])
+    output['bottlenecks'] = _stage_labels(bottlenecks) if bottlenecks else ''
+    return output
+
+
+def run_file(input_path, output_path, feed_type="Both Feeds", defaults=None, chunk_size=RUNNER_CHUNK_SIZE,
+             workers=None, progress=None):
+    """Stream every scenario row of input_path through the plant model into output_path.
+
+    Chunks are evaluated on worker processes (all cores by default) and
+    written in input order; at most two chunks per worker are held at once.
+    progress, if given, is called with the number of rows written so far.
+    Returns the number of rows written.
+    """
+    defaults = {column: (defaults or {}).get(column) for column in input_columns(feed_type)}
+    tasks = ((frame, defaults, feed_type) for frame in read_chunks(input_path, chunk_size))
+    workers = workers or os.cpu_count() or 1
+
+    with ChunkWriter(output_path) as writer:
+        chunk_results = iter_chunk_results(tasks, workers, evaluate_chunk)
+        try:
+            for output in chunk_results:
+                writer.write(output)
+                if progress is not None:
+                    progress(writer.rows)
+        finally:
+            chunk_results.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pge_sim', description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', help="scenario rows (.csv, .csv.gz or .parquet)")
+    parser.add_argument('output', help="results file (.csv, .csv.gz or .parquet)")
+    parser.add_argument('--feed-type', choices=FEED_TYPES, default="Both Feeds")
+    parser.add_argument('--defaults', help="JSON file of {column: value} for inputs missing from the file")
+    parser.add_argument('--chunk-size', type=int, default=RUNNER_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--quiet', action='store_true', help="do not report progress")
+    args = parser.parse_args(argv)
+
+    defaults = None
+    if args.defaults:
+        with open(args.defaults) as file:
+            defaults = json.load(file)
+
+    def report(rows):
+        print(f"\r{rows:,} rows", end='', file=sys.stderr, flush=True)
+
+    try:
+        rows = run_file(args.input, args.output, args.feed_type, defaults, args.chunk_size, args.workers,
+                        None if args.quiet else report)
+    except (ImportError, ValueError) as error:
+        parser.exit(1, f"error: {error}\n")
+    if not args.quiet:
+        print(f"\rWrote {rows:,} rows to {args.output}", file=sys.stderr)
+    return 0
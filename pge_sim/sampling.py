@@ -0,0 +1,164 @@
+"""Random, Latin hypercube and scrambled Sobol samplers for Monte Carlo inputs"""
+import numpy as np
+
+SAMPLERS = ["Random", "Latin Hypercube", "Sobol (Scrambled)"]
+
+# Bits of precision in the Sobol sequence
+SOBOL_BITS = 32
+
+# Joe-Kuo direction numbers (new-joe-kuo-6.21201) for dimensions 2 onwards:
+# (degree s, polynomial coefficients a, initial direction numbers m_1..m_s)
+SOBOL_DIRECTIONS = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1, [1, 3, 3, 9, 7, 49]),
+    (6, 13, [1, 1, 1, 15, 21, 21]),
+    (6, 16, [1, 3, 1, 13, 27, 49]),
+    (6, 19, [1, 1, 1, 15, 7, 5]),
+    (6, 22, [1, 3, 1, 15, 13, 25]),
+    (6, 25, [1, 1, 5, 5, 19, 61]),
+    (7, 1, [1, 3, 7, 11, 23, 15, 103]),
+    (7, 4, [1, 3, 7, 13, 13, 15, 69])
+]
+
+MAX_SOBOL_DIMENSIONS = len(SOBOL_DIRECTIONS) + 1
+
+# Acklam's rational approximation to the inverse normal CDF
+_PPF_A = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+_PPF_B = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01]
+_PPF_C = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+_PPF_D = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00]
+_PPF_LOW = 0.02425
+
+# Abramowitz & Stegun 7.1.26 approximation to erf (absolute error below 1.5e-7)
+_ERF_P = 0.3275911
+_ERF_A = [1.061405429, -1.453152027, 1.421413741, -0.284496736, 0.254829592]
+
+
+def norm_ppf(u):
+    """Standard normal inverse CDF for probabilities in (0, 1), vectorized"""
+    u = np.asarray(u, dtype=float)
+    x = np.empty_like(u)
+
+    low = u < _PPF_LOW
+    high = u > 1 - _PPF_LOW
+    central = ~(low | high)
+
+    q = u[central] - 0.5
+    r = q * q
+    x[central] = (np.polyval(_PPF_A, r) * q) / np.polyval(_PPF_B + [1.0], r)
+
+    q = np.sqrt(-2 * np.log(u[low]))
+    x[low] = np.polyval(_PPF_C, q) / np.polyval(_PPF_D + [1.0], q)
+
+    q = np.sqrt(-2 * np.log1p(-u[high]))
+    x[high] = -np.polyval(_PPF_C, q) / np.polyval(_PPF_D + [1.0], q)
+
+    return x
+
+
+def norm_cdf(x):
+    """Standard normal CDF, vectorized"""
+    x = np.asarray(x, dtype=float)
+    t = 1 / (1 + _ERF_P * np.abs(x) / np.sqrt(2))
+    tail = 0.5 * np.polyval(_ERF_A, t) * t * np.exp(-x * x / 2)
+    return np.where(x >= 0, 1 - tail, tail)
+
+
+def latin_hypercube(size, dimensions, rng):
+    """Latin hypercube sample on [0, 1): one point in each of size strata per dimension"""
+    strata = np.argsort(rng.random((dimensions, size)), axis=1).T
+    return (strata + rng.random((size, dimensions))) / size
+
+
+def _sobol_direction_numbers(dimensions):
+    """Direction numbers as SOBOL_BITS-bit integers, shape (dimensions, SOBOL_BITS)"""
+    if dimensions > MAX_SOBOL_DIMENSIONS:
+        raise ValueError(f"Sobol sampler supports at most {MAX_SOBOL_DIMENSIONS} dimensions")
+
+    directions = np.zeros((dimensions, SOBOL_BITS), dtype=np.uint64)
+    # First dimension: van der Corput sequence
+    directions[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+
+    for dim in range(1, dimensions):
+        degree, coefficients, initial = SOBOL_DIRECTIONS[dim - 1]
+        m = list(initial)
+        for k in range(degree, SOBOL_BITS):
+            value = m[k - degree] ^ (m[k - degree] << degree)
+            for j in range(1, degree):
+                if (coefficients >> (degree - 1 - j)) & 1:
+                    value ^= m[k - j] << j
+            m.append(value)
+        directions[dim] = [m[k] << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+
+    return directions
+
+
+def _scramble_directions(directions, rng):
+    """Linear matrix scramble: multiply each dimension's directions by a random lower-triangular matrix over GF(2)"""
+    dimensions, bits = directions.shape
+    scrambled = np.zeros_like(directions)
+    for dim in range(dimensions):
+        # Row i of the matrix acts on the i-th most significant bit
+        lower = np.tril(rng.integers(0, 2, (bits, bits)), -1) + np.eye(bits, dtype=np.int64)
+        for row in range(bits):
+            row_mask = np.uint64(sum(1 << (bits - 1 - col) for col in range(row + 1) if lower[row, col]))
+            parity = np.array([bin(int(v)).count('1') & 1 for v in directions[dim] & row_mask], dtype=np.uint64)
+            scrambled[dim] |= parity << np.uint64(bits - 1 - row)
+    return scrambled
+
+
+def sobol_points(start, size, dimensions, seed=None):
+    """Points start..start+size-1 of a Sobol sequence on (0, 1).
+
+    With a seed, the sequence is scrambled (linear matrix scramble plus a
+    digital shift) identically for every call with that seed, so consecutive
+    index ranges can be generated independently, e.g. in separate workers.
+    """
+    directions = _sobol_direction_numbers(dimensions)
+    shift = np.zeros(dimensions, dtype=np.uint64)
+    if seed is not None:
+        rng = np.random.default_rng(seed)
+        directions = _scramble_directions(directions, rng)
+        shift = rng.integers(0, 1 << SOBOL_BITS, dimensions, dtype=np.uint64)
+
+    index = np.arange(start, start + size, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    points = np.zeros((size, dimensions), dtype=np.uint64)
+    for bit in range(SOBOL_BITS):
+        active = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[active] ^= directions[:, bit]
+    points ^= shift
+
+    # Centre each point in its cell so no coordinate is exactly 0
+    return (points.astype(float) + 0.5) / float(1 << SOBOL_BITS)
+
+
+def normal_deviates(sampler, rng, size, dimensions, start=0, seed=None):
+    """Standard normal deviates, shape (size, dimensions), from the chosen sampler.
+
+    Random and Latin hypercube draw from rng; Sobol takes points start onwards
+    of the sequence scrambled with seed and maps them through the normal
+    inverse CDF.
+    """
+    if sampler == "Random":
+        return rng.standard_normal((size, dimensions))
+    if sampler == "Latin Hypercube":
+        return norm_ppf(latin_hypercube(size, dimensions, rng))
+    if sampler == "Sobol (Scrambled)":
+        return norm_ppf(sobol_points(start, size, dimensions, seed))
+    raise ValueError(f"Unknown sampler: {sampler}")
@@ -0,0 +1,96 @@
+"""Baseline production scenarios and feed composition helpers"""
+
+METALS = ['Cu', 'Pd', 'Pt', 'Au', 'Ni', 'Co']
+
+FEED_TYPES = ["Oxide Feed", "Sulphide Feed", "Both Feeds"]
+
+# Define baseline scenarios
+scenarios = {
+    "15Mtpa Case": {
+        "total_mined": 680,  # Mt
+        "total_processed": 240,  # Mt
+        "3E_grade": 0.95,  # g/t (Pd+Pt+Au)
+        "ni_grade": 0.16,  # %
+        "cu_grade": 0.11,  # %
+        "co_grade": 0.017,  # %
+        "pd_recovery": 78,  # %
+        "pt_recovery": 45,  # %
+        "au_recovery": 66,  # %
+        "ni_recovery": 43,  # %
+        "cu_recovery": 80,  # %
+        "co_recovery": 42,  # %
+        "oxide_throughput": 2,  # Mtpa
+        "sulphide_throughput": 12.5,  # Mtpa (mid-range of 7.5-15)
+        "mine_life_sulphide": 19,  # years
+        "mine_life_oxide": 4  # years
+    },
+    "30Mtpa Case": {
+        "total_mined": 1300,  # Mt
+        "total_processed": 440,  # Mt
+        "3E_grade": 0.85,  # g/t (Pd+Pt+Au)
+        "ni_grade": 0.16,  # %
+        "cu_grade": 0.09,  # %
+        "co_grade": 0.016,  # %
+        "pd_recovery": 77,  # %
+        "pt_recovery": 43,  # %
+        "au_recovery": 66,  # %
+        "ni_recovery": 41,  # %
+        "cu_recovery": 76,  # %
+        "co_recovery": 40,  # %
+        "oxide_throughput": 2,  # Mtpa
+        "sulphide_throughput": 22.5,  # Mtpa (mid-range of 15-30)
+        "mine_life_sulphide": 18,  # years
+        "mine_life_oxide": 4  # years
+    }
+}
+
+
+def mtpa_to_tph(throughput_mtpa):
+    """Convert an annual throughput in Mtpa to tonnes per hour"""
+    return throughput_mtpa * 1000000 / (365 * 24)
+
+
+def scenario_feed_composition(scenario_data, feed_type="Both Feeds"):
+    """Feed grades (%) for a predefined scenario, splitting 3E with the typical 50/30/20 Pd/Pt/Au ratios"""
+    total_3e_grade = scenario_data['3E_grade']
+    sulphide_metals = feed_type in ["Sulphide Feed", "Both Feeds"]
+    
+    return {
+        'Cu': scenario_data['cu_grade'],
+        'Pd': total_3e_grade * 0.5 / 1000,  # 50% of 3E, convert g/t to %
+        'Pt': total_3e_grade * 0.3 / 1000,  # 30% of 3E
+        'Au': total_3e_grade * 0.2 / 1000,  # 20% of 3E
+        'Ni': scenario_data['ni_grade'] if sulphide_metals else 0,
+        'Co': scenario_data['co_grade'] if sulphide_metals else 0
+    }
+
+
+# Range (min, max, step) of each sidebar process control; also the optimizer's search space
+PROCESS_PARAM_RANGES = {
+    'oxide_feed_rate': (100, 2000, 50),
+    'sizing_efficiency': (85, 99, 1),
+    'oxide_grinding_efficiency': (85, 98, 1),
+    'leaching_efficiency': (80, 95, 1),
+    'oxide_pd_recovery': (70, 85, 1),
+    'oxide_au_recovery': (85, 95, 1),
+    'sulphide_feed_rate': (500, 5000, 100),
+    'crushing_efficiency': (90, 99, 1),
+    'sulphide_grinding_efficiency': (85, 98, 1),
+    'cu_flotation_efficiency': (75, 95, 1),
+    'cu_flotation_recovery': (70, 85, 1),
+    'ni_flotation_efficiency': (70, 90, 1),
+    'ni_flotation_recovery': (35, 50, 1),
+    'co_flotation_recovery': (35, 50, 1),
+    'pgm_to_cu_concentrate': (60, 85, 5),
+    'pgm_to_ni_concentrate': (10, 35, 5),
+    'pressure_oxidation_efficiency': (90, 98, 1),
+    'final_cu_recovery': (85, 98, 1),
+    'final_pd_recovery': (85, 98, 1),
+    'final_pt_recovery': (80, 95, 1),
+    'final_au_recovery': (85, 98, 1),
+    'final_ni_recovery': (85, 98, 1),
+    'final_co_recovery': (85, 98, 1)
+}
+
+OXIDE_PARAMS = list(PROCESS_PARAM_RANGES)[:6]
+SULPHIDE_PARAMS = list(PROCESS_PARAM_RANGES)[6:]
@@ -0,0 +1,171 @@
+"""Annual life-of-mine schedules and discounted cash flow (NPV/IRR) for the production scenarios"""
+import numpy as np
+
+from .batch import run_batch_simulation
+from .prices import price_paths
+from .revenue import metal_vector, payable_production, value
+from .sampling import normal_deviates
+from .scenarios import METALS, scenario_feed_composition
+from .timeseries import HOURS_PER_YEAR
+
+# Cash flow assumptions: rates in %/year, capex in $ (spent in year 0), costs in $/t
+DEFAULT_ECONOMICS = {
+    'discount_rate': 8,
+    'price_escalation': 0,
+    'cost_escalation': 0,
+    'capex': 0,
+    'mining_cost': 0,
+    'processing_cost': 0
+}
+
+# Inputs varied across schedule variants, as multiplying factors on the base case
+VARIANT_FACTORS = ['tonnage', 'grade', 'price', 'cost', 'capex']
+
+# Bracket (fraction/year) searched for the internal rate of return
+IRR_BOUNDS = (-0.99, 10.0)
+
+
+def scenario_schedule(scenario_data, feed_type="Both Feeds", grade_decline=0):
+    """Ore processed (t) per process and year, plus mined tonnes and a relative grade per year.
+
+    Oxide ore is processed at its scenario throughput for the oxide mine
+    life; the rest of total_processed is sulphide ore spread evenly over the
+    sulphide mine life. Tonnes mined follow the processed ore at the
+    scenario's overall total_mined / total_processed ratio, and grades fall
+    by grade_decline % a year.
+    """
+    life = {'oxide': scenario_data['mine_life_oxide'], 'sulphide': scenario_data['mine_life_sulphide']}
+    years = max(life.values())
+    year = np.arange(1, years + 1)
+
+    oxide_total = scenario_data['oxide_throughput'] * life['oxide']
+    sulphide_total = scenario_data['total_processed'] - oxide_total
+    ore = {
+        'oxide': np.where(year <= life['oxide'], scenario_data['oxide_throughput'] * 1e6, 0.0),
+        'sulphide': np.where(year <= life['sulphide'], sulphide_total / life['sulphide'] * 1e6, 0.0)
+    }
+    if feed_type == "Oxide Feed":
+        ore['sulphide'][:] = 0
+    if feed_type == "Sulphide Feed":
+        ore['oxide'][:] = 0
+
+    strip = scenario_data['total_mined'] / scenario_data['total_processed']
+    return {
+        'year': year,
+        'oxide_ore': ore['oxide'],
+        'sulphide_ore': ore['sulphide'],
+        'mined': (ore['oxide'] + ore['sulphide']) * strip,
+        'grade_factor': (1 - grade_decline / 100) ** (year - 1)
+    }
+
+
+def schedule_variants(count, variation, seed=42, sampler="Random"):
+    """Normally distributed factors for count schedule variants.
+
+    variation gives the ±% (one standard deviation) of each VARIANT_FACTORS
+    entry; missing entries are not varied. Factors are kept positive.
+    """
+    rng = np.random.default_rng(seed)
+    deviates = normal_deviates(sampler, rng, count, len(VARIANT_FACTORS), seed=seed)
+    return {
+        name: np.maximum(0.01, 1 + deviates[:, column] * variation.get(name, 0) / 100)
+        for column, name in enumerate(VARIANT_FACTORS)
+    }
+
+
+def irr(cash_flows, bounds=IRR_BOUNDS, iterations=100):
+    """Internal rate of return (%) of each row of annual cash flows, by vectorized bisection.
+
+    NaN where the NPV does not change sign over bounds (e.g. no investment).
+    """
+    cash_flows = np.atleast_2d(cash_flows)
+    periods = np.arange(cash_flows.shape[1])
+
+    def npv(rate):
+        return (cash_flows / (1 + rate[:, np.newaxis]) ** periods).sum(axis=1)
+
+    low = np.full(len(cash_flows), bounds[0])
+    high = np.full(len(cash_flows), bounds[1])
+    npv_low = npv(low)
+    bracketed = np.sign(npv_low) * np.sign(npv(high)) < 0
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        npv_middle = npv(middle)
+        same_sign = np.sign(npv_middle) == np.sign(npv_low)
+        low = np.where(same_sign, middle, low)
+        npv_low = np.where(same_sign, npv_middle, npv_low)
+        high = np.where(same_sign, high, middle)
+    return np.where(bracketed, (low + high) / 2 * 100, np.nan)
+
+
+def evaluate_schedules(schedule, feed_composition, process_params, metal_prices, feed_type="Both Feeds",
+                       economics=None, factors=None, price_model=None, seed=42):
+    """Run the plant model for every year of every schedule variant and discount the cash flows.
+
+    Each year's ore sets the feed rates (t/h over a full year) for that
+    year; the other process parameters are used as given. factors
+    ({VARIANT_FACTORS entry: array}) scale the base case per variant and
+    economics overrides DEFAULT_ECONOMICS. All variants and years go through
+    the batch engine in a single call. With a price_model (see
+    prices.price_paths) every variant follows its own correlated path of
+    metal prices from metal_prices, drawn with seed and returned as
+    metal_prices (variant, year, METALS); the price factor and escalation
+    still apply on top.
+
+    Returns columnar arrays with one row per variant: npv ($), irr (%),
+    revenue ($, undiscounted), plus annual revenue and cash_flow with
+    year 0 (capex) first.
+    """
+    economics = {**DEFAULT_ECONOMICS, **(economics or {})}
+    factors = factors or {}
+    count = len(next(iter(factors.values()))) if factors else 1
+    factor = {name: np.broadcast_to(np.asarray(factors.get(name, 1.0), dtype=float), (count,))[:, np.newaxis]
+              for name in VARIANT_FACTORS}
+
+    years = len(schedule['year'])
+    oxide_ore = schedule['oxide_ore'] * factor['tonnage']
+    sulphide_ore = schedule['sulphide_ore'] * factor['tonnage']
+    grade = schedule['grade_factor'] * factor['grade']
+
+    params = dict(process_params)
+    params['oxide_feed_rate'] = (oxide_ore / HOURS_PER_YEAR).ravel()
+    params['sulphide_feed_rate'] = (sulphide_ore / HOURS_PER_YEAR).ravel()
+    feed = {metal: (value * grade).ravel() for metal, value in feed_composition.items()}
+    batch = run_batch_simulation(feed, params, feed_type)
+    production = sum(payable_production(batch['results']).values()) + np.zeros((count * years, len(METALS)))
+    if price_model is None:
+        prices = metal_vector(metal_prices)
+    else:
+        prices = price_paths(metal_prices, count, years, price_model, np.random.default_rng(seed))
+    revenue_per_hour = value(production.reshape(count, years, len(METALS)), prices)
+
+    elapsed = schedule['year'] - 1
+    revenue = (revenue_per_hour * HOURS_PER_YEAR * factor['price'] *
+               (1 + economics['price_escalation'] / 100) ** elapsed)
+    costs = ((economics['mining_cost'] * schedule['mined'] * factor['tonnage'] +
+              economics['processing_cost'] * (oxide_ore + sulphide_ore)) * factor['cost'] *
+             (1 + economics['cost_escalation'] / 100) ** elapsed)
+
+    cash_flow = np.concatenate([-economics['capex'] * factor['capex'], revenue - costs], axis=1)
+    discount = (1 + economics['discount_rate'] / 100) ** -np.arange(years + 1)
+    evaluated = {
+        'npv': cash_flow @ discount,
+        'irr': irr(cash_flow),
+        'revenue': revenue.sum(axis=1),
+        'annual_revenue': revenue,
+        'cash_flow': cash_flow
+    }
+    if price_model is not None:
+        evaluated['metal_prices'] = prices
+    return evaluated
+
+
+def scenario_npv(scenario_data, process_params, metal_prices, feed_type="Both Feeds", economics=None,
+                 grade_decline=0, factors=None, price_model=None, seed=42):
+    """Schedule a predefined scenario and evaluate it (see evaluate_schedules) with its own feed grades"""
+    schedule = scenario_schedule(scenario_data, feed_type, grade_decline)
+    feed_composition = scenario_feed_composition(scenario_data, feed_type)
+    evaluated = evaluate_schedules(schedule, feed_composition, process_params, metal_prices, feed_type,
+                                   economics, factors, price_model, seed)
+    evaluated['schedule'] = schedule
+    return evaluated
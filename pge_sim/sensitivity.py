@@ -0,0 +1,141 @@
+"""One-at-a-time tornado sweeps and variance-based (Sobol) sensitivity indices"""
+import numpy as np
+
+from .batch import run_batch_simulation
+from .revenue import total_value
+from .scenarios import METALS
+
+# Process parameters that are rates rather than percentages (not capped at 100%)
+RATE_PARAMS = ['oxide_feed_rate', 'sulphide_feed_rate']
+
+
+def sensitivity_inputs(feed_composition, process_params, metal_prices):
+    """(group, name) for every process parameter, feed grade and metal price"""
+    return (
+        [('process', name) for name in process_params] +
+        [('grade', metal) for metal in METALS if metal in feed_composition] +
+        [('price', metal) for metal in METALS if metal in metal_prices]
+    )
+
+
+def input_label(group, name):
+    """Display label for a sensitivity input"""
+    if group == 'grade':
+        return f"{name} Grade"
+    if group == 'price':
+        return f"{name} Price"
+    return name.replace('_', ' ').title().replace('Pgm', 'PGM')
+
+
+def _base_values(inputs, feed_composition, process_params, metal_prices):
+    sources = {'process': process_params, 'grade': feed_composition, 'price': metal_prices}
+    return np.array([float(sources[group][name]) for group, name in inputs])
+
+
+def _input_bounds(inputs, base, variation):
+    """Lower and upper values for a ±variation% range, keeping percentages at or below 100"""
+    lower = base * (1 - variation / 100)
+    upper = base * (1 + variation / 100)
+    for index, (group, name) in enumerate(inputs):
+        if group == 'process' and name not in RATE_PARAMS:
+            upper[index] = min(upper[index], 100)
+    return lower, upper
+
+
+def evaluate_revenue(samples, inputs, feed_composition, process_params, metal_prices, feed_type="Both Feeds"):
+    """Revenue ($/hour) for every row of samples (one column per input) in a single batch"""
+    feed = dict(feed_composition)
+    params = dict(process_params)
+    prices = dict(metal_prices)
+    targets = {'process': params, 'grade': feed, 'price': prices}
+    for column, (group, name) in enumerate(inputs):
+        targets[group][name] = samples[:, column]
+
+    batch = run_batch_simulation(feed, params, feed_type)
+    return total_value(batch['results'], prices) + np.zeros(len(samples))
+
+
+def tornado_analysis(feed_composition, process_params, metal_prices, feed_type="Both Feeds", variation=10):
+    """Revenue at the low and high end of ±variation% for each input, all others at base.
+
+    Returns a dict of columns (group, name, label, low_value, high_value,
+    low_revenue, high_revenue, swing) sorted by swing, plus base_revenue.
+    """
+    inputs = sensitivity_inputs(feed_composition, process_params, metal_prices)
+    base = _base_values(inputs, feed_composition, process_params, metal_prices)
+    lower, upper = _input_bounds(inputs, base, variation)
+
+    # Rows: base case, then every input at its low and at its high value
+    count = len(inputs)
+    samples = np.tile(base, (2 * count + 1, 1))
+    samples[1 + np.arange(count), np.arange(count)] = lower
+    samples[1 + count + np.arange(count), np.arange(count)] = upper
+
+    revenue = evaluate_revenue(samples, inputs, feed_composition, process_params, metal_prices, feed_type)
+    low_revenue = revenue[1:count + 1]
+    high_revenue = revenue[count + 1:]
+    swing = np.abs(high_revenue - low_revenue)
+    order = np.argsort(-swing, kind='stable')
+
+    return {
+        'group': [inputs[i][0] for i in order],
+        'name': [inputs[i][1] for i in order],
+        'label': [input_label(*inputs[i]) for i in order],
+        'low_value': lower[order],
+        'high_value': upper[order],
+        'low_revenue': low_revenue[order],
+        'high_revenue': high_revenue[order],
+        'swing': swing[order],
+        'base_revenue': float(revenue[0])
+    }
+
+
+def sobol_indices(feed_composition, process_params, metal_prices, feed_type="Both Feeds", variation=10,
+                  base_samples=1024, seed=42):
+    """First-order and total Sobol indices of revenue, inputs uniform over ±variation%.
+
+    Uses the Saltelli sampling scheme (matrices A, B and A with column i taken
+    from B) so all base_samples * (inputs + 2) model runs go through the batch
+    engine in one call. First-order indices use the Saltelli (2010) estimator
+    and total indices the Jansen estimator. Returns columns (group, name,
+    label, first_order, total) sorted by total index, plus variance and the
+    number of evaluations.
+    """
+    inputs = sensitivity_inputs(feed_composition, process_params, metal_prices)
+    base = _base_values(inputs, feed_composition, process_params, metal_prices)
+    lower, upper = _input_bounds(inputs, base, variation)
+    count = len(inputs)
+
+    rng = np.random.default_rng(seed)
+    a = lower + (upper - lower) * rng.random((base_samples, count))
+    b = lower + (upper - lower) * rng.random((base_samples, count))
+    ab = np.repeat(a[np.newaxis], count, axis=0)
+    ab[np.arange(count), :, np.arange(count)] = b.T
+
+    samples = np.concatenate([a, b, ab.reshape(-1, count)])
+    revenue = evaluate_revenue(samples, inputs, feed_composition, process_params, metal_prices, feed_type)
+    f_a = revenue[:base_samples]
+    f_b = revenue[base_samples:2 * base_samples]
+    f_ab = revenue[2 * base_samples:].reshape(count, base_samples)
+
+    # Centring the outputs leaves the estimators unbiased but cuts their variance
+    centre = np.mean(np.concatenate([f_a, f_b]))
+    f_a, f_b, f_ab = f_a - centre, f_b - centre, f_ab - centre
+    variance = np.var(np.concatenate([f_a, f_b]))
+    if variance > 0:
+        first_order = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+        total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance
+    else:
+        first_order = np.zeros(count)
+        total = np.zeros(count)
+    order = np.argsort(-total, kind='stable')
+
+    return {
+        'group': [inputs[i][0] for i in order],
+        'name': [inputs[i][1] for i in order],
+        'label': [input_label(*inputs[i]) for i in order],
+        'first_order': first_order[order],
+        'total': total[order],
+        'variance': float(variance),
+        'evaluations': len(samples)
+    }
@@ -0,0 +1,219 @@
+"""Content-addressed on-disk result cache shared by every process on a host.
+
+Results are keyed by a SHA-256 hash of the analysis name and everything that
+determines the result (feed composition, process parameters, prices,
+settings and seed), so a repeat of any earlier run is read back instead of
+recomputed, whichever server process ran it first. Entries are stored as
+raw array bytes behind a JSON layout in one SQLite database in WAL mode,
+which serializes writers across processes, and the least recently used
+entries are evicted once the database grows past max_bytes.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Bump when the model or a result layout changes, so old entries are never served
+STORE_VERSION = 2
+
+# Default size bound of the on-disk cache (bytes)
+STORE_MAX_BYTES = 2 * 1024 ** 3
+
+# Default location; PGE_SIM_STORE overrides it and PGE_SIM_STORE=off disables the cache
+STORE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pge_sim', 'results.sqlite')
+
+
+def _canonical(value):
+    """JSON-serializable form of an input, with numpy scalars and arrays as plain numbers"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+
+def _key_form(value):
+    """Canonical form of an input for hashing: like _canonical, but every number a float (as in cache.freeze)"""
+    if isinstance(value, dict):
+        return {str(key): _key_form(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_key_form(item) for item in value]
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return float(value)
+    return _canonical(value)
+
+
+def result_key(analysis, inputs):
+    """Hex digest identifying one analysis run by its inputs (dict order and int/float do not matter)"""
+    payload = json.dumps([STORE_VERSION, analysis, _key_form(inputs)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _flatten(value, path, arrays, layout):
+    if isinstance(value, dict):
+        layout[path] = ['dict', list(value)]
+        for key, item in value.items():
+            _flatten(item, f'{path}/{key}', arrays, layout)
+    elif isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+        layout[path] = ['array', value.dtype.str, value.shape]
+        arrays.append(np.ascontiguousarray(value))
+    elif isinstance(value, (bool, int, float, str, list, tuple, np.generic, np.ndarray)) or value is None:
+        layout[path] = ['value', _canonical(value)]
+    else:
+        raise TypeError(f"Cannot store {type(value).__name__} at '{path or '/'}'")
+
+
+def _unflatten(path, arrays, layout):
+    kind = layout[path]
+    if kind[0] == 'dict':
+        return {key: _unflatten(f'{path}/{key}', arrays, layout) for key in kind[1]}
+    if kind[0] == 'array':
+        return next(arrays)
+    return kind[1]
+
+
+def encode(result):
+    """Compact binary form of a result made of dicts, numeric arrays, lists and scalars.
+
+    A length-prefixed JSON layout is followed by the raw bytes of every
+    array, so decode can map the arrays straight onto the stored bytes.
+    """
+    arrays, layout = [], {}
+    _flatten(result, '', arrays, layout)
+    header = json.dumps(layout).encode()
+    return b''.join([len(header).to_bytes(8, 'little'), header] + [array.tobytes() for array in arrays])
+
+
+def decode(blob):
+    """Result stored by encode; its arrays are read-only views of blob"""
+    size = int.from_bytes(blob[:8], 'little')
+    layout = json.loads(blob[8:8 + size])
+
+    def arrays():
+        offset = 8 + size
+        for kind in layout.values():
+            if kind[0] == 'array':
+                dtype = np.dtype(kind[1])
+                count = int(np.prod(kind[2]))
+                yield np.frombuffer(blob, dtype, count, offset).reshape(kind[2])
+                offset += count * dtype.itemsize
+
+    return _unflatten('', arrays(), layout)
+
+
+class ResultStore:
+    """Size-bounded LRU cache of analysis results in a SQLite database"""
+
+    def __init__(self, path=STORE_PATH, max_bytes=STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, analysis TEXT, size INTEGER, '
+                'last_access REAL, value BLOB)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)')
+
+    @contextmanager
+    def _connect(self, write=False):
+        """Fresh autocommit connection (so the store is safe to share between threads); with write,
+        the statements run in one transaction that holds the database write lock"""
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if write:
+                connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                if write:
+                    connection.execute('ROLLBACK')
+                raise
+            if write:
+                connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def get(self, key):
+        """Stored result for key, or None"""
+        with self._connect() as connection:
+            row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key))
+        return decode(row[0])
+
+    def put(self, key, analysis, result):
+        """Store result under key, then evict least recently used entries beyond max_bytes"""
+        blob = encode(result)
+        with self._connect(write=True) as connection:
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                               (key, analysis, len(blob), time.time(), blob))
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, size in connection.execute(
+                        'SELECT key, size FROM results WHERE key != ? ORDER BY last_access', (key,)).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    connection.execute('DELETE FROM results WHERE key = ?', (old_key,))
+                    total -= size
+
+    def fetch(self, analysis, inputs, compute):
+        """Result of compute() for this analysis and inputs, read from disk when it already ran"""
+        key = result_key(analysis, inputs)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = compute()
+        self.put(key, analysis, result)
+        return result
+
+    def stats(self):
+        """Hits and misses in this process, plus entries and bytes on disk"""
+        with self._connect() as connection:
+            entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size,
+                'max_bytes': self.max_bytes}
+
+    def clear(self):
+        """Drop every stored result"""
+        with self._connect(write=True) as connection:
+            connection.execute('DELETE FROM results')
+
+
+_store = None
+
+
+def result_store():
+    """Shared ResultStore at PGE_SIM_STORE (default STORE_PATH), or None when set to 'off'"""
+    global _store
+    path = os.environ.get('PGE_SIM_STORE', STORE_PATH)
+    if path.lower() == 'off':
+        return None
+    if _store is None or _store.path != path:
+        _store = ResultStore(path)
+    return _store
+
+
+def fetch_result(analysis, inputs, compute):
+    """Result of compute() through the shared store, or computed directly when the store is off"""
+    store = result_store()
+    return compute() if store is None else store.fetch(analysis, inputs, compute)
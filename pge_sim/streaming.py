@@ -0,0 +1,131 @@
+"""Online statistics for streaming Monte Carlo: running moments and quantile sketches"""
+from statistics import NormalDist
+
+import numpy as np
+
+
+class RunningStats:
+    """Running count, mean, variance, min and max updated one batch at a time.
+
+    Batches are merged with the parallel form of Welford's algorithm, so the
+    result does not depend on how the stream is split into batches.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Merge a batch of values into the running statistics"""
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        batch_count = values.size
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.m2 += batch_m2 + delta * delta * self.count * batch_count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def variance(self):
+        """Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        """Sample standard deviation"""
+        return np.sqrt(self.variance)
+
+    def half_width(self, confidence_level=95):
+        """Half-width of the normal confidence interval for the mean"""
+        if self.count < 2:
+            return np.inf
+        z = NormalDist().inv_cdf(0.5 + confidence_level / 200)
+        return z * self.std / np.sqrt(self.count)
+
+
+class StreamingHistogram:
+    """Fixed-size histogram sketch for streaming quantiles.
+
+    The bins cover a range that doubles (merging adjacent bins) whenever new
+    values fall outside it, so memory stays constant and quantiles are exact
+    to within one bin width of the full sample.
+    """
+
+    def __init__(self, bins=4096):
+        if bins % 2:
+            raise ValueError("StreamingHistogram needs an even number of bins")
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.lower = None
+        self.width = None
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def edges(self):
+        """Bin edges of the current range"""
+        return self.lower + self.width * np.arange(self.bins + 1)
+
+    def _expand(self, value_min, value_max):
+        """Double the bin width until [value_min, value_max] fits in the range"""
+        half = self.bins // 2
+        while value_min < self.lower or value_max >= self.lower + self.bins * self.width:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+            if value_min < self.lower:
+                # Grow downwards: existing counts move to the upper half
+                self.counts[half:] = merged
+                self.lower -= self.bins * self.width
+            else:
+                self.counts[:half] = merged
+            self.width *= 2
+
+    def update(self, values):
+        """Add a batch of values to the sketch"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        value_min, value_max = values.min(), values.max()
+        if self.lower is None:
+            # Initial range: the first batch with headroom on both sides
+            span = max(value_max - value_min, abs(value_max) * 1e-6, 1e-12)
+            self.width = 2 * span / self.bins
+            self.lower = value_min - span / 2
+        self._expand(value_min, value_max)
+
+        index = ((values - self.lower) / self.width).astype(np.int64)
+        self.counts += np.bincount(np.clip(index, 0, self.bins - 1), minlength=self.bins)
+
+    def quantile(self, q):
+        """Estimated quantile(s) q in [0, 1], interpolated within bins"""
+        if self.lower is None:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        return np.interp(np.asarray(q) * cumulative[-1], cumulative, self.edges)
+
+    def histogram(self, nbins=50):
+        """Counts and edges re-binned to about nbins bins over the occupied range"""
+        if self.lower is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        occupied = np.flatnonzero(self.counts)
+        first, last = occupied[0], occupied[-1] + 1
+        group = max(1, int(np.ceil((last - first) / nbins)))
+        last = first + group * int(np.ceil((last - first) / group))
+        counts = np.zeros(last - first, dtype=np.int64)
+        available = self.counts[first:min(last, self.bins)]
+        counts[:available.size] = available
+        edges = self.lower + self.width * np.arange(first, last + 1, group)
+        return counts.reshape(-1, group).sum(axis=1), edges
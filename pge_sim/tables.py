@@ -0,0 +1,172 @@
+"""Stage-by-stage and capacity utilization tables derived from plant stage results"""
+import pandas as pd
+
+from .profiling import timed
+
+
+@timed
+def oxide_process_table(oxide_stages):
+    """Mass and Pd/Au content at each oxide process stage"""
+    oxide_process_data = {
+        'Process Stage': ['Feed', 'After Sizing', 'After Grinding', 'Leach Solution', 'Tailings'],
+        'Mass (t/h)': [
+            oxide_stages['feed']['mass'],
+            oxide_stages['sizing']['mass'],
+            oxide_stages['grinding']['mass'],
+            oxide_stages['leaching']['mass'],
+            oxide_stages['tailings']['mass']
+        ],
+        'Pd Content (kg/h)': [
+            oxide_stages['feed']['pd'],
+            oxide_stages['sizing']['pd'],
+            oxide_stages['grinding']['pd'],
+            oxide_stages['leaching']['pd_recovered'],
+            oxide_stages['tailings']['pd']
+        ],
+        'Au Content (kg/h)': [
+            oxide_stages['feed']['au'],
+            oxide_stages['sizing']['au'],
+            oxide_stages['grinding']['au'],
+            oxide_stages['leaching']['au_recovered'],
+            oxide_stages['tailings']['au']
+        ],
+        'Stage Recovery (%)': [
+            100.0,
+            (oxide_stages['sizing']['mass'] / oxide_stages['feed']['mass']) * 100,
+            (oxide_stages['grinding']['mass'] / oxide_stages['sizing']['mass']) * 100,
+            (oxide_stages['leaching']['mass'] / oxide_stages['grinding']['mass']) * 100,
+            ((oxide_stages['grinding']['mass'] - oxide_stages['leaching']['mass']) / oxide_stages['grinding']['mass']) * 100
+        ]
+    }
+    
+    return pd.DataFrame(oxide_process_data)
+
+
+@timed
+def sulphide_process_table(sulphide_stages):
+    """Mass and Cu/Ni content at each sulphide process stage"""
+    sulphide_process_data = {
+        'Process Stage': ['Feed', 'After Crushing', 'After Grinding', 'Cu Concentrate', 'Ni Concentrate', 'Flotation Tailings'],
+        'Mass (t/h)': [
+            sulphide_stages['feed']['mass'],
+            sulphide_stages['crushing']['mass'],
+            sulphide_stages['grinding']['mass'],
+            sulphide_stages['cu_flotation']['concentrate_mass'],
+            sulphide_stages['ni_flotation']['concentrate_mass'],
+            sulphide_stages['tailings']['mass']
+        ],
+        'Cu Content (kg/h)': [
+            sulphide_stages['feed']['cu'],
+            sulphide_stages['crushing']['cu'],
+            sulphide_stages['grinding']['cu'],
+            sulphide_stages['cu_flotation']['cu'],
+            0,
+            0
+        ],
+        'Ni Content (kg/h)': [
+            sulphide_stages['feed']['ni'],
+            sulphide_stages['crushing']['ni'],
+            sulphide_stages['grinding']['ni'],
+            0,
+            sulphide_stages['ni_flotation']['ni'],
+            0
+        ],
+        'Stage Recovery (%)': [
+            100.0,
+            (sulphide_stages['crushing']['mass'] / sulphide_stages['feed']['mass']) * 100,
+            (sulphide_stages['grinding']['mass'] / sulphide_stages['crushing']['mass']) * 100,
+            (sulphide_stages['cu_flotation']['concentrate_mass'] / sulphide_stages['grinding']['mass']) * 100,
+            (sulphide_stages['ni_flotation']['concentrate_mass'] / (sulphide_stages['grinding']['mass'] - sulphide_stages['cu_flotation']['concentrate_mass'])) * 100,
+            (sulphide_stages['tailings']['mass'] / sulphide_stages['grinding']['mass']) * 100
+        ]
+    }
+    
+    return pd.DataFrame(sulphide_process_data)
+
+
+@timed
+def pgm_distribution_table(sulphide_stages, coefficients=None):
+    """Distribution of Pd, Pt and Au through the sulphide concentrates.
+
+    coefficients, if given, are the sulphide feed-to-payable transfer
+    coefficients by metal and are shown next to the overall recovery.
+    """
+    pgm_distribution_data = {
+        'Metal': ['Pd', 'Pt', 'Au'],
+        'Feed (kg/h)': [
+            sulphide_stages['feed']['pd'],
+            sulphide_stages['feed']['pt'],
+            sulphide_stages['feed']['au']
+        ],
+        'To Cu Concentrate (kg/h)': [
+            sulphide_stages['cu_flotation']['pd'],
+            sulphide_stages['cu_flotation']['pt'],
+            sulphide_stages['cu_flotation']['au']
+        ],
+        'To Ni Concentrate (kg/h)': [
+            sulphide_stages['ni_flotation']['pd'],
+            sulphide_stages['ni_flotation']['pt'],
+            sulphide_stages['ni_flotation']['au']
+        ],
+        'Final Recovery (kg/h)': [
+            sulphide_stages['final_products']['pd'],
+            sulphide_stages['final_products']['pt'],
+            sulphide_stages['final_products']['au']
+        ],
+        'Overall Recovery (%)': [
+            (sulphide_stages['final_products']['pd'] / sulphide_stages['feed']['pd']) * 100 if sulphide_stages['feed']['pd'] > 0 else 0,
+            (sulphide_stages['final_products']['pt'] / sulphide_stages['feed']['pt']) * 100 if sulphide_stages['feed']['pt'] > 0 else 0,
+            (sulphide_stages['final_products']['au'] / sulphide_stages['feed']['au']) * 100 if sulphide_stages['feed']['au'] > 0 else 0
+        ]
+    }
+    if coefficients is not None:
+        pgm_distribution_data['Transfer Coefficient'] = [coefficients[metal] for metal in pgm_distribution_data['Metal']]
+    
+    return pd.DataFrame(pgm_distribution_data)
+
+
+@timed
+def capacity_utilization_table(stage_results):
+    """Throughput against design capacity for every capacity-limited stage"""
+    capacity_data = []
+
+    if 'oxide' in stage_results:
+        oxide_stages = stage_results['oxide']
+
+        # Calculate capacity utilization for each oxide stage
+        for stage_name, stage_data in oxide_stages.items():
+            if 'capacity' in stage_data and stage_name != 'feed':
+                utilization = (stage_data['mass'] / stage_data['capacity']) * 100
+                capacity_data.append({
+                    'Process': 'Oxide',
+                    'Stage': stage_name.title(),
+                    'Actual Throughput (t/h)': stage_data['mass'],
+                    'Design Capacity (t/h)': stage_data['capacity'],
+                    'Utilization (%)': utilization,
+                    'Available Capacity (t/h)': stage_data['capacity'] - stage_data['mass'],
+                    'Status': 'Overloaded' if utilization > 100 else 'Critical' if utilization > 90 else 'Normal'
+                })
+
+    if 'sulphide' in stage_results:
+        sulphide_stages = stage_results['sulphide']
+
+        # Calculate capacity utilization for each sulphide stage
+        for stage_name, stage_data in sulphide_stages.items():
+            if 'capacity' in stage_data and stage_name != 'feed':
+                if stage_name in ['cu_flotation', 'ni_flotation']:
+                    throughput = stage_data['concentrate_mass']
+                else:
+                    throughput = stage_data['mass']
+
+                utilization = (throughput / stage_data['capacity']) * 100
+                capacity_data.append({
+                    'Process': 'Sulphide',
+                    'Stage': stage_name.replace('_', ' ').title(),
+                    'Actual Throughput (t/h)': throughput,
+                    'Design Capacity (t/h)': stage_data['capacity'],
+                    'Utilization (%)': utilization,
+                    'Available Capacity (t/h)': stage_data['capacity'] - throughput,
+                    'Status': 'Overloaded' if utilization > 100 else 'Critical' if utilization > 90 else 'Normal'
+                })
+    
+    return pd.DataFrame(capacity_data)
@@ -0,0 +1,67 @@
+"""Flowsheets compiled to per-metal feed-to-payable transfer coefficients.
+
+Every stage capacity in a flowsheet is a fixed multiple of the mass fed to
+that stage, so whether a stage runs overloaded does not depend on the feed
+rate or grades: for any non-empty stream the overload branch is taken exactly
+when the capacity factor is below one. With the branches resolved once (by
+running the compiled flowsheet on a unit feed), each process reduces to a
+fraction of every metal in its feed that reaches saleable product, and
+production and revenue for any feed rate, grade or price become a dot
+product with those coefficients.
+"""
+import numpy as np
+
+from .batch import FLOWSHEET_PLANS
+from .revenue import PAYABLE_METALS, metal_vector
+from .scenarios import METALS
+
+
+class TransferModel:
+    """A flowsheet compiled for one set of process parameters.
+
+    coefficients has one row per process and one column per metal in
+    METALS: the fraction of that metal in the process feed that ends up as
+    payable product (0 for metals the process does not sell). Grades and
+    prices may be dicts keyed by metal or arrays with METALS on the last
+    axis; feed_rates (t/h, one column per process) default to the rates in
+    the compiled parameters. All arguments broadcast, so sweeps over millions
+    of grade, price or feed rate combinations cost one dot product each.
+    """
+
+    def __init__(self, process_params, feed_type="Both Feeds"):
+        self.processes = []
+        if feed_type in ["Oxide Feed", "Both Feeds"]:
+            self.processes.append('oxide')
+        if feed_type in ["Sulphide Feed", "Both Feeds"]:
+            self.processes.append('sulphide')
+
+        plans = [FLOWSHEET_PLANS[process_type] for process_type in self.processes]
+        self.coefficients = np.zeros((len(self.processes), len(METALS)))
+        for row, (process_type, plan) in enumerate(zip(self.processes, plans)):
+            coefficients = plan.transfer_coefficients(process_params)
+            for metal in PAYABLE_METALS[process_type]:
+                self.coefficients[row, METALS.index(metal)] = coefficients[metal]
+
+        self.feed_rates = np.array([float(process_params[plan.feed_rate]) for plan in plans])
+
+    def coefficient_table(self):
+        """{process: {metal: coefficient}} for the payable metals of each process"""
+        return {
+            process_type: {metal: float(self.coefficients[row, METALS.index(metal)])
+                           for metal in PAYABLE_METALS[process_type]}
+            for row, process_type in enumerate(self.processes)
+        }
+
+    def payable_weights(self, feed_rates=None):
+        """Payable metal (kg/h) per 1% grade of each metal, summed over processes"""
+        feed_rates = self.feed_rates if feed_rates is None else np.asarray(feed_rates, dtype=float)
+        return feed_rates @ self.coefficients / 100
+
+    def production(self, grades, feed_rates=None):
+        """Payable metal production (kg/h) per metal for the given feed grades (%)"""
+        return metal_vector(grades) * self.payable_weights(feed_rates)
+
+    def revenue(self, grades, prices, feed_rates=None):
+        """Plant revenue ($/hour) for the given feed grades (%) and metal prices"""
+        return np.einsum('...m,...m,...m->...', metal_vector(grades), metal_vector(prices),
+                         self.payable_weights(feed_rates))
@@ -0,0 +1,41 @@
+"""Block-model summaries grouped by domain and period"""
+import io
+
+import pytest
+
+from pge_sim.blocks import MISSING, block_model_summary
+
+PROCESS_PARAMS = {
+    'oxide_feed_rate': 228, 'sulphide_feed_rate': 1426, 'sizing_efficiency': 98, 'oxide_grinding_efficiency': 92,
+    'sulphide_grinding_efficiency': 92, 'leaching_efficiency': 88, 'crushing_efficiency': 98,
+    'cu_flotation_efficiency': 85, 'cu_flotation_recovery': 80, 'ni_flotation_efficiency': 80,
+    'ni_flotation_recovery': 43, 'co_flotation_recovery': 42, 'pgm_to_cu_concentrate': 70,
+    'pgm_to_ni_concentrate': 25, 'pressure_oxidation_efficiency': 95, 'oxide_pd_recovery': 78,
+    'oxide_au_recovery': 90, 'final_cu_recovery': 95, 'final_pd_recovery': 78, 'final_pt_recovery': 45,
+    'final_au_recovery': 66, 'final_ni_recovery': 92, 'final_co_recovery': 90
+}
+
+
+def block_csv(text):
+    source = io.BytesIO(text.encode())
+    source.name = 'blocks.csv'
+    return source
+
+
+def test_blank_domain_is_grouped_as_missing():
+    source = block_csv("tonnes,Cu,Pd,domain,period,process\n"
+                       "100,0.2,0.0005,north,1,sulphide\n"
+                       "50,0.1,0.0004,,1,sulphide\n")
+    summary = block_model_summary(source, PROCESS_PARAMS, feed_type="Both Feeds")
+    assert summary['domain'].tolist() == [MISSING, 'north']
+    assert summary['tonnes'].tolist() == [50, 100]
+
+
+def test_blank_period_sorts_after_numeric_periods():
+    source = block_csv("tonnes,Cu,Pd,domain,period,process\n"
+                       "100,0.2,0.0005,north,2,oxide\n"
+                       "80,0.2,0.0005,north,,oxide\n"
+                       "50,0.1,0.0004,north,1,oxide\n")
+    summary = block_model_summary(source, PROCESS_PARAMS, feed_type="Both Feeds")
+    assert summary['period'].tolist()[-1] == MISSING
+    assert summary['tonnes'].tolist() == pytest.approx([50, 100, 80])
@@ -0,0 +1,36 @@
+"""Cutoff queries and optimization over ranked blocks"""
+import numpy as np
+import pytest
+
+from pge_sim.cutoff import GradeTonnage
+from pge_sim.scenarios import METALS
+
+PRICES = {'Cu': 0, 'Pd': 1, 'Pt': 0, 'Au': 0, 'Ni': 0, 'Co': 0}
+
+
+def tied_blocks():
+    """Four 10 t blocks, three sharing key 1; only the last two hold payable Pd"""
+    recovered = np.zeros((4, len(METALS)))
+    recovered[:, METALS.index('Pd')] = [0, 0, 5, 5]
+    return GradeTonnage(np.array([1.0, 1.0, 1.0, 2.0]), np.full(4, 10.0), recovered)
+
+
+def test_above_includes_every_block_at_the_cutoff():
+    above = tied_blocks().above(np.array([0.5, 1.0, 1.5, 2.5]), PRICES)
+    assert above['tonnes'].tolist() == [40, 40, 10, 0]
+    assert above['revenue'].tolist() == [10, 10, 5, 0]
+
+
+def test_optimal_cutoff_takes_tied_blocks_together():
+    optimum = tied_blocks().optimal_cutoff(PRICES, processing_cost=0.1)
+    assert optimum['cutoff'] == 1.0
+    assert optimum['tonnes'] == 40
+    assert optimum['profit'] == pytest.approx(optimum['revenue'] - 0.1 * optimum['tonnes'])
+    assert optimum['profit'] == pytest.approx(6)
+
+
+def test_optimal_cutoff_respects_the_tonnage_cap():
+    optimum = tied_blocks().optimal_cutoff(PRICES, processing_cost=0.1, max_tonnes=25)
+    assert optimum['cutoff'] == 2.0
+    assert optimum['tonnes'] == 10
+    assert optimum['profit'] == pytest.approx(4)